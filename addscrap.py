@@ -4,7 +4,58 @@ from tkinter import ttk, messagebox
 from tkcalendar import Calendar
 from datetime import datetime
 from PIL import Image, ImageTk
-import sqlite3
+
+from db import parse_date
+import completions
+import outbox
+
+SHIFTS = ("A", "B", "C")
+# Batch grid columns: (entry key, heading, width in chars)
+BATCH_COLUMNS = (
+    ("machine_operator", "Operator", 14),
+    ("machine_name", "Machine", 12),
+    ("date", "Date", 11),
+    ("quantity", "Qty", 7),
+    ("unit", "Unit", 6),
+    ("total_produced", "Total", 8),
+    ("shift", "Shift", 5),
+    ("reason", "Reason", 16),
+    ("comments", "Comments", 20),
+)
+# Blank cells in these columns repeat the row above (same operator, day, shift)
+FILL_DOWN = ("machine_operator", "date", "unit", "shift")
+AUTOCOMPLETE = ("machine_operator", "machine_name", "reason")
+BATCH_ROWS = 20
+
+
+def validate_row(values):
+    """
+    Raw cell text -> (entry dict, None) or (None, error message); same rules
+    as the single-entry form, so both paths store identical rows.
+    """
+    v = {k: (values.get(k) or "").strip() for k, _, _ in BATCH_COLUMNS}
+    missing = [h for k, h, _ in BATCH_COLUMNS[:3] if not v[k]]
+    if missing:
+        return None, "Missing " + ", ".join(missing)
+    day = parse_date(v["date"])
+    if day is None:
+        return None, f"Bad date {v['date']!r}"
+    try:
+        quantity = float(v["quantity"])
+        total = float(v["total_produced"] or 0)
+    except ValueError:
+        return None, "Qty and Total must be numbers"
+    if quantity <= 0:
+        return None, "Qty must be above 0"
+    shift = v["shift"].upper() or "A"
+    if shift not in SHIFTS:
+        return None, f"Shift must be {'/'.join(SHIFTS)}"
+    return {
+        "machine_operator": v["machine_operator"], "machine_name": v["machine_name"],
+        "date": day.strftime("%m/%d/%Y"), "quantity": quantity, "unit": v["unit"],
+        "total_produced": total, "shift": shift, "reason": v["reason"],
+        "comments": v["comments"], "entry_type": "Manual",
+    }, None
 
 
 class AddScrapFrame(tk.Frame):
@@ -13,13 +64,14 @@ class AddScrapFrame(tk.Frame):
         self.controller = controller
         self.BASE_DIR = os.path.dirname(__file__)
         self.IMAGE_DIR = os.path.join(self.BASE_DIR, "images")
-        self.DB_PATH = os.path.join(self.BASE_DIR, "sample_data.db")
 
         self.scale_x = max(self.winfo_screenwidth() / 1920, 0.8)
         self.scale_y = max(self.winfo_screenheight() / 1080, 0.8)
         self.scale_font = (self.scale_x + self.scale_y) / 2
 
         self.build_form()
+        outbox.start()          # drain anything queued before the last shutdown
+        self.after(2000, self._poll_outbox)
 
     # ---------- UI helpers ----------
     def load_icon(self, name, size):
@@ -84,11 +136,29 @@ class AddScrapFrame(tk.Frame):
         self.shift_combo.grid(row=6, column=1, padx=10, pady=8, sticky="w")
 
         self.reason_entry = self.create_entry(form, "Reason:", 7, "Enter scrap cause")
+        # known names drop down as you type, so "Press 2" doesn't become a new machine
+        completions.attach(self.operator_entry, "machine_operator", ignore=("Enter operator name",))
+        completions.attach(self.machine_entry, "machine_name", ignore=("Enter machine name",))
+        completions.attach(self.reason_entry, "reason", ignore=("Enter scrap cause",))
         self.comment_entry = self.create_entry(form, "Comments:", 8, "Optional comments")
 
-        tk.Button(self, text="Submit Entry", font=("Segoe UI", 14, "bold"),
+        btns = tk.Frame(self, bg="#F8FAFC")
+        btns.pack(pady=25)
+        tk.Button(btns, text="Submit Entry", font=("Segoe UI", 14, "bold"),
                   bg="#2563EB", fg="white", relief="flat", cursor="hand2",
-                  command=self.save_entry).pack(pady=25, ipadx=20, ipady=5)
+                  command=self.save_entry).pack(side="left", padx=10, ipadx=20, ipady=5)
+        tk.Button(btns, text="Batch Entry…", font=("Segoe UI", 14, "bold"),
+                  bg="#0F766E", fg="white", relief="flat", cursor="hand2",
+                  command=self.open_batch).pack(side="left", padx=10, ipadx=20, ipady=5)
+
+        self.outbox_lbl = tk.Label(self, text="", bg="#F8FAFC", fg="#B45309", font=("Segoe UI", 10, "bold"))
+        self.outbox_lbl.pack()
+
+    def open_batch(self):
+        if getattr(self, "_batch", None) is not None and self._batch.winfo_exists():
+            self._batch.lift()
+            return
+        self._batch = BatchEntryWindow(self)
 
     def open_calendar(self):
         top = tk.Toplevel(self)
@@ -122,23 +192,37 @@ class AddScrapFrame(tk.Frame):
             # Validate date
             datetime.strptime(date, "%m/%d/%Y")
 
-            conn = sqlite3.connect(self.DB_PATH)
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO scrap_logs
-                (machine_operator, machine_name, date, quantity, unit, total_produced, shift, reason, comments)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (operator, machine, date, quantity, unit, total, shift, reason, comments))
-            conn.commit()
-            conn.close()
+            entries = [{
+                "machine_operator": operator, "machine_name": machine, "date": date,
+                "quantity": quantity, "unit": unit, "total_produced": total,
+                "shift": shift, "reason": reason, "comments": comments,
+                "entry_type": "Manual",
+            }]
+            # journaled and fsync'd locally; written to the DB in the background
+            outbox.enqueue(entries)
+            completions.remember(entries)
 
             messagebox.showinfo("Success", "Scrap entry added successfully!")
             self._clear_form()
 
         except ValueError as ve:
             messagebox.showerror("Input Error", str(ve))
-        except Exception as e:
-            messagebox.showerror("Database Error", str(e))
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Could not queue the entry.\n\n{e}")
+
+    def _poll_outbox(self):
+        try:
+            st = outbox.status()
+        except OSError:
+            st = {"pending": 0}
+        if st["pending"] and st.get("error"):
+            text = f"{st['pending']} entries saved locally, database unavailable — retrying in {st['retry_in']:.0f}s"
+        elif st["pending"]:
+            text = f"{st['pending']} entries syncing…"
+        else:
+            text = ""
+        self.outbox_lbl.config(text=text)
+        self.after(2000, self._poll_outbox)
 
     def _clear_form(self):
         self.operator_entry.delete(0, "end")
@@ -151,3 +235,154 @@ class AddScrapFrame(tk.Frame):
         self.reason_entry.delete(0, "end")
         self.comment_entry.delete(0, "end")
         self.shift_combo.set("A")
+
+
+# -----------------
+# Batch entry: a grid of rows validated together, saved in one transaction
+# -----------------
+class BatchEntryWindow(tk.Toplevel):
+    def __init__(self, parent, rows=BATCH_ROWS):
+        super().__init__(parent)
+        self.title("Batch Scrap Entry")
+        self.configure(bg="#F8FAFC", padx=12, pady=10)
+        self.transient(parent.winfo_toplevel())
+        self.cells = []         # one {key: Entry} per row
+        self.errors = []        # one Label per row
+
+        tk.Label(self, text="One row per scrap entry. Blank Operator, Date, Unit and Shift "
+                            "repeat the row above; paste from a spreadsheet with Ctrl+V.",
+                 bg="#F8FAFC", fg="#475569", font=("Segoe UI", 10)).pack(anchor="w", pady=(0, 6))
+
+        outer = tk.Frame(self, bg="#F8FAFC")
+        outer.pack(fill="both", expand=True)
+        self.canvas = tk.Canvas(outer, bg="#F8FAFC", highlightthickness=0, width=1100, height=480)
+        vsb = ttk.Scrollbar(outer, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=vsb.set)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+        self.grid_frame = tk.Frame(self.canvas, bg="#F8FAFC")
+        self.canvas.create_window((0, 0), window=self.grid_frame, anchor="nw")
+        self.grid_frame.bind("<Configure>",
+                             lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+
+        for c, (_, heading, _) in enumerate(BATCH_COLUMNS, start=1):
+            tk.Label(self.grid_frame, text=heading, bg="#F8FAFC", fg="#0F172A",
+                     font=("Segoe UI", 10, "bold")).grid(row=0, column=c, padx=1, sticky="w")
+        self.add_rows(rows)
+
+        bar = tk.Frame(self, bg="#F8FAFC")
+        bar.pack(fill="x", pady=(8, 0))
+        ttk.Button(bar, text=f"Add {BATCH_ROWS} Rows", command=lambda: self.add_rows(BATCH_ROWS)).pack(side="left")
+        ttk.Button(bar, text="Clear", command=self.clear).pack(side="left", padx=6)
+        self.status = tk.Label(bar, text="", bg="#F8FAFC", fg="#0F172A", font=("Segoe UI", 10, "bold"))
+        self.status.pack(side="left", padx=12)
+        tk.Button(bar, text="Save All", font=("Segoe UI", 12, "bold"), bg="#2563EB", fg="white",
+                  relief="flat", cursor="hand2", command=self.save_all).pack(side="right", ipadx=14, ipady=2)
+
+    def add_rows(self, n):
+        for _ in range(n):
+            r = len(self.cells) + 1
+            tk.Label(self.grid_frame, text=str(r), bg="#F8FAFC", fg="#64748B",
+                     font=("Segoe UI", 9)).grid(row=r, column=0, padx=(0, 4))
+            row = {}
+            for c, (key, _, width) in enumerate(BATCH_COLUMNS, start=1):
+                e = tk.Entry(self.grid_frame, font=("Segoe UI", 10), width=width, bg="white", relief="flat",
+                             highlightthickness=1, highlightbackground="#E5E7EB", highlightcolor="#3E84FB")
+                e.grid(row=r, column=c, padx=1, pady=1)
+                if key in AUTOCOMPLETE:
+                    completions.attach(e, key)      # first, so its <Down> opens the list
+                e.bind("<Return>", lambda ev, i=r - 1, k=key: self._move(i + 1, k))
+                e.bind("<Down>", lambda ev, i=r - 1, k=key: self._move(i + 1, k), add="+")
+                e.bind("<Up>", lambda ev, i=r - 1, k=key: self._move(i - 1, k))
+                e.bind("<<Paste>>", lambda ev, i=r - 1, k=key: self._paste(i, k))
+                row[key] = e
+            err = tk.Label(self.grid_frame, text="", bg="#F8FAFC", fg="#DC2626", font=("Segoe UI", 9))
+            err.grid(row=r, column=len(BATCH_COLUMNS) + 1, padx=(6, 0), sticky="w")
+            self.cells.append(row)
+            self.errors.append(err)
+        if len(self.cells) == n:
+            self.cells[0]["machine_operator"].focus_set()
+
+    def _move(self, i, key):
+        if i >= len(self.cells):
+            self.add_rows(BATCH_ROWS)
+        if 0 <= i < len(self.cells):
+            self.cells[i][key].focus_set()
+        return "break"
+
+    def _paste(self, i, key):
+        # Tab/newline separated block from Excel: fill rightwards and downwards
+        try:
+            text = self.clipboard_get()
+        except tk.TclError:
+            return "break"
+        lines = text.rstrip("\r\n").splitlines()
+        if len(lines) <= 1 and "\t" not in text:
+            return None         # a single value: normal paste into this cell
+        keys = [k for k, _, _ in BATCH_COLUMNS]
+        start = keys.index(key)
+        while len(self.cells) < i + len(lines):
+            self.add_rows(BATCH_ROWS)
+        for r, line in enumerate(lines):
+            for c, value in enumerate(line.split("\t")[:len(keys) - start]):
+                e = self.cells[i + r][keys[start + c]]
+                e.delete(0, "end")
+                e.insert(0, value.strip())
+        return "break"
+
+    def _row_values(self):
+        """[(grid index, {key: text})] for non-blank rows, with fill-down applied."""
+        out, above = [], {}
+        for i, row in enumerate(self.cells):
+            values = {k: e.get().strip() for k, e in row.items()}
+            if not any(values[k] for k in values if k not in FILL_DOWN):
+                continue
+            for k in FILL_DOWN:
+                values[k] = values[k] or above.get(k, "")
+            above = values
+            out.append((i, values))
+        return out
+
+    def save_all(self):
+        rows = self._row_values()
+        for err in self.errors:
+            err.config(text="")
+        for row in self.cells:
+            for e in row.values():
+                e.config(highlightbackground="#E5E7EB")
+
+        entries, bad = [], 0
+        for i, values in rows:
+            entry, error = validate_row(values)
+            if error:
+                bad += 1
+                self.errors[i].config(text=error)
+                for e in self.cells[i].values():
+                    e.config(highlightbackground="#FCA5A5")
+            else:
+                entries.append(entry)
+        if not rows:
+            self.status.config(text="Nothing to save.", fg="#0F172A")
+            return
+        if bad:
+            self.status.config(text=f"{bad} of {len(rows)} rows need fixing — nothing saved.", fg="#DC2626")
+            return
+        try:
+            outbox.enqueue(entries)     # one record: every row or none, one transaction when flushed
+            completions.remember(entries)
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Could not queue the batch.\n\n{e}", parent=self)
+            return
+        self.clear()
+        self.status.config(text=f"Saved {len(entries)} entries.", fg="#15803D")
+
+    def clear(self):
+        for row in self.cells:
+            for e in row.values():
+                e.delete(0, "end")
+                e.config(highlightbackground="#E5E7EB")
+        for err in self.errors:
+            err.config(text="")
+        self.status.config(text="")
+        if self.cells:
+            self.cells[0]["machine_operator"].focus_set()
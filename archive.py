@@ -0,0 +1,301 @@
+# archive.py — move closed months out of the hot DB into per-month partition files
+# Usage:
+#   python -m archive run --keep-months 3 [--vacuum] [--db plant.db]
+#   python -m archive list
+#   from archive import query_range, iter_range
+#   rows = query_range("SELECT * FROM scrap_logs_range ORDER BY day, id", day_from, day_to)
+#   with reader() as conn:
+#       for views in range_views(conn, day_from, day_to):
+#           with views: ...
+#
+# Each partition (archive/scrap_YYYY_MM.db next to the hot file) holds that
+# month's scrap_entries rows with their original ids; dimension names stay in
+# the hot DB. Reads ATTACH only the partitions overlapping the requested day
+# range, read-only, and see them through two TEMP views:
+#   scrap_entries_range — fact rows (dimension ids)
+#   scrap_logs_range    — same columns as the scrap_logs view (names)
+# daily_scrap_facts keeps archived days, so dashboards never touch partitions.
+
+import argparse
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from db import (reader, writer, close_pool, read_only_uri, to_epoch_day, from_epoch_day,
+                DIMENSIONS, FACT_COLUMNS, SCRAP_LOG_COLUMNS)
+import db
+
+KEEP_MONTHS = int(os.getenv("SCRAPSENSE_KEEP_MONTHS", "3"))
+# SQLite's default SQLITE_MAX_ATTACHED is 10; longer ranges are read in spans.
+MAX_ATTACHED = 8
+_MIN_DAY, _MAX_DAY = -(1 << 31), 1 << 31
+
+_FACT_SELECT = ", ".join(("id",) + FACT_COLUMNS)
+_NAMED_SELECT = ", ".join(
+    f"{DIMENSIONS[c][0]}.name AS {c}" if c in DIMENSIONS else f"e.{c}"
+    for c in ("id", *SCRAP_LOG_COLUMNS, "day"))
+_NAMED_JOINS = " ".join(f"JOIN main.{table} {table} ON {table}.id = e.{key}"
+                        for table, key in DIMENSIONS.values())
+
+
+def archive_dir():
+    return os.getenv("SCRAPSENSE_ARCHIVE_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(db.DB_FILE)), "archive")
+
+
+def period_bounds(period):
+    """'YYYY-MM' -> (first epoch day, last epoch day)."""
+    year, month = (int(p) for p in period.split("-"))
+    nxt = date(year + month // 12, month % 12 + 1, 1)
+    return to_epoch_day(date(year, month, 1)), to_epoch_day(nxt) - 1
+
+
+def _period_of(day):
+    return from_epoch_day(day).strftime("%Y-%m")
+
+
+# -----------------
+# WRITE: move a closed month out
+# -----------------
+def closed_periods(conn, keep_months=KEEP_MONTHS, today=None):
+    """Months with hot rows that ended before the last keep_months (+ current) months."""
+    today = today or date.today()
+    months = today.year * 12 + today.month - 1 - keep_months
+    cutoff = to_epoch_day(date(months // 12, months % 12 + 1, 1))
+    first = conn.execute("SELECT MIN(day) FROM scrap_entries WHERE day < ?", (cutoff,)).fetchone()[0]
+    periods = []
+    while first is not None and first < cutoff:
+        period = _period_of(first)
+        periods.append(period)
+        first = conn.execute("SELECT MIN(day) FROM scrap_entries WHERE day > ? AND day < ?",
+                             (period_bounds(period)[1], cutoff)).fetchone()[0]
+    return periods
+
+
+def archive_period(period, directory=None):
+    """
+    Move one month of scrap_entries into its partition file. Rows are copied
+    and committed to the partition first, then deleted from the hot DB in one
+    transaction that also registers the partition; a crash in between only
+    leaves rows that the next run copies again (INSERT OR REPLACE by id).
+    Returns the number of rows moved.
+    """
+    lo, hi = period_bounds(period)
+    directory = directory or archive_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.abspath(os.path.join(directory, f"scrap_{period.replace('-', '_')}.db"))
+
+    with writer() as conn:
+        if conn.in_transaction:
+            conn.commit()
+        max_id = conn.execute("SELECT MAX(id) FROM scrap_entries WHERE day BETWEEN ? AND ?",
+                              (lo, hi)).fetchone()[0]
+        if max_id is None:
+            return 0
+        span = (lo, hi, max_id)
+
+        conn.execute("ATTACH DATABASE ? AS arc", (path,))
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS arc.scrap_entries (
+                    id             INTEGER PRIMARY KEY,
+                    operator_id    INTEGER NOT NULL,
+                    machine_id     INTEGER NOT NULL,
+                    date           TEXT,
+                    day            INTEGER,
+                    quantity       REAL,
+                    unit_id        INTEGER NOT NULL,
+                    shift_id       INTEGER NOT NULL,
+                    reason_id      INTEGER NOT NULL,
+                    comments       TEXT,
+                    total_produced REAL,
+                    entry_type     TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS arc.idx_scrap_entries_day ON scrap_entries (day, id)")
+            conn.execute(f"INSERT OR REPLACE INTO arc.scrap_entries ({_FACT_SELECT}) "
+                         f"SELECT {_FACT_SELECT} FROM main.scrap_entries "
+                         f"WHERE day BETWEEN ? AND ? AND id <= ?", span)
+            total = conn.execute("SELECT COUNT(*) FROM arc.scrap_entries").fetchone()[0]
+            conn.commit()
+        finally:
+            conn.execute("DETACH DATABASE arc")
+
+        # The rollup keeps archived days: the delete trigger subtracts the
+        # moved rows, so add the same totals straight back. The scratch table
+        # outlives a failed run on this connection, so it is emptied, not created.
+        conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS moved_rollup (
+                day INTEGER, machine_id INTEGER, shift_id INTEGER, reason_id INTEGER,
+                quantity REAL, total_produced REAL, entries INTEGER
+            )
+        """)
+        conn.execute("DELETE FROM temp.moved_rollup")
+        conn.execute("""
+            INSERT INTO temp.moved_rollup
+            SELECT day, machine_id, shift_id, reason_id, TOTAL(quantity), TOTAL(total_produced), COUNT(*)
+            FROM scrap_entries
+            WHERE day BETWEEN ? AND ? AND id <= ?
+            GROUP BY 1, 2, 3, 4
+        """, span)
+        moved = conn.execute("DELETE FROM scrap_entries WHERE day BETWEEN ? AND ? AND id <= ?",
+                             span).rowcount
+        conn.execute("""
+            INSERT INTO daily_scrap_facts (day, machine_id, shift_id, reason_id, quantity, total_produced, entries)
+            SELECT day, machine_id, shift_id, reason_id, quantity, total_produced, entries
+            FROM temp.moved_rollup WHERE true
+            ON CONFLICT (day, machine_id, shift_id, reason_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity,
+                total_produced = total_produced + excluded.total_produced,
+                entries = entries + excluded.entries
+        """)
+        conn.execute("DELETE FROM temp.moved_rollup")
+        conn.execute("""
+            INSERT INTO archive_partitions (period, path, day_from, day_to, rows, archived_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (period) DO UPDATE SET
+                path = excluded.path, rows = excluded.rows, archived_at = excluded.archived_at
+        """, (period, path, lo, hi, total, datetime.now().isoformat(timespec="seconds")))
+    return moved
+
+
+def archive_closed(keep_months=KEEP_MONTHS, directory=None, progress=None):
+    """Archive every closed month; returns {period: rows moved}."""
+    with reader() as conn:
+        periods = closed_periods(conn, keep_months)
+    moved = {}
+    for period in periods:
+        moved[period] = archive_period(period, directory)
+        if progress:
+            progress(period, moved[period])
+    return moved
+
+
+# -----------------
+# READ: partition-pruned union views
+# -----------------
+def partitions(conn, day_from=None, day_to=None):
+    """Registered partitions overlapping [day_from, day_to] (None = open), oldest first."""
+    lo = _MIN_DAY if day_from is None else day_from
+    hi = _MAX_DAY if day_to is None else day_to
+    return conn.execute("""
+        SELECT period, path, day_from, day_to, rows FROM archive_partitions
+        WHERE day_to >= ? AND day_from <= ? ORDER BY day_from
+    """, (lo, hi)).fetchall()
+
+
+def _spans(parts, lo, hi):
+    """Split [lo, hi] into consecutive ranges needing at most MAX_ATTACHED partitions each."""
+    spans, start = [], lo
+    for i in range(0, len(parts), MAX_ATTACHED):
+        group = parts[i:i + MAX_ATTACHED]
+        last = i + MAX_ATTACHED >= len(parts)
+        end = hi if last else min(hi, group[-1]["day_to"])
+        spans.append((start, end, group))
+        start = end + 1
+    return spans or [(lo, hi, [])]
+
+
+@contextmanager
+def _range_views(conn, lo, hi, parts, with_null=False):
+    attached = []
+    try:
+        for i, part in enumerate(parts):
+            conn.execute(f"ATTACH DATABASE ? AS arc{i}", (read_only_uri(part["path"]),))
+            attached.append(f"arc{i}")
+        where = f"day BETWEEN {int(lo)} AND {int(hi)}"
+        hot = f"({where} OR day IS NULL)" if with_null else where
+        selects = [f"SELECT {_FACT_SELECT} FROM main.scrap_entries WHERE {hot}"]
+        selects += [f"SELECT {_FACT_SELECT} FROM {name}.scrap_entries WHERE {where}" for name in attached]
+        conn.execute("CREATE TEMP VIEW scrap_entries_range AS " + " UNION ALL ".join(selects))
+        conn.execute(f"CREATE TEMP VIEW scrap_logs_range AS "
+                     f"SELECT {_NAMED_SELECT} FROM scrap_entries_range e {_NAMED_JOINS}")
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute("DROP VIEW IF EXISTS temp.scrap_logs_range")
+        conn.execute("DROP VIEW IF EXISTS temp.scrap_entries_range")
+        for name in attached:
+            conn.execute(f"DETACH DATABASE {name}")
+
+
+def range_views(conn, day_from=None, day_to=None):
+    """
+    Context managers, one per span in chronological order, each setting up
+    scrap_entries_range / scrap_logs_range on conn for the duration.
+    """
+    lo = _MIN_DAY if day_from is None else day_from
+    hi = _MAX_DAY if day_to is None else day_to
+    for n, (span_lo, span_hi, group) in enumerate(_spans(partitions(conn, lo, hi), lo, hi)):
+        # Rows without a parseable date only show up in open-ended ("All Data") reads
+        yield _range_views(conn, span_lo, span_hi, group, with_null=(day_from is None and n == 0))
+
+
+def query_range(sql, day_from=None, day_to=None, params=(), conn=None):
+    """
+    Run sql (written against scrap_logs_range / scrap_entries_range) over the
+    hot DB plus only the partitions the day range needs. Longer ranges run once
+    per span in chronological order, so ORDER BY day keeps the overall order.
+    conn: a reader the caller already holds (instead of borrowing another).
+    """
+    if conn is None:
+        with reader() as conn:
+            return query_range(sql, day_from, day_to, params, conn)
+    rows = []
+    for views in range_views(conn, day_from, day_to):
+        with views:
+            rows.extend(conn.execute(sql, params).fetchall())
+    return rows
+
+
+def iter_range(sql, day_from=None, day_to=None, params=(), chunk=10_000):
+    """query_range as a stream: rows are fetched chunk at a time, never all at once."""
+    with reader() as conn:
+        for views in range_views(conn, day_from, day_to):
+            with views:
+                cur = conn.execute(sql, params)
+                try:
+                    while True:
+                        rows = cur.fetchmany(chunk)
+                        if not rows:
+                            break
+                        yield from rows
+                finally:
+                    cur.close()     # an open statement would block DETACH
+
+
+# -----------------
+# CLI
+# -----------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m archive",
+                                 description="Move closed months into per-month archive databases.")
+    ap.add_argument("command", choices=["run", "list"])
+    ap.add_argument("--keep-months", type=int, default=KEEP_MONTHS,
+                    help="full months kept hot besides the current one")
+    ap.add_argument("--dir", help="partition directory (default: archive/ next to the DB)")
+    ap.add_argument("--vacuum", action="store_true", help="VACUUM the hot DB afterwards")
+    ap.add_argument("--db", help=f"database file (default: {db.DB_FILE})")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_FILE = args.db
+    if args.command == "run":
+        moved = archive_closed(args.keep_months, args.dir,
+                               progress=lambda p, n: print(f"{p}: {n:,} rows archived"))
+        print(f"Archived {sum(moved.values()):,} rows from {len(moved)} month(s).")
+        if args.vacuum and moved:
+            with writer() as conn:
+                conn.commit()
+                conn.execute("VACUUM")
+    with reader() as conn:
+        for p in partitions(conn):
+            print(f"{p['period']}  {p['rows']:>10,} rows  {p['path']}")
+    close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# backtest.py — rolling-origin accuracy of every forecast model, per machine x shift
+# Usage:
+#   python -m backtest [--db plant.db] [--horizon 7] [--origins 8] [--workers 4]
+#   python -m backtest --models linear holt_winters --csv backtest.csv
+#   from backtest import load_series, backtest
+#
+# Every machine x shift daily series goes in one dense (series x day) matrix,
+# grouped in NumPy from the memory-mapped columnar snapshot (snapshot.py), so
+# a run reads only the rows added since the last one from SQLite. For each
+# origin (the last day of training, stepped back from the end of the data)
+# every model forecasts the next horizon days from the history up to the
+# origin, and the forecasts are scored against what actually happened. Work is split into (model, origin, block of series)
+# tasks across a ProcessPoolExecutor. The matrix is copied once into shared
+# memory, which every worker maps, so tasks only carry a few integers and
+# return per-series error sums.
+#
+# Metrics, pooled over origins and series:
+#   MAPE      mean |error| / actual over days with scrap (zero days skipped)
+#   MASE      forecast MAE / in-sample MAE of a weekly naive forecast
+#   coverage  share of actuals inside the forecast band (target: ci width)
+#   risk      share of next-day risk buckets (risk thresholds) forecast right
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import db
+import snapshot
+from forecast import MODELS, RISK_THRESHOLDS, SEASON, forecast_batch, pivot_series
+
+HORIZON = 7
+ORIGINS = 8
+STEP = 7              # days between origins
+MIN_TRAIN = 4 * SEASON
+BLOCK_ROWS = 256      # series per task
+
+
+def load_series(days=None):
+    """
+    (keys, first day, Y): daily scrap quantity per (machine, shift) from the
+    columnar snapshot, one row per series; days keeps only the last days of
+    data. Rows without a day are left out, as in the daily rollup.
+    """
+    cols = snapshot.columns()
+    day = cols["day"]
+    keep = day != snapshot.NULL_DAY
+    if not keep.any():
+        return [], None, np.zeros((0, 0))
+    if days:
+        keep &= day > day[keep].max() - days
+    keys, first, Y = pivot_series([cols["machine_id"][keep], cols["shift_id"][keep]], day[keep],
+                                  np.nan_to_num(cols["quantity"][keep]))
+    order = sorted(range(len(keys)), key=keys.__getitem__)     # by (machine, shift) id, as before
+    keys, Y = [keys[i] for i in order], Y[order]
+    with db.reader() as conn:
+        names = {col: dict(conn.execute(f"SELECT id, name FROM {db.DIMENSIONS[col][0]}").fetchall())
+                 for col in ("machine_name", "shift")}
+    keys = [(names["machine_name"].get(m) or "Unknown", names["shift"].get(s) or "") for m, s in keys]
+    return keys, first, Y
+
+
+def origins(n, horizon=HORIZON, count=ORIGINS, step=STEP, min_train=MIN_TRAIN):
+    """Training lengths to forecast from, oldest first; each leaves horizon days to score."""
+    last = n - horizon
+    return [o for o in range(last - (count - 1) * step, last + 1, step) if o >= min_train]
+
+
+# -----------------
+# WORKERS
+# -----------------
+_shared = {}          # in each worker: the mapped segment and the matrix view
+
+
+def _attach(name, shape):
+    shm = shared_memory.SharedMemory(name=name)
+    _shared.update(shm=shm, Y=np.ndarray(shape, dtype=np.float64, buffer=shm.buf))
+
+
+def _score(model, origin, lo, hi, horizon, ci, thresholds):
+    """Error sums for series lo..hi forecast by model from the first origin days."""
+    start = time.perf_counter()
+    Y = _shared["Y"][lo:hi]
+    train, actual = Y[:, :origin], Y[:, origin:origin + horizon]
+    out = forecast_batch(train, model, periods_ahead=horizon, ci=ci)
+    pred = out["future_pred"]
+    err = np.abs(pred - actual)
+    scrap = actual > 0
+    naive = np.abs(train[:, SEASON:] - train[:, :-SEASON]).mean(axis=1)
+    bucket_pred = np.digitize(pred[:, 0], thresholds)
+    bucket_actual = np.digitize(actual[:, 0], thresholds)
+    return dict(
+        model=model, lo=lo, hi=hi,
+        abs_err=err.sum(axis=1),
+        ape=np.where(scrap, err / np.where(scrap, actual, 1), 0).sum(axis=1),
+        ape_n=scrap.sum(axis=1),
+        scaled=np.where(naive > 0, err.mean(axis=1) / np.where(naive > 0, naive, 1), 0),
+        scaled_n=(naive > 0).astype(int),
+        covered=((actual >= out["future_lower"]) & (actual <= out["future_upper"])).sum(axis=1),
+        risk_hit=(bucket_pred == bucket_actual).astype(int),
+        seconds=time.perf_counter() - start,
+    )
+
+
+def backtest(Y, models=None, horizon=HORIZON, origin_count=ORIGINS, step=STEP, ci=(10, 90),
+             thresholds=RISK_THRESHOLDS, workers=None, block_rows=BLOCK_ROWS):
+    """
+    {model: {metric: per-series array, "seconds": worker time}} over every
+    origin. workers=0 runs in this process.
+    """
+    models = list(models or MODELS)
+    rows, n = Y.shape
+    starts = origins(n, horizon, origin_count, step)
+    if not starts or not rows:
+        raise ValueError(f"Need at least {MIN_TRAIN + horizon} days of data to backtest, have {n}")
+    tasks = [(m, o, lo, min(lo + block_rows, rows), horizon, ci, thresholds)
+             for m in models for o in starts for lo in range(0, rows, block_rows)]
+
+    totals = {m: {"origins": len(starts), "seconds": 0.0} for m in models}
+
+    def add(part):
+        acc = totals[part["model"]]
+        for metric, values in part.items():
+            if isinstance(values, np.ndarray):
+                acc.setdefault(metric, np.zeros(rows))[part["lo"]:part["hi"]] += values
+        acc["seconds"] += part["seconds"]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(Y.nbytes, 1))
+    try:
+        np.ndarray(Y.shape, dtype=np.float64, buffer=shm.buf)[:] = Y
+        if workers == 0:
+            _attach(shm.name, Y.shape)
+            for task in tasks:
+                add(_score(*task))
+            _shared.pop("Y")
+            _shared.pop("shm").close()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                     initargs=(shm.name, Y.shape)) as pool:
+                for part in pool.map(_score, *zip(*tasks), chunksize=max(1, len(tasks) // 64)):
+                    add(part)
+    finally:
+        shm.close()
+        shm.unlink()
+    return totals
+
+
+def summarize(totals, horizon=HORIZON):
+    """[(model, MAPE, MASE, coverage, risk accuracy, worker seconds)] pooled over series and origins."""
+    out = []
+    for model, acc in totals.items():
+        ape_n, scaled_n = acc["ape_n"].sum(), acc["scaled_n"].sum()
+        points = acc["origins"] * horizon * len(acc["abs_err"])
+        out.append((model,
+                    acc["ape"].sum() / ape_n if ape_n else float("nan"),
+                    acc["scaled"].sum() / scaled_n if scaled_n else float("nan"),
+                    acc["covered"].sum() / points if points else float("nan"),
+                    acc["risk_hit"].sum() / (acc["origins"] * len(acc["risk_hit"])),
+                    acc["seconds"]))
+    return out
+
+
+def write_csv(path, keys, totals, horizon=HORIZON):
+    """One row per model x machine x shift."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["model", "machine", "shift", "mae", "mape", "mase", "coverage"])
+        for model, acc in totals.items():
+            points = acc["origins"] * horizon
+            for i, (machine, shift) in enumerate(keys):
+                w.writerow([model, machine, shift,
+                            round(acc["abs_err"][i] / points, 3),
+                            round(acc["ape"][i] / acc["ape_n"][i], 4) if acc["ape_n"][i] else "",
+                            round(acc["scaled"][i] / acc["scaled_n"][i], 4) if acc["scaled_n"][i] else "",
+                            round(acc["covered"][i] / points, 4)])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m backtest",
+                                 description="Rolling-origin backtest of the forecast models per machine x shift.")
+    ap.add_argument("--db", help=f"database file (default: {db.DB_FILE})")
+    ap.add_argument("--models", nargs="+", choices=list(MODELS), help="default: every registered model")
+    ap.add_argument("--horizon", type=int, default=HORIZON, help="days forecast from each origin")
+    ap.add_argument("--origins", type=int, default=ORIGINS, help="forecast origins per series")
+    ap.add_argument("--step", type=int, default=STEP, help="days between origins")
+    ap.add_argument("--days", type=int, default=365, help="history used, counted back from the last day (0: all)")
+    ap.add_argument("--ci", type=float, nargs=2, default=(10, 90), metavar=("LO", "HI"), help="band percentiles")
+    ap.add_argument("--workers", type=int, help="processes (default: CPU count; 0 runs in this process)")
+    ap.add_argument("--csv", help="also write per machine x shift metrics here")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_FILE = args.db
+    keys, _, Y = load_series(args.days or None)
+    db.close_pool()
+    print(f"{len(keys):,} series x {Y.shape[1]:,} days, {args.origins} origins every {args.step} days, "
+          f"horizon {args.horizon}")
+    start = time.perf_counter()
+    try:
+        totals = backtest(Y, args.models, args.horizon, args.origins, args.step, tuple(args.ci),
+                          workers=args.workers)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    wall = time.perf_counter() - start
+
+    width = args.ci[1] - args.ci[0]
+    print(f"\n{'model':<15} {'MAPE':>8} {'MASE':>7} {'coverage':>9} {'risk':>7} {'cpu s':>7}   (coverage target {width:.0f}%)")
+    for model, mape, mase, cover, risk, seconds in sorted(summarize(totals, args.horizon), key=lambda r: r[2]):
+        print(f"{model:<15} {mape:>8.1%} {mase:>7.3f} {cover:>9.1%} {risk:>7.1%} {seconds:>7.2f}")
+    print(f"\n{wall:.2f} s wall, workers={args.workers if args.workers is not None else os.cpu_count()}")
+    if args.csv:
+        write_csv(args.csv, keys, totals, args.horizon)
+        print(f"Wrote {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+# completions.py — in-memory prefix index + autocomplete dropdown for name fields
+# Usage:
+#   completions.complete("machine_operator", "jo")   # ["John Doe", "Jordan Lee"]
+#   completions.attach(entry, "machine_name", on_pick=lambda name: ...)   # Tk Entry
+#
+# Each facet's distinct names are read once from its dimension table into a
+# sorted list; a completion is two bisects, never a query. New names are
+# picked up incrementally (rows with id > the last one loaded) after a commit
+# in this process or every REFRESH_S seconds, whichever comes first.
+
+import bisect
+import threading
+import time
+import tkinter as tk
+
+import db
+
+REFRESH_S = 30
+LIMIT = 8
+
+
+class PrefixIndex:
+    """Sorted, case-insensitive prefix lookup over distinct names."""
+
+    def __init__(self, names=()):
+        self._keys = []         # casefolded, sorted
+        self._names = []        # original spelling, same order
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        name = (name or "").strip()
+        if not name:
+            return
+        key = name.casefold()
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return
+        self._keys.insert(i, key)
+        self._names.insert(i, name)
+
+    def complete(self, prefix, limit=LIMIT):
+        key = prefix.strip().casefold()
+        if not key:
+            return []
+        i = bisect.bisect_left(self._keys, key)
+        j = bisect.bisect_left(self._keys, key + "\U0010ffff", i)
+        return self._names[i:min(j, i + limit)]
+
+    def lookup(self, name):
+        """Stored spelling of name (case-insensitive), or None."""
+        key = (name or "").strip().casefold()
+        i = bisect.bisect_left(self._keys, key)
+        return self._names[i] if key and i < len(self._keys) and self._keys[i] == key else None
+
+    def __len__(self):
+        return len(self._keys)
+
+
+_lock = threading.Lock()
+_indexes = {}           # facet -> [PrefixIndex, last dimension id loaded, loaded at]
+_dirty = set()
+
+
+def _index(facet):
+    with _lock:
+        entry = _indexes.get(facet)
+        stale = entry is None or facet in _dirty or time.monotonic() - entry[2] > REFRESH_S
+        if stale:
+            table = db.DIMENSIONS[facet][0]
+            index, last = entry[:2] if entry else (PrefixIndex(), 0)
+            with db.reader() as conn:
+                for key, name in conn.execute(f"SELECT id, name FROM {table} WHERE id > ? ORDER BY id", (last,)):
+                    index.add(name)
+                    last = key
+            _indexes[facet] = entry = [index, last, time.monotonic()]
+            _dirty.discard(facet)
+        return entry[0]
+
+
+def complete(facet, prefix, limit=LIMIT):
+    return _index(facet).complete(prefix, limit)
+
+
+def lookup(facet, name):
+    return _index(facet).lookup(name)
+
+
+def remember(entries):
+    """Add names from entries that are queued but not written yet (outbox)."""
+    with _lock:
+        for facet, entry in _indexes.items():
+            for e in entries:
+                entry[0].add(e.get(facet))
+
+
+def _on_commit():
+    # no _lock: the first reader() inside _index may run migrations, which commit
+    _dirty.update(list(_indexes))
+
+
+db.on_commit(_on_commit)
+
+
+# -----------------
+# Tk: dropdown under an Entry
+# -----------------
+class Autocomplete:
+    def __init__(self, entry, facet, on_pick=None, ignore=()):
+        self.entry = entry
+        self.facet = facet
+        self.on_pick = on_pick
+        self.ignore = set(ignore)       # placeholder texts
+        self.popup = None
+        self.listbox = None
+        entry.bind("<KeyRelease>", self._on_key, add="+")
+        entry.bind("<Down>", self._focus_list, add="+")
+        entry.bind("<Escape>", lambda e: self.hide(), add="+")
+        entry.bind("<FocusOut>", lambda e: entry.after(150, self._hide_unless_focused), add="+")
+
+    def _on_key(self, event):
+        if event.keysym in ("Down", "Up", "Return", "Escape", "Tab"):
+            return
+        text = self.entry.get()
+        names = [] if text in self.ignore else complete(self.facet, text)
+        if not names or (len(names) == 1 and names[0] == text.strip()):
+            self.hide()
+        else:
+            self.show(names)
+
+    def show(self, names):
+        if self.popup is None:
+            self.popup = tk.Toplevel(self.entry)
+            self.popup.wm_overrideredirect(True)
+            self.listbox = tk.Listbox(self.popup, font=("Segoe UI", 10), activestyle="none",
+                                      relief="flat", highlightthickness=1, highlightbackground="#CBD5E1")
+            self.listbox.pack(fill="both", expand=True)
+            self.listbox.bind("<ButtonRelease-1>", self._pick)
+            self.listbox.bind("<Return>", self._pick)
+            self.listbox.bind("<Escape>", lambda e: (self.hide(), self.entry.focus_set()))
+        self.listbox.delete(0, "end")
+        for name in names:
+            self.listbox.insert("end", name)
+        self.listbox.config(height=len(names))
+        x = self.entry.winfo_rootx()
+        y = self.entry.winfo_rooty() + self.entry.winfo_height()
+        self.popup.wm_geometry(f"{max(self.entry.winfo_width(), 160)}x{self.listbox.winfo_reqheight()}+{x}+{y}")
+        self.popup.lift()
+
+    def hide(self):
+        if self.popup is not None:
+            self.popup.destroy()
+            self.popup = self.listbox = None
+
+    def _hide_unless_focused(self):
+        if self.listbox is None or self.entry.focus_get() is not self.listbox:
+            self.hide()
+
+    def _focus_list(self, event):
+        if self.listbox is not None:
+            self.listbox.focus_set()
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+            return "break"
+
+    def _pick(self, _event=None):
+        sel = self.listbox.curselection() if self.listbox is not None else ()
+        if not sel:
+            return
+        name = self.listbox.get(sel[0])
+        self.hide()
+        self.entry.delete(0, "end")
+        self.entry.insert(0, name)
+        self.entry.config(fg="black")
+        self.entry.focus_set()
+        self.entry.icursor("end")
+        if self.on_pick:
+            self.on_pick(name)
+
+
+def attach(entry, facet, on_pick=None, ignore=()):
+    """Give entry a dropdown of known facet names as the user types."""
+    entry._autocomplete = Autocomplete(entry, facet, on_pick, ignore)
+    return entry._autocomplete
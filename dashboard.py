@@ -1,8 +1,11 @@
 import tkinter as tk
 from PIL import Image, ImageTk
-from datetime import datetime
+from datetime import datetime, date
+import calendar
 import os
 
+from db import reader, to_epoch_day
+
 BASE_DIR = os.path.dirname(__file__)
 IMAGE_DIR = os.path.join(BASE_DIR, "images")
 
@@ -52,10 +55,11 @@ class DashboardFrame(tk.Frame):
         kpi_frame = tk.Frame(self, bg="#E6EBEF")
         kpi_frame.pack(pady=(0, int(40 * self.scale_y)))
 
-        self.create_kpi_card(kpi_frame, "reduce-cost.png", "Today's Scrap", "120 lbs", "#F6A96D", 0)
+        kpi = self.kpi_values()
+        self.create_kpi_card(kpi_frame, "reduce-cost.png", "Today's Scrap", kpi["today"], "#F6A96D", 0)
         self.create_kpi_card(kpi_frame, "dollar-sign.png", "This Week's Scrap Cost", "$4,200", "#86EFAC", 1)
-        self.create_kpi_card(kpi_frame, "warning-triangle.png", "Top Cause", "Machine Misalign", "#FF7F7F", 2)
-        self.create_kpi_card(kpi_frame, "predictive-chart.png", "Predicted End-of-Month", "3,200 lbs", "#7DD3FC", 3)
+        self.create_kpi_card(kpi_frame, "warning-triangle.png", "Top Cause", kpi["top_cause"], "#FF7F7F", 2)
+        self.create_kpi_card(kpi_frame, "predictive-chart.png", "Predicted End-of-Month", kpi["month_end"], "#7DD3FC", 3)
 
         # Button cards
         button_frame = tk.Frame(self, bg="#E6EBEF")
@@ -66,6 +70,37 @@ class DashboardFrame(tk.Frame):
         self.create_button_card(button_frame, "View Scrap Logs", "doc.png", 1, 0)
         self.create_button_card(button_frame, "Generate Report", "report-card.png", 1, 1)
 
+    def kpi_values(self):
+        """KPI card values from the daily_scrap rollup (a few hundred rows per month)."""
+        today = date.today()
+        t = to_epoch_day(today)
+        first = to_epoch_day(today.replace(day=1))
+        days_in_month = calendar.monthrange(today.year, today.month)[1]
+        try:
+            with reader() as conn:
+                today_qty = conn.execute(
+                    "SELECT COALESCE(SUM(quantity), 0) FROM daily_scrap_facts WHERE day = ?", (t,)).fetchone()[0]
+                mtd = conn.execute(
+                    "SELECT COALESCE(SUM(quantity), 0) FROM daily_scrap_facts WHERE day BETWEEN ? AND ?",
+                    (first, t)).fetchone()[0]
+                recent = conn.execute(
+                    "SELECT COALESCE(SUM(quantity), 0) FROM daily_scrap_facts WHERE day BETWEEN ? AND ?",
+                    (t - 13, t)).fetchone()[0]
+                top = conn.execute("""
+                    SELECT r.name FROM daily_scrap_facts d JOIN dim_reason r ON r.id = d.reason_id
+                    WHERE d.day BETWEEN ? AND ? AND r.name <> ''
+                    GROUP BY d.reason_id ORDER BY SUM(d.quantity) DESC LIMIT 1
+                """, (t - 29, t)).fetchone()
+        except Exception:
+            return {"today": "—", "top_cause": "—", "month_end": "—"}
+        # Month-to-date plus the last two weeks' daily average for the remaining days
+        month_end = mtd + (recent / 14) * (days_in_month - today.day)
+        return {
+            "today": f"{today_qty:,.0f} lbs",
+            "top_cause": top[0] if top else "—",
+            "month_end": f"{month_end:,.0f} lbs",
+        }
+
     def update_time(self):
         now = datetime.now()
         self.time_label.config(text=now.strftime("%A, %B %d, %Y  %I:%M:%S %p"))
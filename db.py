@@ -1,27 +1,249 @@
 # db.py — single source of truth for SQLite demo DB (recruiter-friendly)
 # Usage:
-#   from db import get_db_connection, ensure_demo_data, has_column
-#   conn = get_db_connection(); ensure_demo_data(conn)
+#   from db import reader, writer, ensure_demo_data, has_column
+#   with reader() as conn: conn.execute("SELECT ...")
+#   with writer() as conn: conn.execute("INSERT ...")   # commits on exit
 
 import os
+import atexit
+import json
+import queue
 import sqlite3
-from datetime import datetime, timedelta
+import threading
+import time
+from itertools import islice
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
 import random
 
 DB_FILE = os.getenv("SCRAPSENSE_DB", "scrapsense_demo.db")
 
-def get_db_connection():
-    """Return a sqlite3 connection with Row factory for dict-like access."""
-    conn = sqlite3.connect(DB_FILE)
+# Pool sizing / tuning (override via env on slow or shared stations)
+READER_COUNT = int(os.getenv("SCRAPSENSE_DB_READERS", "4"))
+BUSY_TIMEOUT_MS = int(os.getenv("SCRAPSENSE_DB_BUSY_MS", "5000"))
+MMAP_SIZE = 256 * 1024 * 1024   # bytes
+CACHE_SIZE_KB = 32 * 1024       # negative cache_size == KiB
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA mmap_size={MMAP_SIZE}",
+    f"PRAGMA cache_size=-{CACHE_SIZE_KB}",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def _open_connection(path):
+    # uri=True so archive partitions can be ATTACHed read-only ("file:...?mode=ro")
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False, uri=True)
     conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+
+# jobs.py sets .job on its worker threads; readers borrowed there are
+# registered with that job so cancelling it can interrupt their queries.
+job_context = threading.local()
+
+
+class ConnectionPool:
+    """
+    One long-lived writer connection plus a few reader connections.
+    WAL lets readers run while the writer commits, so a report query never
+    blocks an Add Scrap click (and vice versa). Pragmas are applied once at open.
+    """
+
+    def __init__(self, path=None, readers=READER_COUNT):
+        self.path = path or DB_FILE
+        self.max_readers = max(1, readers)
+        self._writer = _open_connection(self.path)
+        self._writer_lock = threading.RLock()
+        self._writer_depth = 0
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._open_lock = threading.Lock()
+        self._closed = False
+
+    def _borrow_reader(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._open_lock:
+            if self._opened < self.max_readers:
+                self._opened += 1
+                return _open_connection(self.path)
+        return self._idle.get()
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read connection; always returned to the pool afterwards."""
+        conn = self._borrow_reader()
+        job = getattr(job_context, "job", None)
+        if job is not None:
+            job.watch(conn)     # lets a superseded background job interrupt() it
+        try:
+            yield conn
+        finally:
+            if job is not None:
+                job.unwatch(conn)
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    @contextmanager
+    def writer(self):
+        """
+        Exclusive access to the single writer. Commits when the outermost
+        block exits cleanly, rolls back on error. Re-entrant per thread.
+        """
+        with self._writer_lock:
+            self._writer_depth += 1
+            try:
+                yield self._writer
+                if self._writer_depth == 1:
+                    self._writer.commit()
+                    _notify_commit()
+            except BaseException:
+                if self._writer_depth == 1:
+                    self._writer.rollback()
+                    _dim_cache.clear()
+                raise
+            finally:
+                self._writer_depth -= 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        with self._writer_lock:
+            self._writer.close()
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide pool, opened lazily on first use (runs pending migrations)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = ConnectionPool(DB_FILE)
+                with pool.writer() as conn:
+                    migrate(conn)
+                _pool = pool
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            with _pool.writer() as conn:
+                conn.execute("PRAGMA optimize")
+            _pool.close()
+            _pool = None
+        _dim_cache.clear()
+
+
+atexit.register(close_pool)
+
+
+def reader():
+    return get_pool().reader()
+
+
+def writer():
+    return get_pool().writer()
+
+
+_commit_listeners = []
+
+def on_commit(callback):
+    """Call callback() after every committed writer() block in this process."""
+    _commit_listeners.append(callback)
+
+def _notify_commit():
+    for callback in _commit_listeners:
+        callback()
+
+
+def get_db_connection():
+    """
+    Return a standalone sqlite3 connection (Row factory, same pragmas as the pool).
+    Prefer reader()/writer() inside the app; this is for scripts and one-offs.
+    """
+    return _open_connection(DB_FILE)
+
+# -----------------
+# DATES — scrap_logs.date keeps whatever text the user typed; scrap_logs.day
+# is the canonical integer epoch-day every range query runs on.
+# -----------------
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y")
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def parse_date(value):
+    """Parse ISO or MM/DD/YYYY (also tkcalendar's M/D/YY) text; None if blank/invalid."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def to_epoch_day(value):
+    d = parse_date(value)
+    return None if d is None else d.toordinal() - _EPOCH_ORDINAL
+
+def from_epoch_day(day: int) -> date:
+    return date.fromordinal(int(day) + _EPOCH_ORDINAL)
+
+# Legacy rows whose date text never parsed keep day NULL. Keyset paging
+# compares against the last key seen, and "day < NULL" matches nothing, so
+# every sort on day goes through day_key(): NULL days sort as NULL_DAY,
+# below any real day (indexed by migration 13).
+NULL_DAY = -(1 << 31)
+
+def day_key(alias="s"):
+    return f"COALESCE({alias}.day, {NULL_DAY})"
+
 def has_column(conn, table_name: str, column_name: str) -> bool:
     """Cross-DB-ish helper used by generate_report/view files."""
     cur = conn.execute(f"PRAGMA table_info({table_name})")
     cols = {row["name"] for row in cur.fetchall()}
     return column_name in cols
 
+# -----------------
+# SCHEMA MIGRATIONS (tracked through PRAGMA user_version)
+# -----------------
+SCRAP_LOG_COLUMNS = {
+    "machine_operator": "TEXT",
+    "machine_name": "TEXT",
+    "date": "TEXT",
+    "quantity": "REAL",
+    "unit": "TEXT",
+    "shift": "TEXT",
+    "reason": "TEXT",
+    "comments": "TEXT",
+    "total_produced": "REAL",
+    "entry_type": "TEXT",
+}
+
 def _create_schema(conn):
     conn.execute("""
         CREATE TABLE IF NOT EXISTS scrap_logs (
@@ -38,7 +260,919 @@ def _create_schema(conn):
             entry_type       TEXT
         );
     """)
-    conn.commit()
+    # Older files (e.g. sample_data.db) were created without some columns.
+    for name, decl in SCRAP_LOG_COLUMNS.items():
+        if not has_column(conn, "scrap_logs", name):
+            conn.execute(f"ALTER TABLE scrap_logs ADD COLUMN {name} {decl}")
+
+def _create_access_indexes(conn):
+    # Report scan: WHERE date BETWEEN .. ORDER BY date, id — covering, so the
+    # table itself is never touched. It also serves every plain date filter.
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_scrap_logs_date_report ON scrap_logs (
+            date, id, machine_operator, machine_name, quantity, unit, shift, reason
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scrap_logs_machine_date "
+                 "ON scrap_logs (machine_name, date, quantity)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scrap_logs_shift_date "
+                 "ON scrap_logs (shift, date, quantity)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scrap_logs_operator "
+                 "ON scrap_logs (machine_operator)")
+
+BACKFILL_BATCH = 5000
+
+def _add_epoch_day(conn):
+    if not has_column(conn, "scrap_logs", "day"):
+        conn.execute("ALTER TABLE scrap_logs ADD COLUMN day INTEGER")
+    # Stream the backfill in id-ordered batches so memory stays flat on big files.
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            "SELECT id, date FROM scrap_logs WHERE id > ? AND day IS NULL ORDER BY id LIMIT ?",
+            (last_id, BACKFILL_BATCH),
+        ).fetchall()
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        updates = [(to_epoch_day(d), rid) for rid, d in batch]
+        conn.executemany("UPDATE scrap_logs SET day = ? WHERE id = ?",
+                         [u for u in updates if u[0] is not None])
+    # Range filters now seek on day; the text-date indexes are dead weight.
+    conn.execute("DROP INDEX IF EXISTS idx_scrap_logs_date_report")
+    conn.execute("DROP INDEX IF EXISTS idx_scrap_logs_machine_date")
+    conn.execute("DROP INDEX IF EXISTS idx_scrap_logs_shift_date")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_scrap_logs_day_report ON scrap_logs (
+            day, id, machine_operator, machine_name, quantity, unit, shift, reason
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scrap_logs_machine_day "
+                 "ON scrap_logs (machine_name, day, quantity)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scrap_logs_shift_day "
+                 "ON scrap_logs (shift, day, quantity)")
+
+def _create_ingest_checkpoints(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+            source     TEXT PRIMARY KEY,
+            rows_done  INTEGER NOT NULL,   -- source records consumed (kept + rejected)
+            updated_at TEXT
+        )
+    """)
+
+# daily_scrap: one row per (day, machine, shift, reason), kept current by
+# triggers so dashboards/reports aggregate thousands of rows, not millions.
+ROLLUP_KEY = ("machine_name", "shift", "reason")
+_ROLLUP_ADD = """
+    INSERT INTO daily_scrap (day, machine_name, shift, reason, quantity, total_produced, entries)
+    SELECT {r}.day, COALESCE({r}.machine_name, ''), COALESCE({r}.shift, ''), COALESCE({r}.reason, ''),
+           COALESCE({r}.quantity, 0), COALESCE({r}.total_produced, 0), 1
+    WHERE {r}.day IS NOT NULL
+    ON CONFLICT (day, machine_name, shift, reason) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        total_produced = total_produced + excluded.total_produced,
+        entries = entries + 1;
+"""
+_ROLLUP_SUB = """
+    UPDATE daily_scrap SET
+        quantity = quantity - COALESCE(old.quantity, 0),
+        total_produced = total_produced - COALESCE(old.total_produced, 0),
+        entries = entries - 1
+    WHERE day = old.day AND machine_name = COALESCE(old.machine_name, '')
+      AND shift = COALESCE(old.shift, '') AND reason = COALESCE(old.reason, '');
+    DELETE FROM daily_scrap
+    WHERE day = old.day AND machine_name = COALESCE(old.machine_name, '')
+      AND shift = COALESCE(old.shift, '') AND reason = COALESCE(old.reason, '')
+      AND entries <= 0;
+"""
+
+def _fill_daily_scrap_v5(conn):
+    conn.execute("DELETE FROM daily_scrap")
+    conn.execute("""
+        INSERT INTO daily_scrap (day, machine_name, shift, reason, quantity, total_produced, entries)
+        SELECT day, COALESCE(machine_name, ''), COALESCE(shift, ''), COALESCE(reason, ''),
+               TOTAL(quantity), TOTAL(total_produced), COUNT(*)
+        FROM scrap_logs
+        WHERE day IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    """)
+
+def _create_daily_rollup(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_scrap (
+            day            INTEGER NOT NULL,
+            machine_name   TEXT NOT NULL,
+            shift          TEXT NOT NULL,
+            reason         TEXT NOT NULL,
+            quantity       REAL NOT NULL,
+            total_produced REAL NOT NULL,
+            entries        INTEGER NOT NULL,
+            PRIMARY KEY (day, machine_name, shift, reason)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_scrap_logs_rollup_ins AFTER INSERT ON scrap_logs
+        BEGIN {_ROLLUP_ADD.format(r="new")} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_scrap_logs_rollup_del AFTER DELETE ON scrap_logs
+        BEGIN {_ROLLUP_SUB} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_scrap_logs_rollup_upd
+        AFTER UPDATE OF day, machine_name, shift, reason, quantity, total_produced ON scrap_logs
+        BEGIN {_ROLLUP_SUB} {_ROLLUP_ADD.format(r="new")} END
+    """)
+    _fill_daily_scrap_v5(conn)
+
+# scrap_logs_fts: external-content FTS5 index (trigram => substring search).
+SEARCH_COLUMNS = ("machine_operator", "machine_name", "reason", "comments")
+
+def rebuild_search_index(conn):
+    conn.execute("INSERT INTO scrap_logs_fts (scrap_logs_fts) VALUES ('rebuild')")
+
+def _create_search_index(conn):
+    cols = ", ".join(SEARCH_COLUMNS)
+    new_vals = ", ".join(f"new.{c}" for c in SEARCH_COLUMNS)
+    old_vals = ", ".join(f"old.{c}" for c in SEARCH_COLUMNS)
+    try:
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS scrap_logs_fts USING fts5(
+                {cols}, content='scrap_logs', content_rowid='id', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5/trigram (< 3.34): search falls back to LIKE.
+        return
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_scrap_logs_fts_ins AFTER INSERT ON scrap_logs BEGIN
+            INSERT INTO scrap_logs_fts (rowid, {cols}) VALUES (new.id, {new_vals});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_scrap_logs_fts_del AFTER DELETE ON scrap_logs BEGIN
+            INSERT INTO scrap_logs_fts (scrap_logs_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_scrap_logs_fts_upd AFTER UPDATE OF {cols} ON scrap_logs BEGIN
+            INSERT INTO scrap_logs_fts (scrap_logs_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals});
+            INSERT INTO scrap_logs_fts (rowid, {cols}) VALUES (new.id, {new_vals});
+        END
+    """)
+    rebuild_search_index(conn)
+
+# Dimension tables: every repeated text column becomes an integer surrogate
+# key. scrap_logs / daily_scrap survive as views, so existing SQL keeps working.
+DIMENSIONS = {   # logical column -> (dimension table, key column)
+    "machine_operator": ("dim_operator", "operator_id"),
+    "machine_name": ("dim_machine", "machine_id"),
+    "unit": ("dim_unit", "unit_id"),
+    "shift": ("dim_shift", "shift_id"),
+    "reason": ("dim_reason", "reason_id"),
+}
+
+def _dim_lookup(col, value):
+    table = DIMENSIONS[col][0]
+    return f"(SELECT id FROM {table} WHERE name = COALESCE({value}, ''))"
+
+def _dim_name(col, value):
+    table, _ = DIMENSIONS[col]
+    return f"(SELECT name FROM {table} WHERE id = {value})"
+
+def scrap_logs_from(alias="s", lead=None):
+    """
+    scrap_logs as a FROM item with the join order pinned (CROSS JOIN), so the
+    plan doesn't hinge on sqlite_stat1: the fact table drives (walking its
+    day / measure indexes), or with lead (a DIMENSIONS column) that dimension
+    drives, walking its name index to sort by it.
+    """
+    names = {col: f"{table}.name AS {col}" for col, (table, _) in DIMENSIONS.items()}
+    cols = ", ".join(names.get(c, f"e.{c}") for c in ("id", *SCRAP_LOG_COLUMNS, "day"))
+    joins = [f"CROSS JOIN {table} ON {table}.id = e.{key}"
+             for col, (table, key) in DIMENSIONS.items() if col != lead]
+    if lead:
+        table, key = DIMENSIONS[lead]
+        first = f"{table} CROSS JOIN scrap_entries e ON e.{key} = {table}.id"
+    else:
+        first = "scrap_entries e"
+    return f"(SELECT {cols} FROM {first} {' '.join(joins)}) {alias}"
+
+_FACT_ROLLUP_ADD = """
+    INSERT INTO daily_scrap_facts (day, machine_id, shift_id, reason_id, quantity, total_produced, entries)
+    SELECT new.day, new.machine_id, new.shift_id, new.reason_id,
+           COALESCE(new.quantity, 0), COALESCE(new.total_produced, 0), 1
+    WHERE new.day IS NOT NULL
+    ON CONFLICT (day, machine_id, shift_id, reason_id) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        total_produced = total_produced + excluded.total_produced,
+        entries = entries + 1;
+"""
+_FACT_ROLLUP_SUB = """
+    UPDATE daily_scrap_facts SET
+        quantity = quantity - COALESCE(old.quantity, 0),
+        total_produced = total_produced - COALESCE(old.total_produced, 0),
+        entries = entries - 1
+    WHERE day = old.day AND machine_id = old.machine_id
+      AND shift_id = old.shift_id AND reason_id = old.reason_id;
+    DELETE FROM daily_scrap_facts
+    WHERE day = old.day AND machine_id = old.machine_id
+      AND shift_id = old.shift_id AND reason_id = old.reason_id AND entries <= 0;
+"""
+
+# Triggers keeping daily_scrap_facts in step with scrap_entries (migration 7).
+# Bulk loads drop them and recompute the days they loaded at the end instead.
+ROLLUP_TRIGGERS = ("trg_scrap_entries_rollup_ins", "trg_scrap_entries_rollup_del", "trg_scrap_entries_rollup_upd")
+
+def _create_rollup_triggers(conn):
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_scrap_entries_rollup_ins AFTER INSERT ON scrap_entries "
+                 f"BEGIN {_FACT_ROLLUP_ADD} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_scrap_entries_rollup_del AFTER DELETE ON scrap_entries "
+                 f"BEGIN {_FACT_ROLLUP_SUB} END")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_scrap_entries_rollup_upd
+        AFTER UPDATE OF day, machine_id, shift_id, reason_id, quantity, total_produced ON scrap_entries
+        BEGIN {_FACT_ROLLUP_SUB} {_FACT_ROLLUP_ADD} END
+    """)
+
+# Triggers keeping scrap_logs_fts in step with scrap_entries (migration 7).
+# Bulk loads drop them and rebuild the index once at the end instead.
+FTS_TRIGGERS = ("trg_scrap_entries_fts_ins", "trg_scrap_entries_fts_del", "trg_scrap_entries_fts_upd")
+
+def _create_fts_triggers(conn):
+    cols = ", ".join(SEARCH_COLUMNS)
+    fts_new = ", ".join(_dim_name(c, f"new.{DIMENSIONS[c][1]}") if c in DIMENSIONS else f"new.{c}"
+                        for c in SEARCH_COLUMNS)
+    fts_old = ", ".join(_dim_name(c, f"old.{DIMENSIONS[c][1]}") if c in DIMENSIONS else f"old.{c}"
+                        for c in SEARCH_COLUMNS)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_scrap_entries_fts_ins AFTER INSERT ON scrap_entries BEGIN
+            INSERT INTO scrap_logs_fts (rowid, {cols}) VALUES (new.id, {fts_new});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_scrap_entries_fts_del AFTER DELETE ON scrap_entries BEGIN
+            INSERT INTO scrap_logs_fts (scrap_logs_fts, rowid, {cols}) VALUES ('delete', old.id, {fts_old});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_scrap_entries_fts_upd
+        AFTER UPDATE OF operator_id, machine_id, reason_id, comments ON scrap_entries BEGIN
+            INSERT INTO scrap_logs_fts (scrap_logs_fts, rowid, {cols}) VALUES ('delete', old.id, {fts_old});
+            INSERT INTO scrap_logs_fts (rowid, {cols}) VALUES (new.id, {fts_new});
+        END
+    """)
+
+def _triggers_missing(conn, triggers) -> bool:
+    names = ", ".join("?" * len(triggers))
+    found = conn.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({names})",
+                         triggers).fetchone()[0]
+    return found < len(triggers)
+
+def _fts_triggers_missing(conn) -> bool:
+    """FTS index present but its triggers dropped (a bulk load that never finished)."""
+    if schema_version(conn) < 7 or not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'scrap_logs_fts'").fetchone():
+        return False
+    return _triggers_missing(conn, FTS_TRIGGERS)
+
+def _rollup_triggers_missing(conn) -> bool:
+    """Rollup triggers dropped by a bulk load that never finished."""
+    return schema_version(conn) >= 7 and _triggers_missing(conn, ROLLUP_TRIGGERS)
+
+def _fill_daily_scrap_v7(conn):
+    conn.execute("DELETE FROM daily_scrap_facts")
+    conn.execute("""
+        INSERT INTO daily_scrap_facts (day, machine_id, shift_id, reason_id, quantity, total_produced, entries)
+        SELECT day, machine_id, shift_id, reason_id, TOTAL(quantity), TOTAL(total_produced), COUNT(*)
+        FROM scrap_entries
+        WHERE day IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    """)
+
+def _normalize_dimensions(conn):
+    # 1. Dictionary-encode the text columns
+    for col, (table, _) in DIMENSIONS.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+        conn.execute(f"INSERT OR IGNORE INTO {table} (name) "
+                     f"SELECT DISTINCT COALESCE({col}, '') FROM scrap_logs")
+
+    # 2. Fact table, filled from the old table (ids preserved)
+    conn.execute("""
+        CREATE TABLE scrap_entries (
+            id             INTEGER PRIMARY KEY AUTOINCREMENT,
+            operator_id    INTEGER NOT NULL REFERENCES dim_operator(id),
+            machine_id     INTEGER NOT NULL REFERENCES dim_machine(id),
+            date           TEXT,
+            day            INTEGER,
+            quantity       REAL,
+            unit_id        INTEGER NOT NULL REFERENCES dim_unit(id),
+            shift_id       INTEGER NOT NULL REFERENCES dim_shift(id),
+            reason_id      INTEGER NOT NULL REFERENCES dim_reason(id),
+            comments       TEXT,
+            total_produced REAL,
+            entry_type     TEXT
+        )
+    """)
+    joins = " ".join(
+        f"JOIN {table} ON {table}.name = COALESCE(s.{col}, '')" for col, (table, _) in DIMENSIONS.items())
+    select = ", ".join(f"{DIMENSIONS[c][0]}.id" if c in DIMENSIONS else f"s.{c}" for c in ENTRY_COLUMNS)
+    conn.execute(f"INSERT INTO scrap_entries (id, {', '.join(FACT_COLUMNS)}) "
+                 f"SELECT s.id, {select} FROM scrap_logs s {joins} ORDER BY s.id")
+
+    # 3. Old table (its indexes and triggers go with it), old rollup
+    conn.execute("DROP TABLE scrap_logs")
+    conn.execute("DROP TABLE daily_scrap")
+
+    conn.execute("""
+        CREATE INDEX idx_scrap_entries_day_report ON scrap_entries (
+            day, id, operator_id, machine_id, quantity, unit_id, shift_id, reason_id
+        )
+    """)
+    conn.execute("CREATE INDEX idx_scrap_entries_machine_day ON scrap_entries (machine_id, day, quantity)")
+    conn.execute("CREATE INDEX idx_scrap_entries_shift_day ON scrap_entries (shift_id, day, quantity)")
+    conn.execute("CREATE INDEX idx_scrap_entries_operator ON scrap_entries (operator_id)")
+
+    # 4. Compatibility view with the old column set, writable via INSTEAD OF triggers
+    names = {col: f"{table}.name AS {col}" for col, (table, _) in DIMENSIONS.items()}
+    view_cols = ", ".join(names.get(c, f"e.{c}") for c in ("id", *SCRAP_LOG_COLUMNS, "day"))
+    view_joins = " ".join(f"JOIN {table} ON {table}.id = e.{key}" for table, key in DIMENSIONS.values())
+    conn.execute(f"CREATE VIEW scrap_logs AS SELECT {view_cols} FROM scrap_entries e {view_joins}")
+
+    upsert_dims = "".join(
+        f"INSERT INTO {table} (name) VALUES (COALESCE(new.{col}, '')) ON CONFLICT (name) DO NOTHING;"
+        for col, (table, _) in DIMENSIONS.items())
+    new_values = ", ".join(_dim_lookup(c, f"new.{c}") if c in DIMENSIONS else f"new.{c}"
+                           for c in ENTRY_COLUMNS if c != "day")
+    # ISO text without an explicit day still gets one
+    new_day = "COALESCE(new.day, CAST(julianday(new.date) - 2440587.5 AS INTEGER))"
+    fact_cols = ", ".join(c for c in FACT_COLUMNS if c != "day")
+    conn.execute(f"""
+        CREATE TRIGGER trg_scrap_logs_view_ins INSTEAD OF INSERT ON scrap_logs BEGIN
+            {upsert_dims}
+            INSERT INTO scrap_entries (id, {fact_cols}, day) VALUES (new.id, {new_values}, {new_day});
+        END
+    """)
+    assignments = ", ".join(f"{f} = " + (_dim_lookup(c, f"new.{c}") if c in DIMENSIONS else f"new.{c}")
+                            for c, f in zip(ENTRY_COLUMNS, FACT_COLUMNS))
+    conn.execute(f"""
+        CREATE TRIGGER trg_scrap_logs_view_upd INSTEAD OF UPDATE ON scrap_logs BEGIN
+            {upsert_dims}
+            UPDATE scrap_entries SET {assignments} WHERE id = old.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER trg_scrap_logs_view_del INSTEAD OF DELETE ON scrap_logs BEGIN
+            DELETE FROM scrap_entries WHERE id = old.id;
+        END
+    """)
+
+    # 5. Rollup keyed by integers; daily_scrap stays as a named view
+    conn.execute("""
+        CREATE TABLE daily_scrap_facts (
+            day            INTEGER NOT NULL,
+            machine_id     INTEGER NOT NULL,
+            shift_id       INTEGER NOT NULL,
+            reason_id      INTEGER NOT NULL,
+            quantity       REAL NOT NULL,
+            total_produced REAL NOT NULL,
+            entries        INTEGER NOT NULL,
+            PRIMARY KEY (day, machine_id, shift_id, reason_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE VIEW daily_scrap AS
+        SELECT d.day, m.name AS machine_name, sh.name AS shift, r.name AS reason,
+               d.quantity, d.total_produced, d.entries
+        FROM daily_scrap_facts d
+        JOIN dim_machine m ON m.id = d.machine_id
+        JOIN dim_shift sh ON sh.id = d.shift_id
+        JOIN dim_reason r ON r.id = d.reason_id
+    """)
+    _create_rollup_triggers(conn)
+    _fill_daily_scrap_v7(conn)
+
+    # 6. Search index now follows the fact table (names resolved from the dims)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'scrap_logs_fts'").fetchone():
+        _create_fts_triggers(conn)
+        rebuild_search_index(conn)
+
+def read_only_uri(path) -> str:
+    """SQLite URI opening path read-only (for ATTACH on a uri=True connection)."""
+    return Path(path).resolve().as_uri() + "?mode=ro"
+
+def _create_archive_catalog(conn):
+    # Closed months moved out to archive/<period>.db files (see archive.py)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive_partitions (
+            period      TEXT PRIMARY KEY,      -- YYYY-MM
+            path        TEXT NOT NULL,
+            day_from    INTEGER NOT NULL,
+            day_to      INTEGER NOT NULL,
+            rows        INTEGER NOT NULL,
+            archived_at TEXT NOT NULL
+        )
+    """)
+
+def _create_change_counters(conn):
+    # Bumped on every UPDATE/DELETE of a fact row. Inserts are visible through
+    # MAX(id) (AUTOINCREMENT never reuses ids), so together the two tell a
+    # derived copy (a result_cache entry, snapshot.py) whether it is current,
+    # can be appended to, or must be rebuilt.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_counters (
+            name  TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO change_counters (name, value) VALUES ('scrap_entries', 0)")
+    for event in ("UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_scrap_entries_changes_{event.lower()}
+            AFTER {event} ON scrap_entries BEGIN
+                UPDATE change_counters SET value = value + 1 WHERE name = 'scrap_entries';
+            END
+        """)
+
+def change_counter(conn, name="scrap_entries") -> int:
+    row = conn.execute("SELECT value FROM change_counters WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+def data_version(conn) -> tuple:
+    """Changes whenever scrap_entries gains, loses or changes a row (any connection)."""
+    max_id = conn.execute("SELECT MAX(id) FROM scrap_entries").fetchone()[0]
+    return change_counter(conn), max_id or 0
+
+def _create_sort_indexes(conn):
+    # One index per sortable log column, so ORDER BY <column>, id (the keyset
+    # order) is an index walk. Dimension columns sort by name: the planner walks
+    # the dimension's unique name index and seeks each key here; the implicit
+    # rowid makes (key) sort as (key, id). Measures are indexed on the same
+    # COALESCE expression the log screen sorts by, so NULLs keep a position.
+    for key in ("machine_id", "shift_id", "reason_id"):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_scrap_entries_{key} ON scrap_entries ({key})")
+    for col in ("quantity", "total_produced"):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_scrap_entries_sort_{col} "
+                     f"ON scrap_entries (COALESCE({col}, -1))")
+
+def rebuild_daily_scrap(conn, day_from=None, day_to=None):
+    """
+    Recompute the daily rollup from scrap_entries plus every archive partition
+    (after manual edits or trigger-less loads); with day_from/day_to only those
+    days. Partitions are ATTACHed one at a time, which SQLite only allows
+    outside a transaction, so this commits.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    where, params = "WHERE day IS NOT NULL", []
+    if day_from is not None:
+        where, params = "WHERE day BETWEEN ? AND ?", [day_from, day_to]
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS archived_rollup (
+            day INTEGER, machine_id INTEGER, shift_id INTEGER, reason_id INTEGER,
+            quantity REAL, total_produced REAL, entries INTEGER
+        )
+    """)
+    conn.execute("DELETE FROM temp.archived_rollup")
+    overlap = " WHERE day_to >= ? AND day_from <= ?" if params else ""
+    partitions = conn.execute(f"SELECT path FROM archive_partitions{overlap} ORDER BY day_from",
+                              params).fetchall()
+    for (path,) in partitions:
+        conn.execute("ATTACH DATABASE ? AS arc", (read_only_uri(path),))
+        try:
+            conn.execute(f"""
+                INSERT INTO temp.archived_rollup
+                SELECT day, machine_id, shift_id, reason_id, TOTAL(quantity), TOTAL(total_produced), COUNT(*)
+                FROM arc.scrap_entries
+                {where}
+                GROUP BY 1, 2, 3, 4
+            """, params)
+            conn.commit()
+        finally:
+            conn.execute("DETACH DATABASE arc")
+    conn.execute(f"DELETE FROM daily_scrap_facts {where}", params)
+    conn.execute(f"""
+        INSERT INTO daily_scrap_facts (day, machine_id, shift_id, reason_id, quantity, total_produced, entries)
+        SELECT day, machine_id, shift_id, reason_id, TOTAL(quantity), TOTAL(total_produced), COUNT(*)
+        FROM scrap_entries
+        {where}
+        GROUP BY 1, 2, 3, 4
+    """, params)
+    conn.execute("""
+        INSERT INTO daily_scrap_facts (day, machine_id, shift_id, reason_id, quantity, total_produced, entries)
+        SELECT day, machine_id, shift_id, reason_id, quantity, total_produced, entries
+        FROM temp.archived_rollup WHERE true
+        ON CONFLICT (day, machine_id, shift_id, reason_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            total_produced = total_produced + excluded.total_produced,
+            entries = entries + excluded.entries
+    """)
+    conn.execute("DROP TABLE temp.archived_rollup")
+
+def _create_applied_writes(conn):
+    # Idempotency keys of journaled writes (outbox.py) already in the DB, so a
+    # batch replayed after a crash between commit and journal trim is skipped.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS applied_writes (
+            key        TEXT PRIMARY KEY,
+            applied_at TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+def _sql_epoch_day(text):
+    """
+    SQL expression: epoch day of the date text in the SQL expression text,
+    parsed like parse_date (YYYY-MM-DD, MM/DD/YYYY, MM/DD/YY); NULL otherwise.
+    """
+    t = f"trim({text})"
+    cases = []
+    for sep, order, year_lengths in (("-", "ymd", (4,)), ("/", "mdy", (4, 2))):
+        rest = f"substr({t}, instr({t}, '{sep}') + 1)"
+        parts = dict(zip(order, (f"substr({t}, 1, instr({t}, '{sep}') - 1)",
+                                 f"substr({rest}, 1, instr({rest}, '{sep}') - 1)",
+                                 f"substr({rest}, instr({rest}, '{sep}') + 1)")))
+        y, m, d = parts["y"], parts["m"], parts["d"]
+        year = f"CAST({y} AS INTEGER)"
+        if 2 in year_lengths:   # %y: 69-99 -> 19xx, 00-68 -> 20xx
+            year = (f"CASE length({y}) WHEN 2 THEN {year} + CASE WHEN {year} < 69 THEN 2000 ELSE 1900 END "
+                    f"ELSE {year} END")
+        iso = f"printf('%04d-%02d-%02d', {year}, CAST({m} AS INTEGER), CAST({d} AS INTEGER))"
+        ok = " AND ".join([f"instr({t}, '{sep}') > 0", f"instr({rest}, '{sep}') > 0",
+                           f"length({y}) IN ({', '.join(map(str, year_lengths))})",
+                           f"length({m}) IN (1, 2)", f"length({d}) IN (1, 2)",
+                           *(f"{part} NOT GLOB '*[^0-9]*'" for part in (y, m, d)),
+                           f"date({iso}, '+0 days') = {iso}"])   # rejects Feb 30 etc.
+        cases.append(f"WHEN {ok} THEN CAST(julianday({iso}) - 2440587.5 AS INTEGER)")
+    return f"(CASE {' '.join(cases)} END)"
+
+def _fix_view_days(conn):
+    # The scrap_logs INSTEAD OF triggers derived day with julianday(), which
+    # only reads ISO text: MM/DD/YYYY rows got a NULL day and fell out of every
+    # range filter and the rollup. Parse all app formats; refuse the rest.
+    new_day = f"COALESCE(new.day, {_sql_epoch_day('new.date')})"
+    check = (f"SELECT RAISE(ABORT, 'scrap_logs: date is not YYYY-MM-DD or MM/DD/YYYY') "
+             f"WHERE {new_day} IS NULL;")
+    upsert_dims = "".join(
+        f"INSERT INTO {table} (name) VALUES (COALESCE(new.{col}, '')) ON CONFLICT (name) DO NOTHING;"
+        for col, (table, _) in DIMENSIONS.items())
+    new_values = ", ".join(_dim_lookup(c, f"new.{c}") if c in DIMENSIONS else f"new.{c}"
+                           for c in ENTRY_COLUMNS if c != "day")
+    fact_cols = ", ".join(c for c in FACT_COLUMNS if c != "day")
+    conn.execute("DROP TRIGGER IF EXISTS trg_scrap_logs_view_ins")
+    conn.execute(f"""
+        CREATE TRIGGER trg_scrap_logs_view_ins INSTEAD OF INSERT ON scrap_logs BEGIN
+            {check}
+            {upsert_dims}
+            INSERT INTO scrap_entries (id, {fact_cols}, day) VALUES (new.id, {new_values}, {new_day});
+        END
+    """)
+    # an UPDATE that changes the date text (and not day) moves day with it
+    changed_day = (f"CASE WHEN new.day IS old.day AND new.date IS NOT old.date "
+                   f"THEN {_sql_epoch_day('new.date')} ELSE new.day END")
+    assignments = ", ".join(
+        f"{f} = " + (_dim_lookup(c, f"new.{c}") if c in DIMENSIONS else changed_day if c == "day" else f"new.{c}")
+        for c, f in zip(ENTRY_COLUMNS, FACT_COLUMNS))
+    conn.execute("DROP TRIGGER IF EXISTS trg_scrap_logs_view_upd")
+    conn.execute(f"""
+        CREATE TRIGGER trg_scrap_logs_view_upd INSTEAD OF UPDATE ON scrap_logs BEGIN
+            SELECT RAISE(ABORT, 'scrap_logs: date is not YYYY-MM-DD or MM/DD/YYYY')
+            WHERE ({changed_day}) IS NULL AND new.date IS NOT old.date;
+            {upsert_dims}
+            UPDATE scrap_entries SET {assignments} WHERE id = old.id;
+        END
+    """)
+    # rows already written that way: parse in Python (same rules), batch by id
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            "SELECT id, date FROM scrap_entries WHERE id > ? AND day IS NULL ORDER BY id LIMIT ?",
+            (last_id, BACKFILL_BATCH),
+        ).fetchall()
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        updates = [(to_epoch_day(d), rid) for rid, d in batch]
+        conn.executemany("UPDATE scrap_entries SET day = ? WHERE id = ?",
+                         [u for u in updates if u[0] is not None])
+
+def _create_day_sort_index(conn):
+    # same expression as day_key(), so ORDER BY / seeks on it walk this index
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_scrap_entries_sort_day "
+                 f"ON scrap_entries (COALESCE(day, {NULL_DAY}))")
+
+# (version, step) — append only; never edit a step that has shipped.
+MIGRATIONS = [
+    (1, _create_schema),
+    (2, _create_access_indexes),
+    (3, _add_epoch_day),
+    (4, _create_ingest_checkpoints),
+    (5, _create_daily_rollup),
+    (6, _create_search_index),
+    (7, _normalize_dimensions),
+    (8, _create_archive_catalog),
+    (9, _create_change_counters),
+    (10, _create_sort_indexes),
+    (11, _create_applied_writes),
+    (12, _fix_view_days),
+    (13, _create_day_sort_index),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Only plain tables: stats taken while FTS shadow tables are still empty make
+# the planner pick full scans inside FTS5 and inserts turn quadratic.
+ANALYZE_TABLES = ("scrap_entries", "daily_scrap_facts") + tuple(t for t, _ in DIMENSIONS.values())
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """
+    Apply pending migrations in order, each in its own transaction, then
+    refresh planner statistics. Returns the list of versions applied.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    applied = []
+    for version, step in MIGRATIONS:
+        if version <= schema_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            step(conn)
+            conn.execute(f"PRAGMA user_version={version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(version)
+    if applied:
+        for table in ANALYZE_TABLES:
+            conn.execute(f"ANALYZE {table}")
+    if _fts_triggers_missing(conn):
+        _create_fts_triggers(conn)
+        rebuild_search_index(conn)
+        conn.commit()
+    if _rollup_triggers_missing(conn):
+        _create_rollup_triggers(conn)
+        rebuild_daily_scrap(conn)
+        conn.commit()
+    conn.execute("PRAGMA optimize")
+    return applied
+
+# -----------------
+# WRITE API
+# -----------------
+ENTRY_COLUMNS = (
+    "machine_operator", "machine_name", "date", "day", "quantity", "unit",
+    "shift", "reason", "comments", "total_produced", "entry_type",
+)
+FACT_COLUMNS = tuple(DIMENSIONS[c][1] if c in DIMENSIONS else c for c in ENTRY_COLUMNS)
+_INSERT_SQL = (
+    f"INSERT INTO scrap_entries ({', '.join(FACT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in FACT_COLUMNS)})"
+)
+
+# name -> id per dimension table. Dimensions are append-only, so entries stay
+# valid; the writer clears this on rollback in case it cached uncommitted ids.
+_dim_cache = {}
+
+def _dim_ids(conn, table):
+    ids = _dim_cache.get(table)
+    if ids is None:
+        ids = _dim_cache[table] = {name: i for i, name in conn.execute(f"SELECT id, name FROM {table}")}
+    return ids
+
+def dimension_id(conn, table, name) -> int:
+    """Surrogate key for name in a dimension table, creating the row if new."""
+    name = "" if name is None else str(name)
+    ids = _dim_ids(conn, table)
+    if name not in ids:
+        conn.execute(f"INSERT INTO {table} (name) VALUES (?) ON CONFLICT (name) DO NOTHING", (name,))
+        ids[name] = conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+    return ids[name]
+
+def _resolve_names(conn, table, names):
+    """Make sure every name has a row in table; new ones are added (and read back) in one pass."""
+    ids = _dim_ids(conn, table)
+    new = json.dumps(sorted(n for n in names if n not in ids))
+    if new != "[]":
+        conn.execute(f"INSERT OR IGNORE INTO {table} (name) SELECT value FROM json_each(?)", (new,))
+        ids.update(conn.execute(f"SELECT name, id FROM {table} WHERE name IN (SELECT value FROM json_each(?))",
+                                (new,)))
+    return ids
+
+def encode_rows(conn, rows):
+    """ENTRY_COLUMNS tuples (names) -> FACT_COLUMNS tuples (dimension ids), column by column."""
+    if not rows:
+        return []
+    cols = list(zip(*rows))
+    for i, col in enumerate(ENTRY_COLUMNS):
+        if col in DIMENSIONS:
+            names = ["" if n is None else str(n) for n in cols[i]]
+            ids = _resolve_names(conn, DIMENSIONS[col][0], set(names))
+            cols[i] = [ids[n] for n in names]
+    return list(zip(*cols))
+
+def entry_row(entry: dict) -> tuple:
+    """Map an entry dict to an INSERT tuple, deriving day from date."""
+    values = dict(entry)
+    if values.get("day") is None:
+        day = to_epoch_day(values.get("date"))
+        if day is None:
+            raise ValueError(f"Invalid date: {values.get('date')!r}")
+        values["day"] = day
+    return tuple(values.get(c) for c in ENTRY_COLUMNS)
+
+def insert_entries(conn, entries) -> int:
+    """Insert entry dicts (or ready tuples from entry_row) with one executemany."""
+    rows = [e if isinstance(e, tuple) else entry_row(e) for e in entries]
+    conn.executemany(_INSERT_SQL, encode_rows(conn, rows))
+    return len(rows)
+
+def insert_once(conn, key, entries) -> int:
+    """insert_entries unless a write with this idempotency key was applied before."""
+    if not conn.execute("INSERT OR IGNORE INTO applied_writes (key, applied_at) VALUES (?, ?)",
+                        (key, datetime.now().isoformat(timespec="seconds"))).rowcount:
+        return 0
+    return insert_entries(conn, entries)
+
+# Ids go in as one JSON array parameter: no 999/32766 bound-variable limit,
+# and the same prepared statement for any batch size.
+_IDS_IN = "id IN (SELECT value FROM json_each(?))"
+EDITABLE_COLUMNS = ("machine_operator", "machine_name", "date", "quantity", "unit",
+                    "shift", "reason", "comments", "total_produced")
+
+def delete_entries(conn, ids) -> int:
+    """Delete scrap_entries rows by primary key in one statement."""
+    return conn.execute(f"DELETE FROM scrap_entries WHERE {_IDS_IN}",
+                        (json.dumps([int(i) for i in ids]),)).rowcount
+
+def update_entries(conn, ids, changes: dict) -> int:
+    """
+    Set the same values on every row in ids with one UPDATE: dimension names
+    are resolved to ids once per batch, a new date also moves day.
+    Raises ValueError for an unknown column, bad date or bad number.
+    """
+    assignments = {}
+    for col, value in changes.items():
+        if col not in EDITABLE_COLUMNS:
+            raise ValueError(f"Column {col!r} cannot be edited")
+        if col in DIMENSIONS:
+            table, key = DIMENSIONS[col]
+            assignments[key] = dimension_id(conn, table, str(value).strip())
+        elif col == "date":
+            day = to_epoch_day(value)
+            if day is None:
+                raise ValueError(f"Invalid date: {value!r}")
+            assignments["date"] = from_epoch_day(day).isoformat()
+            assignments["day"] = day
+        elif col in ("quantity", "total_produced"):
+            try:
+                assignments[col] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{col} must be a number, got {value!r}") from None
+            if assignments[col] < 0:
+                raise ValueError(f"{col} cannot be negative")
+        else:
+            assignments[col] = value
+    if not assignments:
+        return 0
+    sets = ", ".join(f"{c} = ?" for c in assignments)
+    return conn.execute(f"UPDATE scrap_entries SET {sets} WHERE {_IDS_IN}",
+                        [*assignments.values(), json.dumps([int(i) for i in ids])]).rowcount
+
+# -----------------
+# BULK INGEST (MES exports, millions of rows)
+# -----------------
+INGEST_BATCH = 50_000
+INGEST_TEXT_COLUMNS = ("machine_operator", "machine_name", "unit", "shift",
+                       "reason", "comments", "entry_type")
+# Only for the duration of a load: big page cache, fewer WAL checkpoints.
+INGEST_PRAGMAS = ("PRAGMA cache_size=-262144", "PRAGMA wal_autocheckpoint=20000")
+INGEST_RESTORE_PRAGMAS = (f"PRAGMA cache_size=-{CACHE_SIZE_KB}", "PRAGMA wal_autocheckpoint=1000")
+
+def normalize_chunk(records):
+    """
+    Validate/normalize a list of raw dicts column-wise with pandas.
+    Returns (insert tuples, rejected count). Dates become ISO text + epoch day.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(records)
+    df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
+    for col in ENTRY_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    for col in INGEST_TEXT_COLUMNS:
+        df[col] = df[col].fillna("").astype(str).str.strip()
+    df["shift"] = df["shift"].str.upper().str.replace(r"^SHIFT\s+", "", regex=True)
+    df.loc[df["unit"] == "", "unit"] = "lbs"
+    df.loc[df["entry_type"] == "", "entry_type"] = "Import"
+    df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce")
+    df["total_produced"] = pd.to_numeric(df["total_produced"], errors="coerce")
+
+    day = pd.to_numeric(df["day"], errors="coerce")
+    text = df["date"].fillna("").astype(str).str.strip()
+    for fmt in DATE_FORMATS:
+        missing = day.isna()
+        if not missing.any():
+            break
+        parsed = pd.to_datetime(text[missing], format=fmt, errors="coerce")
+        day[missing] = (parsed - pd.Timestamp("1970-01-01")).dt.days
+
+    ok = day.notna() & df["quantity"].notna() & (df["quantity"] >= 0) & (df["machine_name"] != "")
+    good = df.loc[ok, list(ENTRY_COLUMNS)].copy()
+    good["day"] = day[ok].astype("int64")
+    good["date"] = pd.to_datetime(good["day"], unit="D").dt.strftime("%Y-%m-%d")
+    good = good.astype(object).where(good.notna(), None)
+    return list(good.itertuples(index=False, name=None)), int((~ok).sum())
+
+@contextmanager
+def bulk_load_pragmas():
+    """
+    Apply INGEST_PRAGMAS to the writer for the duration of a bulk load. The
+    search index and rollup triggers are dropped meanwhile; at the end they
+    come back, scrap_logs_fts is rebuilt once, the rollup is recomputed for
+    the days the new rows landed on (all days if rows were also changed or
+    deleted meanwhile) and planner statistics are refreshed.
+    """
+    pool = get_pool()
+    with pool.writer() as conn:
+        for pragma in INGEST_PRAGMAS:
+            conn.execute(pragma)
+        fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'scrap_logs_fts'").fetchone()
+        for name in ROLLUP_TRIGGERS + (FTS_TRIGGERS if fts else ()):
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        changes, max_id = data_version(conn)
+    try:
+        yield
+    finally:
+        with pool.writer() as conn:
+            for pragma in INGEST_RESTORE_PRAGMAS:
+                conn.execute(pragma)
+            _create_rollup_triggers(conn)
+            if change_counter(conn) != changes:
+                rebuild_daily_scrap(conn)
+            else:
+                day_from, day_to = conn.execute("SELECT MIN(day), MAX(day) FROM scrap_entries WHERE id > ?",
+                                                (max_id,)).fetchone()
+                if day_from is not None:
+                    rebuild_daily_scrap(conn, day_from, day_to)
+            if fts:
+                _create_fts_triggers(conn)
+                rebuild_search_index(conn)
+            for table in ANALYZE_TABLES:
+                conn.execute(f"ANALYZE {table}")
+            conn.execute("PRAGMA optimize")
+
+def _ingest_checkpoint(conn, source):
+    row = conn.execute("SELECT rows_done FROM ingest_checkpoints WHERE source = ?",
+                       (source,)).fetchone()
+    return row[0] if row else 0
+
+def bulk_ingest(records, source=None, batch_size=INGEST_BATCH, progress=None):
+    """
+    Stream dict records into scrap_logs: normalize each batch vectorized, insert
+    it with one executemany in one transaction. With a source key the number of
+    records consumed is committed alongside each batch, so a rerun resumes
+    exactly where the last committed batch ended.
+    progress(stats) is called after every batch. Returns the final stats dict.
+    """
+    pool = get_pool()
+    stats = {"rows": 0, "rejected": 0, "skipped": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    records = iter(records)
+    if source:
+        with pool.reader() as conn:
+            stats["skipped"] = _ingest_checkpoint(conn, source)
+        records = islice(records, stats["skipped"], None)
+
+    consumed = stats["skipped"]
+    start = time.perf_counter()
+    with bulk_load_pragmas():
+        while True:
+            chunk = list(islice(records, batch_size))
+            if not chunk:
+                break
+            rows, rejected = normalize_chunk(chunk)
+            consumed += len(chunk)
+            with pool.writer() as conn:
+                insert_entries(conn, rows)
+                if source:
+                    conn.execute("""
+                        INSERT INTO ingest_checkpoints (source, rows_done, updated_at)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(source) DO UPDATE SET
+                            rows_done = excluded.rows_done, updated_at = excluded.updated_at
+                    """, (source, consumed, datetime.now().isoformat(timespec="seconds")))
+            stats["rows"] += len(rows)
+            stats["rejected"] += rejected
+            stats["seconds"] = time.perf_counter() - start
+            stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+            if progress:
+                progress(dict(stats))
+    return stats
 
 def _seed_demo(conn):
     cur = conn.execute("SELECT COUNT(*) AS c FROM scrap_logs")
@@ -54,37 +1188,61 @@ def _seed_demo(conn):
     today = datetime.today().date()
     rows = []
     for d in range(30):
-        day = (today - timedelta(days=d)).strftime("%Y-%m-%d")
+        day = today - timedelta(days=d)
         for _ in range(random.randint(2, 6)):
             q = max(1, int(random.gauss(120, 40)))
             tp = q + max(1000, int(random.gauss(3000, 500)))
-            rows.append((
-                random.choice(operators),
-                random.choice(machines),
-                day, float(q), unit,
-                random.choice(shifts),
-                random.choice(reasons),
-                "",
-                float(tp),
-                "Manual",
-            ))
-    conn.executemany("""
-        INSERT INTO scrap_logs (
-            machine_operator, machine_name, date, quantity, unit,
-            shift, reason, comments, total_produced, entry_type
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, rows)
+            rows.append(entry_row({
+                "machine_operator": random.choice(operators),
+                "machine_name": random.choice(machines),
+                "date": day.strftime("%Y-%m-%d"),
+                "quantity": float(q),
+                "unit": unit,
+                "shift": random.choice(shifts),
+                "reason": random.choice(reasons),
+                "comments": "",
+                "total_produced": float(tp),
+                "entry_type": "Manual",
+            }))
+    insert_entries(conn, rows)
     conn.commit()
 
 def ensure_demo_data(conn=None):
-    """Create DB file, schema, and seed demo data if empty."""
-    own = False
+    """Create DB file, migrate schema, and seed demo data if empty."""
     if conn is None:
-        own = True
-        conn = get_db_connection()
-    try:
-        _create_schema(conn)
-        _seed_demo(conn)
-    finally:
-        if own:
-            conn.close()
+        with writer() as conn:
+            migrate(conn)
+            _seed_demo(conn)
+        return
+    migrate(conn)
+    _seed_demo(conn)
+
+
+def init_sample_data():
+    """App start-up hook used by main.py: open the pool and prepare the DB."""
+    ensure_demo_data()
+
+
+# -----------------
+# MAINTENANCE CLI:  python -m db migrate | rebuild-rollups | rebuild-search [--db PATH]
+# -----------------
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m db", description="ScrapSense database maintenance.")
+    ap.add_argument("command", choices=["migrate", "rebuild-rollups", "rebuild-search"])
+    ap.add_argument("--db", help=f"database file (default: {DB_FILE})")
+    args = ap.parse_args()
+    if args.db:
+        DB_FILE = args.db
+
+    with writer() as conn:   # opening the pool applies pending migrations
+        print(f"{DB_FILE}: schema v{schema_version(conn)}")
+        if args.command == "rebuild-rollups":
+            rebuild_daily_scrap(conn)
+            n = conn.execute("SELECT COUNT(*) FROM daily_scrap").fetchone()[0]
+            print(f"daily_scrap rebuilt: {n:,} rollup rows")
+        elif args.command == "rebuild-search":
+            rebuild_search_index(conn)
+            print("scrap_logs_fts rebuilt")
+    close_pool()
@@ -0,0 +1,173 @@
+# export.py — stream query results to CSV, gzip CSV or Parquet
+# Usage:
+#   n = write_rows(rows, columns, "scrap_2025.csv.gz", headers=[...])     # any thread
+#   export.start(self, "viewlog.export", make_rows, columns, headers, total=n)   # Tk: dialog + job
+#
+# Rows are consumed CHUNK_ROWS at a time straight from the cursor, so memory
+# stays flat however many rows go out. Output is written to <path>.part and
+# renamed when complete; a cancelled or failed export leaves nothing behind.
+
+import csv
+import gzip
+import os
+import tkinter as tk
+from datetime import datetime
+from itertools import islice
+from tkinter import ttk, messagebox, filedialog
+
+import jobs
+from db import SCRAP_LOG_COLUMNS
+
+CHUNK_ROWS = 10_000
+FILETYPES = [("CSV", "*.csv"), ("Gzip CSV", "*.csv.gz"), ("Parquet", "*.parquet")]
+# Declared SQL type per exportable column; Parquet column types come from
+# here, never from sampled values (a column can be all NULL for a long while).
+COLUMN_TYPES = {"id": "INTEGER", "day": "INTEGER", **SCRAP_LOG_COLUMNS}
+
+
+def detect_format(path):
+    name = path.lower()
+    if name.endswith(".parquet"):
+        return "parquet"
+    return "csv.gz" if name.endswith(".gz") else "csv"
+
+
+def _chunks(rows, columns, size):
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield [[r[c] for c in columns] for r in chunk]
+
+
+def _write_csv(f, chunks, headers, progress):
+    out = csv.writer(f)
+    out.writerow(headers)
+    n = 0
+    for chunk in chunks:
+        out.writerows(chunk)
+        n += len(chunk)
+        if progress:
+            progress(n)
+    return n
+
+
+def _cast(cast):
+    # SQLite doesn't enforce column types: a value that won't convert is NULL
+    def convert(v):
+        try:
+            return None if v is None or v == "" else cast(v)
+        except (TypeError, ValueError):
+            return None
+    return convert
+
+
+def _write_parquet(path, chunks, headers, types, progress):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).") from None
+
+    arrow = {"INTEGER": (pa.int64(), _cast(int)), "REAL": (pa.float64(), _cast(float))}
+    kinds = [arrow.get(t, (pa.string(), lambda v: None if v is None else str(v))) for t in types]
+    schema = pa.schema([(h, kind[0]) for h, kind in zip(headers, kinds)])
+    n = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:   # no rows: a valid, empty file
+        for chunk in chunks:
+            data = {h: [convert(v) for v in col] for h, (_, convert), col in zip(headers, kinds, zip(*chunk))}
+            writer.write_table(pa.Table.from_pydict(data, schema=schema))
+            n += len(chunk)
+            if progress:
+                progress(n)
+    return n
+
+
+def write_rows(rows, columns, path, headers=None, fmt=None, progress=None, chunk=CHUNK_ROWS):
+    """
+    Write rows (mappings with the given columns) to path in fmt (default: from
+    the extension). progress(rows_written) runs after every chunk and may raise
+    to abort. Returns the number of rows written. Parquet columns are typed
+    from COLUMN_TYPES (other columns: text).
+    """
+    fmt = fmt or detect_format(path)
+    headers = list(headers or columns)
+    chunks = _chunks(rows, columns, chunk)
+    tmp = path + ".part"
+    try:
+        if fmt == "parquet":
+            n = _write_parquet(tmp, chunks, headers, [COLUMN_TYPES.get(c, "TEXT") for c in columns], progress)
+        else:
+            opener = gzip.open if fmt == "csv.gz" else open
+            with opener(tmp, "wt", newline="", encoding="utf-8") as f:
+                n = _write_csv(f, chunks, headers, progress)
+        os.replace(tmp, path)
+        return n
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        close = getattr(rows, "close", None)
+        if close:
+            close()         # release the generator's reader now, not at GC
+
+
+# -----------------
+# Tk: save dialog + progress window + background job
+# -----------------
+class ExportProgress(tk.Toplevel):
+    def __init__(self, parent, key, total=None):
+        super().__init__(parent)
+        self.key = key
+        self.total = total
+        self.title("Exporting…")
+        self.resizable(False, False)
+        self.transient(parent.winfo_toplevel())
+        self.label = tk.Label(self, text="Starting…", font=("Segoe UI", 10), padx=16, pady=10)
+        self.label.pack()
+        mode = "determinate" if total else "indeterminate"
+        self.bar = ttk.Progressbar(self, mode=mode, length=320, maximum=total or 100)
+        self.bar.pack(padx=16)
+        if not total:
+            self.bar.start(15)
+        ttk.Button(self, text="Cancel", command=self.cancel).pack(pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+    def update_count(self, n):
+        if self.total:
+            self.bar["value"] = min(n, self.total)
+            self.label.config(text=f"{n:,} of {self.total:,} rows")
+        else:
+            self.label.config(text=f"{n:,} rows")
+
+    def cancel(self):
+        jobs.cancel(self.key)
+        self.destroy()
+
+
+def start(widget, key, make_rows, columns, headers=None, total=None, name="ScrapSense_Export"):
+    """
+    Ask for a file, then stream make_rows() (called on the worker thread, so
+    it should open its own reader) into it in the background.
+    """
+    path = filedialog.asksaveasfilename(
+        defaultextension=".csv", filetypes=FILETYPES,
+        initialfile=f"{name}_{datetime.now().strftime('%Y-%m-%d')}.csv")
+    if not path:
+        return
+    dialog = ExportProgress(widget, key, total)
+
+    def work(job):
+        return write_rows(make_rows(), columns, path, headers, progress=job.progress)
+
+    def done(n):
+        dialog.destroy()
+        messagebox.showinfo("Exported", f"{n:,} rows saved to:\n{path}")
+
+    def failed(e):
+        dialog.destroy()
+        messagebox.showerror("Export Error", str(e))
+
+    jobs.submit(widget, key, work, done, failed=failed, progress=dialog.update_count)
@@ -0,0 +1,125 @@
+# facets.py — distinct values + row counts for the filter dropdowns
+# Usage:
+#   counts = facet_counts(day_from, day_to, selected={"shift": "A"})
+#   counts["machine_name"]  ->  [("Press-2", 1204), ("Press-7", 988), ...]
+#   facet_label("Press-2", 1204)  ->  "Press-2 (1,204)"
+#
+# Machine, shift and reason counts come from one GROUP BY over the daily
+# rollup (a few thousand rows, not the fact table); operators, which the
+# rollup doesn't carry, from one GROUP BY over scrap_entries. Each facet is
+# counted under the other facets' selections, not its own, so a dropdown
+# still lists every alternative. Rows whose date never parsed (day NULL) have
+# no place in the rollup, so the fact-table counts leave them out as well and
+# every dropdown counts the same rows. Results are cached per data version.
+
+from collections import Counter
+
+from db import reader, DIMENSIONS
+from archive import query_range
+import result_cache
+
+FACETS = ("machine_name", "machine_operator", "shift", "reason")
+_ROLLUP_FACETS = ("machine_name", "shift", "reason")
+
+
+def facet_label(name, count, exact=True):
+    return f"{name or '(blank)'} ({count:,}{'' if exact else '+'})"
+
+
+def _as_names(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _dimension_ids(conn, facet, names):
+    if not names:
+        return set()
+    table = DIMENSIONS[facet][0]
+    marks = ", ".join("?" for _ in names)
+    return {r[0] for r in conn.execute(f"SELECT id FROM {table} WHERE name IN ({marks})", names)}
+
+
+def _day_where(day_from, day_to, col="day"):
+    clauses, params = [], []
+    if day_from is not None:
+        clauses.append(f"{col} >= ?")
+        params.append(day_from)
+    if day_to is not None:
+        clauses.append(f"{col} <= ?")
+        params.append(day_to)
+    return clauses, params
+
+
+def _id_where(ids, facets):
+    """Clauses restricting dimension keys to the selected ids of facets."""
+    clauses, params = [], []
+    for facet in facets:
+        if facet in ids:
+            key = DIMENSIONS[facet][1]
+            clauses.append(f"{key} IN ({', '.join('?' for _ in ids[facet])})")
+            params += sorted(ids[facet])
+    return clauses, params
+
+
+def _entry_groups(conn, group, clauses, params, day_from, day_to):
+    """GROUP BY group over dated fact rows (hot + overlapping archive partitions), on conn."""
+    where = " WHERE " + " AND ".join(["day IS NOT NULL", *clauses])
+    counts = Counter()
+    # one grouped pass per span of partitions; spans are summed here
+    rows = query_range(f"SELECT {group}, COUNT(*) FROM scrap_entries_range{where} GROUP BY {group}",
+                       day_from, day_to, params, conn=conn)
+    for *key, n in rows:
+        counts[tuple(key)] += n
+    return counts
+
+
+def _compute(day_from, day_to, selected, facets):
+    with reader() as conn:
+        ids = {f: _dimension_ids(conn, f, names) or {-1} for f, names in selected.items()}
+        day_clauses, day_params = _day_where(day_from, day_to)
+        keys = [DIMENSIONS[f][1] for f in _ROLLUP_FACETS]
+        counts = {f: Counter() for f in facets}
+
+        if any(f in facets for f in _ROLLUP_FACETS):
+            if "machine_operator" in ids:
+                # the rollup has no operator: group that operator's rows instead
+                clauses, params = _id_where(ids, ("machine_operator",))
+                combos = _entry_groups(conn, ", ".join(keys), day_clauses + clauses, day_params + params,
+                                       day_from, day_to)
+            else:
+                where = " WHERE " + " AND ".join(day_clauses) if day_clauses else ""
+                combos = Counter({tuple(r)[:3]: r[3] for r in conn.execute(
+                    f"SELECT {', '.join(keys)}, SUM(entries) FROM daily_scrap_facts{where} "
+                    f"GROUP BY {', '.join(keys)}", day_params)})
+            for combo, n in combos.items():
+                for i, facet in enumerate(_ROLLUP_FACETS):
+                    if facet not in facets:
+                        continue
+                    if all(combo[j] in ids[other] for j, other in enumerate(_ROLLUP_FACETS)
+                           if j != i and other in ids):
+                        counts[facet][combo[i]] += n
+
+        if "machine_operator" in facets:
+            clauses, params = _id_where(ids, _ROLLUP_FACETS)
+            groups = _entry_groups(conn, DIMENSIONS["machine_operator"][1], day_clauses + clauses,
+                                   day_params + params, day_from, day_to)
+            counts["machine_operator"] = Counter({k[0]: n for k, n in groups.items()})
+
+        out = {}
+        for facet in facets:
+            names = dict(conn.execute(f"SELECT id, name FROM {DIMENSIONS[facet][0]}").fetchall())
+            named = [(names.get(i, ""), n) for i, n in counts[facet].items() if n]
+            out[facet] = sorted(named, key=lambda p: (-p[1], p[0]))
+    return out
+
+
+def facet_counts(day_from=None, day_to=None, selected=None, facets=FACETS):
+    """
+    {facet: [(value, rows), ...]} for rows in the day range, most rows first.
+    selected maps facet -> name (or list of names); "All"/None means no filter.
+    """
+    selected = {f: sorted(_as_names(v)) for f, v in (selected or {}).items()
+                if v is not None and v != "All" and f in FACETS}
+    key = ("facets", day_from, day_to, tuple((f, tuple(v)) for f, v in sorted(selected.items())),
+           tuple(facets))
+    return result_cache.cached(key, lambda: _compute(day_from, day_to, selected, facets),
+                               size=lambda out: sum(result_cache.rows_nbytes(v) for v in out.values()))
@@ -1,8 +1,7 @@
 import os
-import sqlite3
 from datetime import datetime
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
 
 # PDF (no charts, clean summary like your old version)
@@ -11,13 +10,17 @@ from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as RLImage
 from reportlab.lib.styles import getSampleStyleSheet
 
+from db import reader, to_epoch_day, DIMENSIONS
+from archive import query_range, iter_range
+import jobs
+import export
+import result_cache
+
 BASE_DIR = os.path.dirname(__file__)
-DB_PATH = os.path.join(BASE_DIR, "sample_data.db")
 IMAGE_DIR = os.path.join(BASE_DIR, "images")
 LOGO_CANDIDATES = ["scraplogo.png", "scraplogo.jpg", "scraplogo.jpeg", "logo.png"]
-
-def get_conn():
-    return sqlite3.connect(DB_PATH)
+EXPORT_COLUMNS = ("date", "machine_operator", "machine_name", "quantity", "unit", "shift", "reason")
+EXPORT_HEADERS = ("Date", "Operator", "Machine", "Quantity", "Unit", "Shift", "Reason")
 
 def _find_logo_path():
     for name in LOGO_CANDIDATES:
@@ -54,8 +57,12 @@ class GenerateReportFrame(tk.Frame):
 
         actions = tk.Frame(self, bg="#F8FAFC")
         actions.pack(pady=(10, 16))
-        ttk.Button(actions, text="Generate Report (PDF)", command=self.on_generate).pack(side="left", padx=6)
-        ttk.Button(actions, text="Export CSV (table data)", command=self.on_export_csv).pack(side="left", padx=6)
+        self.generate_btn = ttk.Button(actions, text="Generate Report (PDF)", command=self.on_generate)
+        self.generate_btn.pack(side="left", padx=6)
+        ttk.Button(actions, text="Export Data (CSV / Parquet)", command=self.on_export_csv).pack(side="left", padx=6)
+        self.status_lbl = tk.Label(actions, text="", font=("Segoe UI", 10, "italic"),
+                                   bg="#F8FAFC", fg="#475569")
+        self.status_lbl.pack(side="left", padx=10)
 
         # Minimal preview table like your old layout
         self.tree = ttk.Treeview(self, columns=("date", "machine_operator", "machine_name", "quantity", "unit", "shift", "reason"),
@@ -86,16 +93,36 @@ class GenerateReportFrame(tk.Frame):
 
     def _run_query(self, start_s, end_s):
         q = """SELECT date, machine_operator, machine_name, quantity, unit, shift, reason
-               FROM scrap_logs"""
-        params = []
+               FROM scrap_logs_range ORDER BY day ASC, id ASC"""
+        # only the archive partitions overlapping the range get attached;
+        # regenerating the same range reuses the rows until the data changes
+        day_range = self._day_range(start_s, end_s)
+        return result_cache.cached(("report", *day_range),
+                                   lambda: [tuple(r) for r in query_range(q, *day_range)])
+
+    def _day_range(self, start_s, end_s):
+        if start_s and end_s:
+            return to_epoch_day(start_s), to_epoch_day(end_s)
+        return None, None
+
+    def _summary(self, start_s, end_s):
+        """Totals and per-machine/reason/shift counts from the daily_scrap rollup."""
+        where, params = "", []
         if start_s and end_s:
-            q += " WHERE date BETWEEN ? AND ?"
-            params.extend([start_s, end_s])
-        q += " ORDER BY date ASC, id ASC"
-        with get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute(q, params)
-            return cur.fetchall()
+            where = " WHERE day BETWEEN ? AND ?"
+            params = [to_epoch_day(start_s), to_epoch_day(end_s)]
+        with reader() as conn:
+            total_rows, total_qty = conn.execute(
+                f"SELECT COALESCE(SUM(entries), 0), COALESCE(SUM(quantity), 0) FROM daily_scrap_facts{where}",
+                params).fetchone()
+            by = {}
+            for col in ("machine_name", "reason", "shift"):
+                table, key = DIMENSIONS[col]
+                by[col] = [tuple(r) for r in conn.execute(
+                    f"SELECT dim.name, g.n FROM (SELECT {key}, SUM(entries) AS n FROM daily_scrap_facts{where} "
+                    f"GROUP BY {key}) g JOIN {table} dim ON dim.id = g.{key} ORDER BY g.n DESC, dim.name",
+                    params)]
+        return total_rows, total_qty, by
 
     def _refresh_table(self, rows):
         self.tree.delete(*self.tree.get_children())
@@ -110,35 +137,45 @@ class GenerateReportFrame(tk.Frame):
             messagebox.showerror("Invalid Date", str(e))
             return
 
-        try:
+        # Query + PDF build run on a worker so the window keeps repainting
+        def work(job):
             rows = self._run_query(start_s, end_s)
+            job.check()
+            return rows, (self._export_pdf(rows, start_s, end_s) if rows else None)
+
+        def done(result):
+            rows, pdf_path = result
+            self._current_rows = rows
+            self._refresh_table(rows)
             if not rows:
                 messagebox.showinfo("No Data", "No scrap logs for the selected range.")
-                self._current_rows = []
-                self._refresh_table([])
                 return
-            self._current_rows = rows
-            self._refresh_table(rows)
-            pdf_path = self._export_pdf(rows, start_s, end_s)
             messagebox.showinfo("Success", f"Report successfully generated and saved!\n\n{pdf_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not generate report.\n\n{e}")
+
+        jobs.submit(self, "report.generate", work, done, busy=self._set_busy,
+                    failed=lambda e: messagebox.showerror("Error", f"Could not generate report.\n\n{e}"))
+
+    def _set_busy(self, busy):
+        self.config(cursor="watch" if busy else "")
+        self.generate_btn.state(["disabled"] if busy else ["!disabled"])
+        self.status_lbl.config(text="Generating report\u2026" if busy else "")
 
     def on_export_csv(self):
-        if not self._current_rows:
-            messagebox.showinfo("Export", "Generate or load data first.")
+        try:
+            start_s, end_s = self._parse_range()
+        except ValueError as e:
+            messagebox.showerror("Invalid Date", str(e))
             return
-        fp = filedialog.asksaveasfilename(defaultextension=".csv",
-                                          filetypes=[("CSV Files", "*.csv")],
-                                          initialfile=f"ScrapSense_Export_{datetime.now().strftime('%Y-%m-%d')}.csv")
-        if not fp: return
-        import csv
-        with open(fp, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["Date","Operator","Machine","Quantity","Unit","Shift","Reason"])
-            for r in self._current_rows:
-                writer.writerow(list(r))
-        messagebox.showinfo("Export", f"CSV saved to:\n{fp}")
+        day_from, day_to = self._day_range(start_s, end_s)
+        with reader() as conn:
+            where = " WHERE day BETWEEN ? AND ?" if day_from is not None else ""
+            total = conn.execute(f"SELECT SUM(entries) FROM daily_scrap_facts{where}",
+                                 [day_from, day_to] if where else []).fetchone()[0]
+        # Streamed from the cursor in chunks, not from the rows held for the preview
+        export.start(self, "report.export",
+                     lambda: iter_range(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM scrap_logs_range "
+                                        f"ORDER BY day ASC, id ASC", day_from, day_to),
+                     EXPORT_COLUMNS, headers=EXPORT_HEADERS, total=total)
 
     # --- PDF export (old style: clean summary, tables, no charts) ---
     def _export_pdf(self, rows, start_s, end_s):
@@ -171,21 +208,16 @@ class GenerateReportFrame(tk.Frame):
         story.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}", P))
         story.append(Spacer(1, 10))
 
-        # --- Summary stats ---
-        total_qty = sum(float(r[3]) for r in rows)
-        total_rows = len(rows)
-        # by machine / reason / shift
-        from collections import Counter
-        by_machine = Counter(r[2] for r in rows)
-        by_reason = Counter(r[6] for r in rows)
-        by_shift  = Counter(r[5] for r in rows)
+        # --- Summary stats (from the rollup, not a pass over every row) ---
+        total_rows, total_qty, by = self._summary(start_s, end_s)
+        by_machine, by_reason, by_shift = by["machine_name"], by["reason"], by["shift"]
 
         summary_tbl = Table([
             ["Total Entries", str(total_rows)],
             ["Total Scrap", f"{int(total_qty)} (mixed units)"],
-            ["Top Machine", (by_machine.most_common(1)[0][0] if by_machine else "—")],
-            ["Top Reason", (by_reason.most_common(1)[0][0] if by_reason else "—")],
-            ["Top Shift",  (by_shift.most_common(1)[0][0] if by_shift else "—")],
+            ["Top Machine", (by_machine[0][0] if by_machine else "—")],
+            ["Top Reason", (by_reason[0][0] if by_reason else "—")],
+            ["Top Shift",  (by_shift[0][0] if by_shift else "—")],
         ], colWidths=[150, 340])
         summary_tbl.setStyle(TableStyle([
             ("FONT", (0,0), (-1,-1), "Helvetica", 10),
@@ -200,7 +232,7 @@ class GenerateReportFrame(tk.Frame):
         # --- Scrap by Machine ---
         story.append(Paragraph("Scrap by Machine", styles["Heading2"]))
         machine_rows = [["Machine", "Count (rows)"]]
-        for name, cnt in by_machine.most_common():
+        for name, cnt in by_machine:
             machine_rows.append([name, str(cnt)])
         story.append(self._styled_table(machine_rows))
         story.append(Spacer(1, 10))
@@ -208,7 +240,7 @@ class GenerateReportFrame(tk.Frame):
         # --- Scrap by Reason ---
         story.append(Paragraph("Scrap by Reason", styles["Heading2"]))
         reason_rows = [["Reason", "Count (rows)"]]
-        for name, cnt in by_reason.most_common():
+        for name, cnt in by_reason:
             reason_rows.append([name, str(cnt)])
         story.append(self._styled_table(reason_rows))
         story.append(Spacer(1, 10))
@@ -0,0 +1,70 @@
+# ingest.py — stream MES exports (CSV / JSONL) into scrap_logs
+# Usage:
+#   python -m ingest exports/mes_2025.csv
+#   python -m ingest exports/line3.jsonl --batch 100000 --db plant.db
+#   python -m ingest exports/mes_2025.csv --restart      # ignore saved checkpoint
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+import db
+
+
+def iter_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from csv.DictReader(f)
+
+
+def iter_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+READERS = {"csv": iter_csv, "jsonl": iter_jsonl}
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    return "jsonl" if ext in (".jsonl", ".ndjson", ".json") else "csv"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m ingest",
+                                 description="Bulk-load scrap records into the ScrapSense database.")
+    ap.add_argument("path", help="CSV or JSONL export")
+    ap.add_argument("--format", choices=sorted(READERS), help="default: from file extension")
+    ap.add_argument("--batch", type=int, default=db.INGEST_BATCH, help="rows per transaction")
+    ap.add_argument("--db", help=f"database file (default: {db.DB_FILE})")
+    ap.add_argument("--restart", action="store_true", help="discard the saved checkpoint for this file")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_FILE = args.db
+    source = os.path.abspath(args.path)
+    if args.restart:
+        with db.writer() as conn:
+            conn.execute("DELETE FROM ingest_checkpoints WHERE source = ?", (source,))
+
+    def report(stats):
+        print(f"\r{stats['rows']:>12,} rows  {stats['rejected']:,} rejected  "
+              f"{stats['rows_per_sec']:>10,.0f} rows/s", end="", flush=True)
+
+    records = READERS[args.format or detect_format(args.path)](args.path)
+    stats = db.bulk_ingest(records, source=source, batch_size=args.batch, progress=report)
+    print()
+    if stats["skipped"]:
+        print(f"Resumed after {stats['skipped']:,} already-loaded records.")
+    print(f"Loaded {stats['rows']:,} rows in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_sec']:,.0f} rows/s), rejected {stats['rejected']:,}.")
+    db.close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
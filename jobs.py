@@ -0,0 +1,154 @@
+# jobs.py — run DB queries and heavy compute off the Tk main thread
+# Usage:
+#   def work(job):                 # worker thread: no Tk calls in here
+#       with reader() as conn:
+#           rows = conn.execute(...).fetchall()
+#       job.check()                # raises Cancelled if superseded meanwhile
+#       return rows
+#   jobs.submit(self, "viewlog.fetch", work, done=self.show_rows, busy=self.set_busy)
+#
+# Results come back on the Tk thread (a queue drained with after()). A new
+# job under the same key supersedes the running one: its pooled readers get
+# conn.interrupt(), so a stale query stops mid-scan, and its result is dropped.
+
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+import db
+
+WORKERS = 2
+POLL_MS = 30
+
+
+class Cancelled(Exception):
+    """Raised inside a job that was superseded or cancelled."""
+
+
+class Job:
+    def __init__(self, key, busy=None, progress=None):
+        self.key = key
+        self.busy = busy
+        self.on_progress = progress
+        self.cancelled = False
+        self._conns = set()
+        self._lock = threading.Lock()
+
+    def watch(self, conn):
+        with self._lock:
+            self._conns.add(conn)
+            if self.cancelled:
+                conn.interrupt()
+
+    def unwatch(self, conn):
+        # under the lock: once returned to the pool, the conn is never interrupted
+        with self._lock:
+            self._conns.discard(conn)
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            for conn in self._conns:
+                conn.interrupt()
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled(self.key)
+
+    def progress(self, value):
+        """From the worker: hand value to the submitter's progress callback (Tk thread)."""
+        self.check()
+        if self.on_progress is not None:
+            _results.put(("progress", self, value, None))
+
+
+_executor = None
+_results = queue.Queue()
+_active = {}            # key -> Job; touched on the Tk thread only
+_poll_root = None
+
+
+def _run(job, work):
+    job.check()
+    db.job_context.job = job
+    try:
+        return work(job)
+    except sqlite3.OperationalError:
+        if job.cancelled:           # "interrupted"
+            raise Cancelled(job.key) from None
+        raise
+    finally:
+        db.job_context.job = None
+
+
+def submit(widget, key, work, done, failed=None, busy=None, progress=None):
+    """
+    Run work(job) on a worker thread; then done(result) — or failed(exc) —
+    on the Tk thread. busy(True/False) brackets the latest job of this key;
+    progress(value) receives what the job passes to job.progress().
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(WORKERS, thread_name_prefix="scrapsense-job")
+    old = _active.pop(key, None)
+    if old is not None:
+        old.cancel()
+    job = _active[key] = Job(key, busy, progress)
+    if busy:
+        busy(True)
+    future = _executor.submit(_run, job, work)
+    future.add_done_callback(lambda f: _results.put(("done", job, f, (done, failed))))
+    _start_polling(widget)
+    return job
+
+
+def cancel(key):
+    """Cancel the job running under key, if any (its result is dropped)."""
+    job = _active.pop(key, None)
+    if job is not None:
+        job.cancel()
+        if job.busy:
+            job.busy(False)
+
+
+def _show_error(exc):
+    messagebox.showerror("Error", str(exc))
+
+
+def _start_polling(widget):
+    global _poll_root
+    if _poll_root is None:
+        _poll_root = widget.winfo_toplevel()
+        _poll_root.after(POLL_MS, _drain)
+
+
+def _drain():
+    global _poll_root
+    while True:
+        try:
+            kind, job, payload, callbacks = _results.get_nowait()
+        except queue.Empty:
+            break
+        if _active.get(job.key) is not job:
+            continue                # superseded / cancelled: nobody wants it
+        try:
+            if kind == "progress":
+                job.on_progress(payload)
+                continue
+            del _active[job.key]
+            future, (done, failed) = payload, callbacks
+            if job.busy:
+                job.busy(False)
+            exc = future.exception()
+            if exc is None:
+                done(future.result())
+            elif not isinstance(exc, Cancelled):
+                (failed or _show_error)(exc)
+        except Exception as e:      # keep draining other jobs' results
+            _show_error(e)
+    if _active:
+        _poll_root.after(POLL_MS, _drain)
+    else:
+        _poll_root = None
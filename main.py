@@ -3,7 +3,7 @@ import tkinter as tk
 from PIL import Image, ImageTk
 
 # Initialize SQLite database with sample data
-from db import init_sample_data
+from db import init_sample_data, DB_FILE
 init_sample_data()
 
 from dashboard import DashboardFrame
@@ -87,7 +87,7 @@ class ScrapSenseApp(tk.Tk):
         # Footer info
         footer = tk.Label(
             self,
-            text="Database: SQLite (sample_data.db)",
+            text=f"Database: SQLite ({os.path.basename(DB_FILE)})",
             bg="#F8FAFC", fg="#64748B",
             font=("Segoe UI", 9)
         )
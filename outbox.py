@@ -0,0 +1,207 @@
+# outbox.py — durable local queue for scrap entries; never blocks the operator
+# Usage:
+#   outbox.enqueue([entry, ...])     # fsync'd to the journal, returns at once
+#   outbox.pending()                 # entries not yet in the database
+#   python -m outbox [--db plant.db] # drain the journal now (e.g. after an outage)
+#
+# Each enqueue() appends one JSON line {"key", "entries", "queued_at"} to a
+# journal on the local disk (~/.scrapsense/, not next to a possibly shared or
+# unreachable database) and fsyncs it. A background thread drains the journal
+# into the database in batches: every record is applied with db.insert_once
+# under its idempotency key, all in one transaction, and the journal is only
+# trimmed after the commit. A crash in between replays records the DB already
+# has, and insert_once skips them. While the database is locked or
+# unreachable, the flusher retries with exponential backoff. Records the
+# database rejects outright go to a .rejected.jsonl file beside the journal
+# rather than blocking the queue.
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import uuid
+from datetime import datetime
+
+import db
+
+FLUSH_RECORDS = 500         # journal records per transaction
+RETRY_MIN_S = 0.5
+RETRY_MAX_S = 60.0
+
+_lock = threading.Lock()     # journal file
+_wake = threading.Event()
+_thread = None
+_state = {"error": None, "retry_in": 0.0}
+
+
+def journal_path():
+    """One journal per database, on this machine."""
+    if os.getenv("SCRAPSENSE_OUTBOX"):
+        return os.getenv("SCRAPSENSE_OUTBOX")
+    tag = hashlib.sha1(os.path.abspath(db.DB_FILE).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(os.path.expanduser("~"), ".scrapsense", f"outbox-{tag}.jsonl")
+
+
+def rejected_path():
+    return os.path.splitext(journal_path())[0] + ".rejected.jsonl"
+
+
+def _append(path, lines):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def enqueue(entries):
+    """
+    Durably queue entry dicts as one all-or-nothing write and wake the
+    flusher. Returns the idempotency key.
+    """
+    key = uuid.uuid4().hex
+    record = {"key": key, "entries": list(entries), "queued_at": datetime.now().isoformat(timespec="seconds")}
+    line = json.dumps(record, default=str) + "\n"
+    with _lock:
+        _append(journal_path(), [line])
+    start()
+    _wake.set()
+    return key
+
+
+def _read(path):
+    """(records, byte length read); a torn last line (crash mid-append) is left for later."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+    end = data.rfind(b"\n") + 1
+    records = []
+    for line in data[:end].splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue        # garbage line: nothing recoverable
+    return records, end
+
+
+def _trim(path, consumed):
+    """Drop the first consumed bytes, keeping anything appended since the read."""
+    with open(path, "rb") as f:
+        f.seek(consumed)
+        rest = f.read()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(rest)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def pending():
+    """Number of queued entries not yet flushed."""
+    with _lock:
+        records, _ = _read(journal_path())
+    return sum(len(r.get("entries", ())) for r in records)
+
+
+def status():
+    """{"pending", "error", "retry_in"} for the UI: last flush error and backoff, if any."""
+    return {"pending": pending(), **_state}
+
+
+def _apply(records):
+    """Write records in one transaction; returns (applied entries, rejected records)."""
+    try:
+        with db.writer() as conn:
+            return sum(db.insert_once(conn, r["key"], r["entries"]) for r in records), []
+    except sqlite3.OperationalError:
+        raise               # locked / unreachable: retry the whole batch later
+    except Exception:
+        if len(records) == 1:
+            return 0, records
+    # something in the batch is bad data: isolate it record by record
+    applied, rejected = 0, []
+    for r in records:
+        n, bad = _apply([r])
+        applied += n
+        rejected += bad
+    return applied, rejected
+
+
+def flush():
+    """Drain the journal into the database now. Returns entries written; raises if the DB is unavailable."""
+    path = journal_path()
+    written = 0
+    while True:
+        with _lock:
+            records, end = _read(path)
+        if not records:
+            return written
+        # only whole records up to the batch size; their byte span is what gets trimmed
+        batch, consumed = records[:FLUSH_RECORDS], end
+        if len(records) > FLUSH_RECORDS:
+            consumed = _offset_after(path, FLUSH_RECORDS)
+        applied, rejected = _apply(batch)
+        written += applied
+        with _lock:
+            if rejected:
+                _append(rejected_path(), [json.dumps(r, default=str) + "\n" for r in rejected])
+            _trim(path, consumed)
+
+
+def _offset_after(path, n):
+    """Byte offset just past the first n lines of the journal."""
+    with open(path, "rb") as f:
+        for _ in range(n):
+            f.readline()
+        return f.tell()
+
+
+def _run():
+    delay = 0.0
+    while True:
+        _wake.wait(timeout=delay or None)
+        _wake.clear()
+        try:
+            flush()
+            delay = 0.0
+            _state.update(error=None, retry_in=0.0)
+        except (sqlite3.Error, OSError) as e:
+            # locked by a long ingest/report, or the share is gone: back off and retry
+            delay = min(RETRY_MAX_S, max(RETRY_MIN_S, delay * 2)) * random.uniform(0.8, 1.2)
+            _state.update(error=str(e), retry_in=delay)
+
+
+def start():
+    """Start the background flusher (idempotent); it drains leftovers from a previous run first."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="scrapsense-outbox", daemon=True)
+            _thread.start()
+    _wake.set()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m outbox",
+                                 description="Write queued scrap entries into the database.")
+    ap.add_argument("--db", help=f"database file (default: {db.DB_FILE})")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_FILE = args.db
+    print(f"{journal_path()}: {pending():,} entries queued")
+    written = flush()
+    print(f"Wrote {written:,} entries.")
+    db.close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
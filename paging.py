@@ -0,0 +1,218 @@
+# paging.py — keyset (seek) pagination for the log screens
+# Usage:
+#   pager = KeysetPager("scrap_logs s", ["s.shift = ?"], ["A"])
+#   blocks = RowBlocks(pager)           # random access for a scrolling view
+#   with reader() as conn:
+#       rows = blocks.rows(conn, 0, 50)
+#       total, exact = blocks.count(conn)
+#       for row in pager.iter_all(conn): ...
+#
+# Pages are fetched with WHERE (sort key) < (last key seen) ... LIMIT n instead
+# of OFFSET, so each next/previous page costs one index seek no matter how deep
+# it is. A jump (scrollbar drag, End) has no key to seek from: it pays OFFSET
+# from whichever end of the result is nearer, reading the order reversed when
+# that is the tail, so the last page is one seek too. The final sort key must
+# be unique (s.id).
+
+import threading
+from collections import OrderedDict
+
+from db import data_version, day_key
+from result_cache import rows_nbytes
+
+DEFAULT_ORDER = ((day_key("s"), True), ("s.id", True))      # (expression, descending)
+COUNT_CAP = 100_000       # queries without a cheap count_query are counted up to this
+_COUNT_CACHE_SIZE = 64
+
+_count_cache = {}         # (count sql, params, data version) -> (count, exact)
+_count_lock = threading.Lock()      # counts run on job workers; never held across the query
+
+
+def order_sql(keys, reverse=False):
+    return ", ".join(f"{expr} {'DESC' if desc != reverse else 'ASC'}" for expr, desc in keys)
+
+
+def _seek(keys, values, after):
+    """WHERE fragment + params for rows strictly after (or before) values in keys order."""
+    if len({desc for _, desc in keys}) == 1:
+        op = "<" if keys[0][1] == after else ">"
+        exprs = ", ".join(expr for expr, _ in keys)
+        # the redundant bound on the leading key lets SQLite range-seek an
+        # expression index, which it won't do from the row value alone
+        return (f"{keys[0][0]} {op}= ? AND ({exprs}) {op} ({', '.join('?' for _ in keys)})",
+                [values[0], *values])
+    # mixed directions: (a after) OR (a = and b after) OR ...
+    ors, params = [], []
+    for i, (expr, desc) in enumerate(keys):
+        op = "<" if desc == after else ">"
+        ands = [f"{e} = ?" for e, _ in keys[:i]] + [f"{expr} {op} ?"]
+        ors.append("(" + " AND ".join(ands) + ")")
+        params += list(values[:i]) + [values[i]]
+    return "(" + " OR ".join(ors) + ")", params
+
+
+def cached_count(conn, sql, params):
+    """Scalar COUNT query, memoized until the data changes."""
+    key = (sql, tuple(params), data_version(conn))
+    with _count_lock:
+        hit = _count_cache.get(key)
+    if hit is None:
+        hit = conn.execute(sql, params).fetchone()[0] or 0
+        with _count_lock:
+            while len(_count_cache) >= _COUNT_CACHE_SIZE:
+                _count_cache.pop(next(iter(_count_cache)))
+            _count_cache[key] = hit
+    return hit
+
+
+class KeysetPager:
+    """
+    Pages of SELECT columns FROM frm WHERE clauses ORDER BY order.
+    count_query=(sql, params) supplies an exact cheap count (e.g. an indexed
+    COUNT on scrap_entries); otherwise rows are counted up to COUNT_CAP.
+    """
+
+    def __init__(self, frm, clauses, params, page_size=50, columns="s.*",
+                 order=DEFAULT_ORDER, count_query=None):
+        self.frm = frm
+        self.clauses = [c for c in clauses if c]
+        self.params = list(params)
+        self.page_size = page_size
+        self.columns = columns
+        self.order = tuple(order)
+        self.count_query = count_query
+
+    def _select(self, conn, extra=None, extra_params=(), reverse=False, limit=None, offset=0):
+        keys = ", ".join(f"{expr} AS _k{i}" for i, (expr, _) in enumerate(self.order))
+        clauses = self.clauses + ([extra] if extra else [])
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        sql = (f"SELECT {self.columns}, {keys} FROM {self.frm}{where} "
+               f"ORDER BY {order_sql(self.order, reverse)} LIMIT ? OFFSET ?")
+        rows = conn.execute(sql, self.params + list(extra_params)
+                            + [limit or self.page_size, offset]).fetchall()
+        return rows[::-1] if reverse else rows
+
+    def _key(self, row):
+        return [row[f"_k{i}"] for i in range(len(self.order))]
+
+    def _seek_rows(self, conn, anchor, after, limit=None):
+        where, params = _seek(self.order, self._key(anchor), after)
+        return self._select(conn, where, params, reverse=not after, limit=limit)
+
+    def count(self, conn):
+        """(row count, exact?) — cached per filter until the data changes."""
+        if self.count_query:
+            return cached_count(conn, *self.count_query), True
+        where = " WHERE " + " AND ".join(self.clauses) if self.clauses else ""
+        n = cached_count(conn, f"SELECT COUNT(*) FROM (SELECT 1 FROM {self.frm}{where} LIMIT {COUNT_CAP + 1})",
+                         self.params)
+        return min(n, COUNT_CAP), n <= COUNT_CAP
+
+    def iter_all(self, conn, batch=5000):
+        """Every matching row in order, fetched batch rows per seek."""
+        rows = self._select(conn, limit=batch)
+        while rows:
+            yield from rows
+            if len(rows) < batch:
+                return
+            where, params = _seek(self.order, self._key(rows[-1]), True)
+            rows = self._select(conn, where, params, limit=batch)
+
+
+class RowBlocks:
+    """
+    Random access to a pager's rows for a scrolling view: block k holds rows
+    [k * block_size, (k + 1) * block_size). A block next to a cached one is a
+    keyset seek from its edge; only a jump into the unknown pays for OFFSET,
+    counted from the tail when the count is exact and the tail is nearer.
+    At most max_blocks are kept (least recently used dropped). Blocks are
+    fetched on workers and read from the Tk thread / result_cache, so the
+    block map is only touched under a lock (never held across a query).
+    """
+
+    def __init__(self, pager, block_size=200, max_blocks=16):
+        self.pager = pager
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _block(self, conn, k):
+        with self._lock:
+            rows = self._blocks.get(k)
+            if rows is not None:
+                self._blocks.move_to_end(k)
+                return rows
+            before, after = self._blocks.get(k - 1), self._blocks.get(k + 1)
+        size = self.block_size
+        if before is not None and len(before) == size:
+            rows = self.pager._seek_rows(conn, before[-1], after=True, limit=size)
+        elif before is not None:
+            rows = []       # previous block was the end of the result
+        elif after:
+            rows = self.pager._seek_rows(conn, after[0], after=False, limit=size)
+        else:
+            rows = self._jump(conn, k)
+        with self._lock:
+            self._blocks[k] = rows
+            if len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        return rows
+
+    def _jump(self, conn, k):
+        size = self.block_size
+        total, exact = self.pager.count(conn)
+        lo, hi = k * size, min((k + 1) * size, total)
+        if exact and total - hi < lo:
+            # nearer the end: read the order reversed (_select flips it back)
+            if hi <= lo:
+                return []
+            return self.pager._select(conn, reverse=True, limit=hi - lo, offset=total - hi)
+        return self.pager._select(conn, limit=size, offset=lo)
+
+    def _gather(self, start, stop, block):
+        size = self.block_size
+        out = []
+        for k in range(start // size, (stop - 1) // size + 1):
+            rows = block(k)
+            if rows is None:
+                return None
+            lo = max(start - k * size, 0)
+            out.extend(rows[lo:stop - k * size])
+            if len(rows) < size:
+                break
+        return out
+
+    def invalidate(self):
+        """Forget cached blocks (after rows were edited or deleted)."""
+        with self._lock:
+            self._blocks.clear()
+
+    def nbytes(self):
+        with self._lock:
+            blocks = list(self._blocks.values())
+        return sum(rows_nbytes(rows) for rows in blocks)
+
+    def rows(self, conn, start, stop):
+        """Rows start..stop-1 (fewer at the end of the result)."""
+        if stop <= start:
+            return []
+        return self._gather(start, stop, lambda k: self._block(conn, k))
+
+    def peek(self, start, stop):
+        """Like rows(), from cached blocks only: None if any is missing. No query."""
+        if stop <= start:
+            return []
+        with self._lock:
+            return self._gather(start, stop, self._blocks.get)
+
+    def count(self, conn):
+        """(rows, exact?) — a capped count grows as scrolling finds more rows."""
+        total, exact = self.pager.count(conn)
+        if not exact:
+            with self._lock:
+                blocks = list(self._blocks.items())
+            for k, rows in blocks:
+                end = k * self.block_size + len(rows)
+                total = max(total, end + (self.block_size if len(rows) == self.block_size else 0))
+        return total, exact
@@ -0,0 +1,105 @@
+# result_cache.py — LRU cache of query results, keyed by filters + data version
+# Usage:
+#   rows = result_cache.cached(("report", day_from, day_to), lambda: run_query(...))
+#   result_cache.invalidate()        # drop everything (done on every writer() commit)
+#
+# An entry is only served while db.data_version() — the change counter plus
+# MAX(id) — still matches the version it was stored under, so a write from
+# any process (ingest CLI, another station) makes it unreachable. Commits in
+# this process also clear the cache outright to give the memory back.
+# Entries are evicted least recently used once their total size passes MAX_BYTES.
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import db
+
+MAX_BYTES = int(os.getenv("SCRAPSENSE_RESULT_CACHE_MB", "64")) * 1024 * 1024
+_SAMPLE_ROWS = 100
+
+
+def rows_nbytes(rows):
+    """Approximate memory held by a list of rows (sampled, not walked in full)."""
+    if not rows:
+        return sys.getsizeof(rows)
+    sample = rows[:_SAMPLE_ROWS]
+    per_row = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r) for r in sample) / len(sample)
+    return sys.getsizeof(rows) + int(per_row * len(rows))
+
+
+class ResultCache:
+    """
+    {key: (version, value, size)} in LRU order. size is bytes, or a callable
+    returning bytes for values that keep growing after they are stored
+    (e.g. paging.RowBlocks filling in blocks as the user scrolls).
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value, size):
+        with self._lock:
+            self._entries[key] = (version, value, size)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        sizes = {k: s() if callable(s) else s for k, (_, _, s) in self._entries.items()}
+        total = sum(sizes.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            total -= sizes[key]
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def nbytes(self):
+        with self._lock:
+            return sum(s() if callable(s) else s for _, _, s in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+
+results = ResultCache()
+
+
+def cached(key, compute, size=rows_nbytes, conn=None):
+    """
+    compute() for key, reused while the data is unchanged. The version is read
+    before computing, so a write racing the query leaves a stale entry that can
+    never be hit. size(value) gives bytes (or a callable, see ResultCache).
+    """
+    if conn is None:
+        with db.reader() as conn:
+            version = db.data_version(conn)
+    else:
+        version = db.data_version(conn)
+    value = results.get(key, version)
+    if value is None:
+        value = compute()
+        results.put(key, version, value, size(value))
+    return value
+
+
+def invalidate():
+    results.invalidate()
+
+
+db.on_commit(invalidate)
@@ -0,0 +1,81 @@
+# search.py — free-text search over scrap_logs via the scrap_logs_fts trigram index
+# Usage:
+#   from search import search_query, text_filter
+#   frm, clauses, params, order = search_query(conn, "overheat press-2")
+#   where, params = text_filter(conn, "press", columns=("machine_name",))
+
+from db import day_key, scrap_logs_from, SEARCH_COLUMNS
+
+MIN_TERM = 3          # trigram index cannot match shorter substrings
+
+_fts_ok = None
+
+
+def fts_available(conn) -> bool:
+    global _fts_ok
+    if _fts_ok is None:
+        _fts_ok = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'scrap_logs_fts'").fetchone() is not None
+    return _fts_ok
+
+
+def _terms(text):
+    return [t for t in str(text or "").split() if t]
+
+
+def match_expression(text, columns=None):
+    """
+    User text -> FTS5 MATCH string: every term (>= 3 chars) must appear as a
+    substring, optionally restricted to columns. None if no usable term.
+    """
+    terms = [t for t in _terms(text) if len(t) >= MIN_TERM]
+    if not terms:
+        return None
+    phrases = " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+    if columns:
+        return "{" + " ".join(columns) + "} : (" + phrases + ")"
+    return phrases
+
+
+def text_filter(conn, text, columns=SEARCH_COLUMNS, alias="s"):
+    """
+    WHERE fragment (without leading AND) + params requiring every term of text
+    in any of columns. Short terms, or a DB without FTS5, fall back to LIKE.
+    Returns ("", []) for blank text.
+    """
+    clauses, params = [], []
+    use_fts = fts_available(conn)
+    expr = match_expression(text, columns) if use_fts else None
+    if expr:
+        clauses.append(f"{alias}.id IN (SELECT rowid FROM scrap_logs_fts WHERE scrap_logs_fts MATCH ?)")
+        params.append(expr)
+    for t in _terms(text):
+        if use_fts and len(t) >= MIN_TERM:
+            continue
+        clauses.append("(" + " OR ".join(f"{alias}.{c} LIKE ?" for c in columns) + ")")
+        params.extend([f"%{t}%"] * len(columns))
+    return " AND ".join(clauses), params
+
+
+def search_query(conn, text, alias="s", lead=None):
+    """
+    (FROM clause, WHERE clauses, params, sort keys) for a ranked text search.
+    Joins the FTS index so results come back best match first (bm25 rank).
+    Sort keys are (expression, descending) pairs ending in the unique id, as
+    paging.KeysetPager expects. Without usable search terms the FROM is
+    db.scrap_logs_from(alias, lead).
+    """
+    expr = match_expression(text) if fts_available(conn) else None
+    if expr is None:
+        where, params = text_filter(conn, text, alias=alias)
+        return (scrap_logs_from(alias, lead), [where] if where else [], params,
+                ((day_key(alias), True), (f"{alias}.id", True)))
+    clauses, params = ["scrap_logs_fts MATCH ?"], [expr]
+    short = " ".join(t for t in _terms(text) if len(t) < MIN_TERM)
+    if short:
+        where, extra = text_filter(conn, short, alias=alias)
+        clauses.append(where)
+        params += extra
+    return (f"scrap_logs_fts f JOIN scrap_logs {alias} ON {alias}.id = f.rowid", clauses, params,
+            (("f.rank", False), (f"{alias}.id", False)))
+
@@ -0,0 +1,212 @@
+# snapshot.py — memory-mapped columnar copy of scrap_entries for analytics
+# Usage:
+#   from snapshot import columns
+#   cols = columns()        # {"id": ndarray, "day": ..., "quantity": ...}, read-only memmaps
+#   python -m snapshot [--rebuild] [--db plant.db]
+#
+# One .npy per column under <db file>.snapshot/, preallocated with spare
+# capacity and valid up to meta["rows"]. Rows with id > meta["max_id"] are
+# appended in place; an UPDATE/DELETE since the last refresh (db.change_counter,
+# which archiving bumps too) or a different database triggers a full rebuild
+# from the hot rows plus every archive partition. One process refreshes at a time.
+# backtest.load_series groups its (series x day) matrix straight from these
+# columns instead of running a GROUP BY per backtest.
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import db
+from archive import range_views
+
+FORMAT = 1
+COLUMNS = {
+    "id": np.int64,
+    "day": np.int32,
+    "operator_id": np.int32,
+    "machine_id": np.int32,
+    "unit_id": np.int32,
+    "shift_id": np.int32,
+    "reason_id": np.int32,
+    "quantity": np.float64,          # NULL -> NaN
+    "total_produced": np.float64,
+}
+NULL_DAY = np.iinfo(np.int32).min
+FETCH_ROWS = 100_000
+MIN_CAPACITY = 1 << 16
+
+_SELECT = "SELECT " + ", ".join(f"COALESCE(day, {NULL_DAY})" if c == "day" else c for c in COLUMNS)
+
+_lock = threading.Lock()
+_maps = {}      # (dir, gen) -> {column: read-only memmap}
+
+
+def snapshot_dir():
+    return os.getenv("SCRAPSENSE_SNAPSHOT_DIR") or os.path.abspath(db.DB_FILE) + ".snapshot"
+
+
+def _column_path(directory, col, gen):
+    return os.path.join(directory, f"{col}.{gen}.npy")
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(directory, meta):
+    path = os.path.join(directory, "meta.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def _to_arrays(rows):
+    """Fetched _SELECT tuples -> {column: ndarray}."""
+    values = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+    return {col: np.array(v, dtype=dtype) for (col, dtype), v in zip(COLUMNS.items(), values)}
+
+
+def _drop_old_generations(directory, gen):
+    _maps.clear()
+    for path in glob.glob(os.path.join(directory, "*.npy")):
+        if not path.endswith(f".{gen}.npy"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass        # still mapped somewhere (Windows); removed on a later refresh
+
+
+def _append(directory, meta, arrays):
+    """Write arrays after meta["rows"], growing into a new generation if full."""
+    n = len(arrays["id"])
+    if not n:
+        return
+    start, end = meta["rows"], meta["rows"] + n
+    if end > meta["capacity"]:
+        gen, capacity = meta["gen"] + 1, max(MIN_CAPACITY, end + end // 2)
+        out = {}
+        for col, dtype in COLUMNS.items():
+            out[col] = np.lib.format.open_memmap(_column_path(directory, col, gen), mode="w+",
+                                                 dtype=dtype, shape=(capacity,))
+            if start:
+                out[col][:start] = np.load(_column_path(directory, col, meta["gen"]), mmap_mode="r")[:start]
+        meta.update(gen=gen, capacity=capacity)
+    else:
+        out = {col: np.load(_column_path(directory, col, meta["gen"]), mmap_mode="r+") for col in COLUMNS}
+    for col, arr in out.items():
+        arr[start:end] = arrays[col]
+        arr.flush()
+    meta["rows"] = end
+    meta["max_id"] = max(meta["max_id"], int(arrays["id"].max()))
+
+
+def _rebuild(directory, conn, meta, changes):
+    total = conn.execute("SELECT COUNT(*) FROM scrap_entries").fetchone()[0]
+    total += conn.execute("SELECT COALESCE(SUM(rows), 0) FROM archive_partitions").fetchone()[0]
+    gen = (meta or {}).get("gen", 0) + 1
+    meta = {"format": FORMAT, "db": os.path.abspath(db.DB_FILE), "changes": changes,
+            "gen": gen, "capacity": max(MIN_CAPACITY, total + total // 4), "rows": 0, "max_id": 0}
+    for col, dtype in COLUMNS.items():
+        np.lib.format.open_memmap(_column_path(directory, col, gen), mode="w+",
+                                  dtype=dtype, shape=(meta["capacity"],)).flush()
+    for views in range_views(conn):
+        with views:
+            cur = conn.execute(f"{_SELECT} FROM scrap_entries_range")
+            while True:
+                rows = cur.fetchmany(FETCH_ROWS)
+                if not rows:
+                    break
+                _append(directory, meta, _to_arrays(rows))
+    return meta
+
+
+def refresh(rebuild=False):
+    """
+    Bring the snapshot up to date with the database: append new rows, or
+    rebuild when rows were changed/removed. Returns {"rows", "appended", "rebuilt", "seconds"}.
+    """
+    start = time.perf_counter()
+    directory = snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    with _lock, db.reader() as conn:
+        meta = _read_meta(directory)
+        # Read the counter first: a change racing the copy makes the next refresh rebuild.
+        changes = db.change_counter(conn)
+        max_id = conn.execute("SELECT MAX(id) FROM scrap_entries").fetchone()[0] or 0
+        stale = (rebuild or meta is None or meta.get("format") != FORMAT
+                 or meta.get("db") != os.path.abspath(db.DB_FILE)
+                 or meta.get("changes") != changes or max_id < meta.get("max_id", 0))
+        if stale:
+            meta = _rebuild(directory, conn, meta, changes)
+            appended = meta["rows"]
+        else:
+            before, gen = meta["rows"], meta["gen"]
+            cur = conn.execute(f"{_SELECT} FROM scrap_entries WHERE id > ? ORDER BY id", (meta["max_id"],))
+            while True:
+                rows = cur.fetchmany(FETCH_ROWS)
+                if not rows:
+                    break
+                _append(directory, meta, _to_arrays(rows))
+            appended = meta["rows"] - before
+            if not appended and meta["gen"] == gen:
+                return {"rows": meta["rows"], "appended": 0, "rebuilt": False,
+                        "seconds": time.perf_counter() - start}
+        _write_meta(directory, meta)
+        if stale or meta["gen"] != gen:
+            _drop_old_generations(directory, meta["gen"])
+    return {"rows": meta["rows"], "appended": appended, "rebuilt": stale,
+            "seconds": time.perf_counter() - start}
+
+
+def columns(refresh_first=True):
+    """
+    {column: ndarray} over the snapshot — read-only views of memory-mapped
+    files, so nothing is copied until a caller computes on it.
+    NULL days are NULL_DAY, NULL quantities NaN.
+    """
+    if refresh_first:
+        refresh()
+    directory = snapshot_dir()
+    with _lock:
+        meta = _read_meta(directory)
+        if meta is None:
+            return {col: np.empty(0, dtype=dtype) for col, dtype in COLUMNS.items()}
+        key = (directory, meta["gen"])
+        maps = _maps.get(key)
+        if maps is None:
+            _maps.clear()
+            maps = _maps[key] = {col: np.load(_column_path(directory, col, meta["gen"]), mmap_mode="r")
+                                 for col in COLUMNS}
+        return {col: m[:meta["rows"]] for col, m in maps.items()}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m snapshot",
+                                 description="Refresh the columnar analytics snapshot.")
+    ap.add_argument("--rebuild", action="store_true", help="rebuild from scratch")
+    ap.add_argument("--db", help=f"database file (default: {db.DB_FILE})")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_FILE = args.db
+    stats = refresh(rebuild=args.rebuild)
+    action = "rebuilt" if stats["rebuilt"] else f"appended {stats['appended']:,} rows"
+    print(f"{snapshot_dir()}: {stats['rows']:,} rows, {action} in {stats['seconds']:.2f}s")
+    db.close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
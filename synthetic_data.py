@@ -0,0 +1,166 @@
+# synthetic_data.py — deterministic, NumPy-vectorized scrap data for load testing
+# Usage:
+#   python -m synthetic_data --rows 10000000 --seed 7 --db loadtest.db
+#   from synthetic_data import SyntheticConfig, generate_batches, populate
+#
+# Same config (incl. seed and chunk_size) => byte-identical rows, so everyone
+# can reproduce a performance issue on the same dataset.
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+import db
+
+DEFAULT_REASONS = ("Misalignment", "Overheat", "Material Defect", "Power Surge",
+                   "Operator Error", "Tool Wear", "Material Jam", "Calibration Drift")
+MACHINE_KINDS = ("Cutter", "Press", "Roller", "Trimmer", "Extruder", "Dryer")
+
+
+@dataclass
+class SyntheticConfig:
+    rows: int = 1_000_000
+    seed: int = 42
+    plants: int = 3
+    machines_per_plant: int = 8
+    operators: int = 60
+    shifts: tuple = ("A", "B", "C")
+    shift_weights: tuple = (0.40, 0.35, 0.25)
+    shift_factors: tuple = (1.00, 1.05, 1.20)      # night shift scraps more
+    reasons: tuple = DEFAULT_REASONS
+    start: str = "2023-01-01"
+    days: int = 730
+    unit: str = "lbs"
+    base_quantity: float = 120.0
+    noise_shape: float = 6.0                       # gamma shape; higher = tighter
+    weekly_amplitude: float = 0.20
+    yearly_amplitude: float = 0.12
+    drift_per_year: float = 0.08                   # slow upward creep in scrap
+    outlier_rate: float = 0.002
+    outlier_scale: float = 8.0
+    chunk_size: int = 200_000
+    machine_names: tuple = None                    # override the generated P<n>-<Kind>-<nn> names
+
+
+def _dimensions(cfg: SyntheticConfig, rng: np.random.Generator):
+    """Fixed per-dataset structure: names, machine levels, per-machine reason mix."""
+    machines = cfg.machine_names or [
+        f"P{p + 1}-{MACHINE_KINDS[m % len(MACHINE_KINDS)]}-{m + 1:02d}"
+        for p in range(cfg.plants) for m in range(cfg.machines_per_plant)
+    ]
+    operators = [f"Operator {i + 1:03d}" for i in range(cfg.operators)]
+    machine_level = rng.lognormal(mean=0.0, sigma=0.35, size=len(machines))
+    reason_cum = np.cumsum(rng.dirichlet(np.full(len(cfg.reasons), 0.8), size=len(machines)), axis=1)
+    return machines, operators, machine_level, reason_cum
+
+
+def generate_batches(cfg: SyntheticConfig):
+    """Yield lists of db.ENTRY_COLUMNS tuples, cfg.chunk_size rows at a time."""
+    machines, operators, machine_level, reason_cum = _dimensions(
+        cfg, np.random.default_rng([cfg.seed, 0]))
+    machines_arr = np.array(machines, dtype=object)
+    operators_arr = np.array(operators, dtype=object)
+    shifts_arr = np.array(cfg.shifts, dtype=object)
+    reasons_arr = np.array(cfg.reasons, dtype=object)
+    shift_p = np.asarray(cfg.shift_weights, dtype=float)
+    shift_p /= shift_p.sum()
+    shift_factor = np.asarray(cfg.shift_factors, dtype=float)
+    start_day = db.to_epoch_day(cfg.start)
+
+    for chunk_no, lo in enumerate(range(0, cfg.rows, cfg.chunk_size)):
+        n = min(cfg.chunk_size, cfg.rows - lo)
+        rng = np.random.default_rng([cfg.seed, chunk_no + 1])
+
+        # Rows are spread evenly over the window in id order, like real entry.
+        offset = (np.arange(lo, lo + n, dtype=np.int64) * cfg.days) // cfg.rows
+        day = start_day + offset
+        m = rng.integers(0, len(machines), size=n)
+        op = rng.integers(0, len(operators), size=n)
+        sh = rng.choice(len(cfg.shifts), size=n, p=shift_p)
+        reason = (rng.random(n)[:, None] > reason_cum[m]).sum(axis=1)
+        reason = np.minimum(reason, len(cfg.reasons) - 1)
+
+        dow = (day + 3) % 7                      # 1970-01-01 was a Thursday
+        years = offset / 365.25
+        level = (cfg.base_quantity * machine_level[m] * shift_factor[sh]
+                 * (1 + cfg.weekly_amplitude * np.sin(2 * np.pi * dow / 7))
+                 * (1 + cfg.yearly_amplitude * np.sin(2 * np.pi * years))
+                 * (1 + cfg.drift_per_year * years))
+        qty = level * rng.gamma(cfg.noise_shape, 1 / cfg.noise_shape, size=n)
+        outlier = rng.random(n) < cfg.outlier_rate
+        qty = np.where(outlier, qty * cfg.outlier_scale, qty)
+        qty = np.round(np.maximum(qty, 1.0), 1)
+        total = np.round(qty + np.maximum(1000.0, rng.normal(3000, 500, size=n)), 0)
+
+        dates = np.datetime_as_string(day.astype("datetime64[D]"), unit="D")
+        comments = np.where(outlier, "Spike flagged", "").astype(object)
+
+        yield list(zip(
+            operators_arr[op].tolist(),
+            machines_arr[m].tolist(),
+            dates.tolist(),
+            day.tolist(),
+            qty.tolist(),
+            [cfg.unit] * n,
+            shifts_arr[sh].tolist(),
+            reasons_arr[reason].tolist(),
+            comments.tolist(),
+            total.tolist(),
+            ["Synthetic"] * n,
+        ))
+
+
+def populate(cfg: SyntheticConfig, progress=None):
+    """Stream generated batches into scrap_logs, one transaction per batch."""
+    stats = {"rows": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    start = time.perf_counter()
+    with db.bulk_load_pragmas():
+        for rows in generate_batches(cfg):
+            with db.writer() as conn:
+                db.insert_entries(conn, rows)
+            stats["rows"] += len(rows)
+            stats["seconds"] = time.perf_counter() - start
+            stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+            if progress:
+                progress(dict(stats))
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m synthetic_data",
+                                 description="Generate a reproducible synthetic scrap dataset.")
+    ap.add_argument("--rows", type=int, default=SyntheticConfig.rows)
+    ap.add_argument("--seed", type=int, default=SyntheticConfig.seed)
+    ap.add_argument("--plants", type=int, default=SyntheticConfig.plants)
+    ap.add_argument("--machines-per-plant", type=int, default=SyntheticConfig.machines_per_plant)
+    ap.add_argument("--operators", type=int, default=SyntheticConfig.operators)
+    ap.add_argument("--start", default=SyntheticConfig.start, help="first day (YYYY-MM-DD)")
+    ap.add_argument("--days", type=int, default=SyntheticConfig.days)
+    ap.add_argument("--drift", type=float, default=SyntheticConfig.drift_per_year)
+    ap.add_argument("--outlier-rate", type=float, default=SyntheticConfig.outlier_rate)
+    ap.add_argument("--chunk-size", type=int, default=SyntheticConfig.chunk_size)
+    ap.add_argument("--db", help=f"database file (default: {db.DB_FILE})")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_FILE = args.db
+    cfg = SyntheticConfig(rows=args.rows, seed=args.seed, plants=args.plants,
+                          machines_per_plant=args.machines_per_plant, operators=args.operators,
+                          start=args.start, days=args.days, drift_per_year=args.drift,
+                          outlier_rate=args.outlier_rate, chunk_size=args.chunk_size)
+
+    def report(stats):
+        print(f"\r{stats['rows']:>12,} / {cfg.rows:,} rows  {stats['rows_per_sec']:>10,.0f} rows/s",
+              end="", flush=True)
+
+    stats = populate(cfg, progress=report)
+    print(f"\nGenerated {stats['rows']:,} rows in {stats['seconds']:.1f}s (seed {cfg.seed}).")
+    db.close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# Bulk loads: search index, daily rollup and planner stats after db.bulk_ingest
+# Usage:
+#   python -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+RECORDS = [{"machine_operator": "Op %d" % (i % 7), "machine_name": "Press-%d" % (i % 5),
+            "date": "2025-03-%02d" % (i % 28 + 1), "quantity": i % 40, "shift": "A",
+            "reason": "Overheat" if i % 3 else "Misfeed"} for i in range(600)]
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "bulk.db"))
+    yield
+    db.close_pool()
+
+
+def _triggers(conn, names=db.FTS_TRIGGERS):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")} & set(names)
+
+
+def _rollup_matches_entries(conn):
+    rollup = conn.execute("SELECT day, machine_id, shift_id, reason_id, quantity, entries FROM daily_scrap_facts "
+                          "ORDER BY 1, 2, 3, 4").fetchall()
+    entries = conn.execute("SELECT day, machine_id, shift_id, reason_id, TOTAL(quantity), COUNT(*) "
+                           "FROM scrap_entries WHERE day IS NOT NULL GROUP BY 1, 2, 3, 4 ORDER BY 1, 2, 3, 4").fetchall()
+    return [tuple(r) for r in rollup] == [tuple(r) for r in entries]
+
+
+def test_bulk_ingest_rebuilds_search_index(fresh_db):
+    db.bulk_ingest(RECORDS, batch_size=200)
+    with db.reader() as conn:
+        assert _triggers(conn) == set(db.FTS_TRIGGERS)
+        hits = conn.execute("SELECT COUNT(*) FROM scrap_logs_fts WHERE scrap_logs_fts MATCH '\"Misfeed\"'").fetchone()[0]
+        assert hits == sum(r["reason"] == "Misfeed" for r in RECORDS)
+        assert conn.execute("SELECT 1 FROM sqlite_stat1 WHERE tbl = 'scrap_entries'").fetchone()
+
+
+def test_migrate_restores_triggers_left_dropped(fresh_db):
+    with db.writer() as conn:
+        for name in db.FTS_TRIGGERS:
+            conn.execute(f"DROP TRIGGER {name}")
+        db.insert_entries(conn, db.normalize_chunk(RECORDS[:10])[0])
+    db.close_pool()
+    with db.writer() as conn:        # reopening the pool runs migrate()
+        assert _triggers(conn) == set(db.FTS_TRIGGERS)
+        assert conn.execute("SELECT COUNT(*) FROM scrap_logs_fts WHERE scrap_logs_fts MATCH '\"Press\"'").fetchone()[0] == 10
+
+
+def test_bulk_ingest_recomputes_the_rollup(fresh_db):
+    with db.writer() as conn:
+        db.insert_entries(conn, db.normalize_chunk(RECORDS[:50])[0])
+    db.bulk_ingest(RECORDS[50:], batch_size=200)
+    with db.reader() as conn:
+        assert _triggers(conn, db.ROLLUP_TRIGGERS) == set(db.ROLLUP_TRIGGERS)
+        assert _rollup_matches_entries(conn)
+        assert conn.execute("SELECT SUM(entries) FROM daily_scrap_facts").fetchone()[0] == len(RECORDS)
+
+
+def test_edits_during_a_bulk_load_reach_the_rollup(fresh_db):
+    with db.writer() as conn:
+        db.insert_entries(conn, db.normalize_chunk(RECORDS[:50])[0])
+    with db.bulk_load_pragmas():
+        with db.writer() as conn:
+            db.insert_entries(conn, db.normalize_chunk([r for r in RECORDS[50:] if r["date"].endswith("-05")])[0])
+            db.delete_entries(conn, [1, 2])     # rows of other days than the loaded ones
+    with db.reader() as conn:
+        assert _rollup_matches_entries(conn)
+
+
+def test_migrate_restores_rollup_triggers_left_dropped(fresh_db):
+    with db.writer() as conn:
+        for name in db.ROLLUP_TRIGGERS:
+            conn.execute(f"DROP TRIGGER {name}")
+        db.insert_entries(conn, db.normalize_chunk(RECORDS[:10])[0])
+    db.close_pool()
+    with db.writer() as conn:        # reopening the pool runs migrate()
+        assert _triggers(conn, db.ROLLUP_TRIGGERS) == set(db.ROLLUP_TRIGGERS)
+        assert _rollup_matches_entries(conn)
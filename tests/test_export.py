@@ -0,0 +1,42 @@
+# export.write_rows: formats, typed Parquet columns, no partial files
+# Usage:
+#   python -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export import write_rows
+
+COLUMNS = ("date", "machine_name", "quantity", "total_produced")
+
+
+def _rows(n, produced_from):
+    # legacy rows first: total_produced NULL for the whole first chunk
+    return [{"date": "2025-03-01", "machine_name": "Press-1", "quantity": i,
+             "total_produced": float(i) if i >= produced_from else None} for i in range(n)]
+
+
+def test_failed_export_leaves_nothing(tmp_path):
+    path = str(tmp_path / "out.csv")
+
+    def progress(n):
+        if n > 10:
+            raise RuntimeError("cancelled")
+
+    with pytest.raises(RuntimeError):
+        write_rows(_rows(50, 0), COLUMNS, path, progress=progress, chunk=10)
+    assert os.listdir(tmp_path) == []
+
+
+def test_parquet_types_come_from_the_columns(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "out.parquet")
+    assert write_rows(_rows(50, 30), COLUMNS, path, chunk=10) == 50
+    table = pq.read_table(path)
+    assert str(table.schema.field("total_produced").type) == "double"
+    assert str(table.schema.field("quantity").type) == "double"
+    assert table.column("total_produced").null_count == 30
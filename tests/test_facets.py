@@ -0,0 +1,43 @@
+# Dropdown counts for the filter facets
+# Usage:
+#   python -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from facets import facet_counts, facet_label
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "facets.db"))
+    with db.writer() as c:
+        db.migrate(c)
+        db.insert_entries(c, [{"machine_operator": "Op%d" % (i % 3), "machine_name": "M%d" % (i % 4),
+                               "date": "2025-03-%02d" % (i % 28 + 1), "quantity": 1.0, "unit": "lbs",
+                               "shift": "AB"[i % 2], "reason": "R"} for i in range(60)])
+        # rows whose date never parsed: the rollup can't place them
+        c.executemany("INSERT INTO scrap_entries (operator_id, machine_id, date, day, quantity, unit_id, shift_id, reason_id) "
+                      "SELECT operator_id, machine_id, ?, NULL, quantity, unit_id, shift_id, reason_id "
+                      "FROM scrap_entries WHERE id = 1", [("garbled",)] * 7)
+    yield
+    db.close_pool()
+
+
+def test_every_facet_counts_the_same_rows(pool):
+    counts = facet_counts()
+    totals = {facet: sum(n for _, n in pairs) for facet, pairs in counts.items()}
+    assert set(totals.values()) == {60}
+    # an operator pick moves the other facets onto the fact table: same base
+    picked = facet_counts(selected={"machine_operator": "Op0"})
+    assert sum(n for _, n in picked["shift"]) == dict(counts["machine_operator"])["Op0"] == 20
+
+
+def test_inexact_label():
+    assert facet_label("A", 100000, exact=False) == "A (100,000+)"
+    assert facet_label("", 3) == "(blank) (3)"
@@ -0,0 +1,35 @@
+# forecast: the batch engine against the single-series baseline
+# Usage:
+#   python -m pytest -q tests
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecast import METHODS, fit_predict_with_ci, forecast, forecast_batch
+
+KEYS = ("y_pred", "lower", "upper", "future_pred", "future_lower", "future_upper")
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("n", [1, 2, 3, 4, 6, 60])
+def test_linear_model_matches_fit_predict_with_ci(method, n):
+    rng = np.random.default_rng(n)
+    Y = 50 + 0.5 * np.arange(n) + rng.normal(0, 10, (6, n))
+    Y[0] = 42.0         # flat series take fit_predict_with_ci's constant path
+    out = forecast_batch(Y, "linear", periods_ahead=7, ci=(10, 90), method=method)
+    for i, y in enumerate(Y):
+        one = fit_predict_with_ci(y, 7, (10, 90), method=method)
+        for key in KEYS:
+            np.testing.assert_allclose(out[key][i], one[key], rtol=1e-9, atol=1e-9, err_msg=key)
+
+
+def test_forecast_linear_is_the_baseline():
+    y = np.arange(30.0) + np.tile([0.0, 3.0, -3.0], 10)
+    a, b = forecast(y, "linear", periods_ahead=5), fit_predict_with_ci(y, 5)
+    for key in KEYS:
+        np.testing.assert_array_equal(a[key], b[key])
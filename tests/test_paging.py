@@ -0,0 +1,89 @@
+# Keyset paging over scrap_logs
+# Usage:
+#   python -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from paging import KeysetPager, RowBlocks
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "paging.db"))
+    with db.writer() as c:
+        db.migrate(c)
+        db.insert_entries(c, [{"machine_operator": "Op", "machine_name": "M1", "date": "2025-03-%02d" % (i % 28 + 1),
+                               "quantity": 1.0, "unit": "lbs", "shift": "A", "reason": "R"} for i in range(150)])
+        # legacy rows whose date never parsed: day stays NULL
+        c.executemany("INSERT INTO scrap_entries (operator_id, machine_id, date, day, quantity, unit_id, shift_id, reason_id) "
+                      "SELECT operator_id, machine_id, ?, NULL, quantity, unit_id, shift_id, reason_id "
+                      "FROM scrap_entries WHERE id = 1", [("garbled",)] * 120)
+    with db.reader() as c:
+        yield c
+    db.close_pool()
+
+
+@pytest.mark.parametrize("desc", [True, False])
+def test_scroll_past_null_days(conn, desc):
+    pager = KeysetPager("scrap_logs s", [], [], order=((db.day_key("s"), desc), ("s.id", desc)))
+    blocks = RowBlocks(pager, block_size=50)
+    total, exact = blocks.count(conn)
+    assert (total, exact) == (270, True)
+    rows = blocks.rows(conn, 0, total)
+    ids = [r["id"] for r in rows]
+    assert len(ids) == total == len(set(ids))
+    # NULL days sort below every real day
+    nulls = [r["day"] is None for r in rows]
+    assert nulls == sorted(nulls, reverse=not desc)
+
+
+def test_peek_reads_cached_blocks_only(conn):
+    blocks = RowBlocks(KeysetPager("scrap_logs s", [], []), block_size=50)
+    assert blocks.peek(40, 60) is None
+    rows = blocks.rows(conn, 40, 60)
+    assert len(rows) == 20
+    assert blocks.peek(40, 60) == rows
+    blocks.invalidate()
+    assert blocks.peek(40, 60) is None
+
+
+def test_jump_to_the_tail_matches_a_full_scroll(conn):
+    pager = KeysetPager("scrap_logs s", [], [])
+    everything = [r["id"] for r in RowBlocks(pager, block_size=50).rows(conn, 0, 270)]
+    blocks = RowBlocks(pager, block_size=50)
+    # cold jumps: the last (short) block, one near the tail, past the end
+    assert [r["id"] for r in blocks.rows(conn, 250, 270)] == everything[250:]
+    blocks.invalidate()
+    assert [r["id"] for r in blocks.rows(conn, 160, 210)] == everything[160:210]
+    assert blocks.rows(conn, 300, 350) == []
+
+
+def test_counts_from_many_threads(conn, monkeypatch):
+    import threading
+    import paging
+
+    monkeypatch.setattr(paging, "_COUNT_CACHE_SIZE", 4)
+    errors = []
+
+    def count(i):
+        try:
+            with db.reader() as c:
+                for j in range(50):
+                    n = (i + j) % 9
+                    assert paging.cached_count(c, f"SELECT COUNT(*) FROM scrap_entries WHERE id > {n}", []) == 270 - n
+        except Exception as e:      # noqa: BLE001 - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=count, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(paging._count_cache) <= 4
@@ -0,0 +1,61 @@
+# Columnar snapshot and the backtest series read from it
+# Usage:
+#   python -m pytest -q tests
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import snapshot
+from backtest import load_series
+from forecast import pivot_series
+
+
+def _entries(n, start=0):
+    return [{"machine_operator": "Op", "machine_name": "M%d" % (i % 3), "date": "2025-03-%02d" % (i % 28 + 1),
+             "quantity": float(i % 7), "unit": "lbs", "shift": "AB"[i % 2], "reason": "R"}
+            for i in range(start, start + n)]
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "snap.db"))
+    with db.writer() as c:
+        db.migrate(c)
+        db.insert_entries(c, _entries(200))
+    yield
+    db.close_pool()
+
+
+def test_appends_new_rows_and_rebuilds_after_an_edit(pool):
+    assert snapshot.refresh()["rebuilt"]
+    with db.writer() as c:
+        db.insert_entries(c, _entries(30, start=200))
+    stats = snapshot.refresh()
+    assert (stats["rows"], stats["appended"], stats["rebuilt"]) == (230, 30, False)
+    with db.writer() as c:
+        c.execute("UPDATE scrap_entries SET quantity = 100 WHERE id = 1")
+    assert snapshot.refresh()["rebuilt"]
+    assert snapshot.columns(refresh_first=False)["quantity"][0] == 100
+
+
+def test_series_match_the_rollup(pool):
+    with db.writer() as c:
+        c.execute("UPDATE scrap_entries SET day = NULL WHERE id <= 5")     # unparsed dates: not in the rollup
+    keys, first, Y = load_series()
+    with db.reader() as c:
+        rows = c.execute("SELECT m.name, s.name, f.day, SUM(f.quantity) FROM daily_scrap_facts f "
+                         "JOIN dim_machine m ON m.id = f.machine_id JOIN dim_shift s ON s.id = f.shift_id "
+                         "GROUP BY 1, 2, 3").fetchall()
+    expect_keys, expect_first, expect = pivot_series(list(zip(*rows))[:2], [r[2] for r in rows],
+                                                     [r[3] for r in rows])
+    assert first == expect_first
+    expected = dict(zip(expect_keys, expect))
+    assert sorted(keys) == sorted(expected)
+    for key, row in zip(keys, Y):
+        assert np.allclose(row, expected[key])
@@ -0,0 +1,70 @@
+# VirtualTable selection across scrolling
+# Usage:
+#   python -m pytest -q tests
+
+import os
+import sys
+import tkinter as tk
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from virtual_table import VirtualTable, merge_selection
+
+
+class ListSource:
+    """count / rows / peek over an in-memory list (no DB)."""
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def count(self, conn):
+        return len(self._rows), True
+
+    def rows(self, conn, start, stop):
+        return self._rows[start:stop]
+
+    def peek(self, start, stop):
+        return self._rows[start:stop]
+
+
+def test_merge_selection():
+    # row 1 selected earlier, now off screen; rows 10-14 visible, 12 clicked
+    visible = range(10, 15)
+    assert merge_selection({1, 11}, visible, [12], replace=False) == {1, 12}
+    assert merge_selection({1, 11}, visible, [11], replace=True) == {11}
+
+
+@pytest.fixture
+def table():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    root.withdraw()
+    t = VirtualTable(root, ["id", "name"], {}, height=5)
+    t.pack()
+    t.source = ListSource([{"id": i, "name": f"row {i}"} for i in range(100)])
+    t.total, t.exact = 100, True
+    t._render()
+    yield t
+    root.destroy()
+
+
+def _click(t, slot, state=0):
+    y = t.tree.bbox(t._slots[slot])[1] + 2
+    t.tree.event_generate("<ButtonPress-1>", x=5, y=y, state=state)
+    t.tree.event_generate("<ButtonRelease-1>", x=5, y=y, state=state)
+    t.update()
+
+
+def test_plain_click_drops_rows_scrolled_away(table):
+    table.update()
+    _click(table, 0)                    # row 0
+    _click(table, 1, state=0x0004)      # Ctrl: row 1 too
+    assert table.selected_keys() == {0, 1}
+    table.scroll_to(50)
+    table.update()
+    _click(table, 2)                    # plain click on row 52
+    assert table.selected_keys() == {52}
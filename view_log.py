@@ -1,13 +1,33 @@
 import os
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox
 from tkcalendar import Calendar
 from PIL import Image, ImageTk
-import sqlite3
-import pandas as pd
 from datetime import datetime
 
-PAGE_SIZE = 50
+from db import reader, writer, to_epoch_day, day_key, DIMENSIONS, delete_entries, update_entries, EDITABLE_COLUMNS
+from search import search_query, text_filter
+from paging import KeysetPager, RowBlocks, COUNT_CAP
+from virtual_table import VirtualTable
+import jobs
+import export
+import result_cache
+from facets import facet_label
+import completions
+
+# Sortable columns -> ORDER BY expression on the scrap_logs view. Each is backed
+# by an index (db migrations 10 and 13) that the pinned join order of
+# db.scrap_logs_from walks, so a sorted page is an index walk with or without
+# planner stats; the COALESCEs keep NULL days and measures in the keyset order.
+SORT_KEYS = {
+    "machine_operator": "s.machine_operator",
+    "machine_name": "s.machine_name",
+    "date": day_key("s"),
+    "quantity": "COALESCE(s.quantity, -1)",
+    "total_produced": "COALESCE(s.total_produced, -1)",
+    "shift": "s.shift",
+    "reason": "s.reason",
+}
 
 
 class ViewLogFrame(tk.Frame):
@@ -16,15 +36,14 @@ class ViewLogFrame(tk.Frame):
         self.controller = controller
         self.BASE_DIR = os.path.dirname(__file__)
         self.IMAGE_DIR = os.path.join(self.BASE_DIR, "images")
-        self.DB_PATH = os.path.join(self.BASE_DIR, "sample_data.db")
 
         self.scale_x = max(self.winfo_screenwidth() / 1920, 0.8)
         self.scale_y = max(self.winfo_screenheight() / 1080, 0.8)
         self.scale_font = (self.scale_x + self.scale_y) / 2
 
-        self.current_page = 1
-        self.total_pages = 1
-        self.df = pd.DataFrame()
+        self.pager = None
+        self.sort = None        # (column, descending); None = newest first / best match
+        self._shift_values = {}     # combobox label "A (1,204)" -> "A"
 
         self.build_ui()
         self.after(0, self.fetch_data)
@@ -80,11 +99,14 @@ class ViewLogFrame(tk.Frame):
         self.op_entry.grid(row=0, column=1, padx=4)
         self.add_placeholder(self.op_entry, "Search Operator")
         self.op_entry.bind("<KeyRelease>", lambda e: self._delayed())
+        self._picked_operator = None
+        completions.attach(self.op_entry, "machine_operator", on_pick=self._pick_operator,
+                           ignore=("Search Operator",))
 
         tk.Label(filt, text="Shift:", font=("Segoe UI", 12, "bold"),
                  bg="#F8FAFC", fg="#0F172A").grid(row=0, column=2, padx=12, sticky="e")
         self.shift_combo = ttk.Combobox(filt, values=["All", "A", "B", "C"],
-                                        font=("Segoe UI", 12), width=6, state="readonly")
+                                        font=("Segoe UI", 12), width=12, state="readonly")
         self.shift_combo.set("All")
         self.shift_combo.grid(row=0, column=3, padx=4)
         self.shift_combo.bind("<<ComboboxSelected>>", lambda e: self.fetch_data())
@@ -104,14 +126,16 @@ class ViewLogFrame(tk.Frame):
         reset_btn = self.colored_btn(filt, "Reset", "#2563EB", self.reset_filters, "#1554C9", width=8, height=1)
         reset_btn.grid(row=0, column=8, padx=(12, 4))
 
-        table_frame = tk.Frame(self, bg="#F8FAFC")
-        table_frame.pack(fill="both", expand=True, padx=20, pady=10)
+        tk.Label(filt, text="Search:", font=("Segoe UI", 12, "bold"),
+                 bg="#F8FAFC", fg="#0F172A").grid(row=1, column=0, padx=4, pady=(8, 0), sticky="e")
+        self.search_entry = tk.Entry(filt, font=("Segoe UI", 12), bg="white", relief="flat")
+        self.search_entry.grid(row=1, column=1, columnspan=7, padx=4, pady=(8, 0), sticky="ew")
+        self.add_placeholder(self.search_entry, "Search reason, comments, machine, operator")
+        self.search_entry.bind("<KeyRelease>", lambda e: self._delayed())
 
         self.visible_cols = ("machine_operator", "machine_name", "date", "quantity", "unit",
                              "total_produced", "shift", "reason", "comments")
-        self.tree = ttk.Treeview(table_frame, columns=self.visible_cols, show="headings", height=15)
-
-        headers = {
+        self.headers = headers = {
             "machine_operator": "Operator",
             "machine_name": "Machine",
             "date": "Date",
@@ -122,131 +146,286 @@ class ViewLogFrame(tk.Frame):
             "reason": "Reason",
             "comments": "Comments"
         }
-        for c in self.visible_cols:
-            self.tree.heading(c, text=headers[c])
-            self.tree.column(c, width=int(130 * self.scale_x), anchor="center")
-        self.tree.pack(fill="both", expand=True)
+        # Scrolls through the whole result; only the visible rows exist as items
+        self.table = VirtualTable(self, self.visible_cols, headers, height=15,
+                                  on_view=self._show_position, col_width=int(130 * self.scale_x),
+                                  on_sort=self.sort_by, sortable=SORT_KEYS)
+        self.table.pack(fill="both", expand=True, padx=20, pady=10)
 
         action_bar = tk.Frame(self, bg="#F8FAFC")
         action_bar.pack(pady=10)
         btns = tk.Frame(action_bar, bg="#F8FAFC")
         btns.pack()
         self.colored_btn(btns, "Export CSV", "#2563EB", self.export, "#1554C9").pack(side="left", padx=8)
+        self.colored_btn(btns, "Edit", "#0F766E", self.edit_selected, "#0B5F58").pack(side="left", padx=8)
         self.colored_btn(btns, "Delete", "#EF4444", self.delete_selected, "#C92C2C").pack(side="left", padx=8)
 
-        pag = tk.Frame(self, bg="#F8FAFC")
-        pag.pack(pady=(0, 10))
-        self.pagebar = pag
+        self.position_label = tk.Label(self, text="", bg="#F8FAFC", fg="#0F172A",
+                                       font=("Segoe UI", 10, "bold"))
+        self.position_label.pack(pady=(0, 10))
 
-    # ---------- Filters / pagination ----------
+    # ---------- Filters ----------
     def reset_filters(self):
         self.op_entry.delete(0, tk.END)
         self.add_placeholder(self.op_entry, "Search Operator")
         self.shift_combo.set("All")
+        self.search_entry.delete(0, tk.END)
+        self.add_placeholder(self.search_entry, "Search reason, comments, machine, operator")
         self.from_date.delete(0, tk.END)
         self.add_placeholder(self.from_date, "MM/DD/YYYY")
         self.to_date.delete(0, tk.END)
         self.add_placeholder(self.to_date, "MM/DD/YYYY")
         self.fetch_data()
 
+    def _pick_operator(self, name):
+        self._picked_operator = name
+        self.fetch_data()
+
+    def sort_by(self, col):
+        # same column toggles direction; a new one starts largest/latest first, names A-Z
+        if self.sort and self.sort[0] == col:
+            self.sort = (col, not self.sort[1])
+        else:
+            self.sort = (col, col in ("date", "quantity", "total_produced"))
+        self.table.show_sort(*self.sort)
+        self.fetch_data()
+
     def _delayed(self):
         if hasattr(self, "_after_id"):
             self.after_cancel(self._after_id)
         self._after_id = self.after(300, self.fetch_data)
 
     # ---------- SQLite Query ----------
-    def fetch_data(self):
-        try:
-            conn = sqlite3.connect(self.DB_PATH)
-            query = "SELECT * FROM scrap_logs WHERE 1=1"
-            params = []
-
-            op = self.op_entry.get().strip()
-            if op and op != "Search Operator":
-                query += " AND machine_operator LIKE ?"
-                params.append(f"%{op}%")
-
-            shift = self.shift_combo.get()
-            if shift != "All":
-                query += " AND shift = ?"
-                params.append(shift)
-
-            fd = self.from_date.get().strip()
-            td = self.to_date.get().strip()
-            if fd and fd != "MM/DD/YYYY":
-                query += " AND date >= ?"
-                params.append(fd)
-            if td and td != "MM/DD/YYYY":
-                query += " AND date <= ?"
-                params.append(td)
-
-            query += " ORDER BY date DESC"
-            self.df = pd.read_sql_query(query, conn, params=params)
-            conn.close()
-
-            self.current_page = 1
-            self.total_pages = max(1, (len(self.df) + PAGE_SIZE - 1) // PAGE_SIZE)
-            self.refresh_pages()
-            self.show_page()
+    def _filters(self):
+        """Current filter values, read on the Tk thread."""
+        text = self.search_entry.get().strip()
+        op = self.op_entry.get().strip()
+        return {
+            "text": "" if text == "Search reason, comments, machine, operator" else text,
+            "op": "" if op == "Search Operator" else op,
+            "op_exact": bool(op) and op == self._picked_operator,
+            "shift": self._shift_values.get(self.shift_combo.get(), self.shift_combo.get()),
+            "from": to_epoch_day(self.from_date.get()),
+            "to": to_epoch_day(self.to_date.get()),
+            "sort": self.sort,
+        }
 
-        except Exception as e:
-            messagebox.showerror("Database Error", str(e))
-
-    def refresh_pages(self):
-        for w in self.pagebar.winfo_children():
-            w.destroy()
-
-        def go(p):
-            self.current_page = p
-            self.show_page()
-
-        tk.Button(self.pagebar, text="<<", command=lambda: go(max(1, self.current_page - 1)),
-                  bg="#F8FAFC", relief="flat", font=("Segoe UI", 10)).pack(side="left", padx=3)
-        tk.Label(self.pagebar, text=f"Page {self.current_page} of {self.total_pages}",
-                 bg="#F8FAFC", fg="#0F172A", font=("Segoe UI", 10, "bold")).pack(side="left", padx=3)
-        tk.Button(self.pagebar, text=">>", command=lambda: go(min(self.total_pages, self.current_page + 1)),
-                  bg="#F8FAFC", relief="flat", font=("Segoe UI", 10)).pack(side="left", padx=3)
-
-    def show_page(self):
-        self.tree.delete(*self.tree.get_children())
-        if self.df.empty:
+    @staticmethod
+    def _entry_filters(f):
+        """
+        The filters as (clause, param) pairs on scrap_entries, answerable from
+        its indexes; None when text search needs the view and its FTS index.
+        """
+        if f["text"] or (f["op"] and not f["op_exact"]):
+            return None
+        exact = []
+        if f["op"]:
+            exact.append(("operator_id = (SELECT id FROM dim_operator WHERE name = ?)", f["op"]))
+        if f["shift"] != "All":
+            exact.append(("shift_id = (SELECT id FROM dim_shift WHERE name = ?)", f["shift"]))
+        if f["from"] is not None:
+            exact.append(("day >= ?", f["from"]))
+        if f["to"] is not None:
+            exact.append(("day <= ?", f["to"]))
+        return exact
+
+    def _build_pager(self, conn, f):
+        # Free-text search joins the FTS index and ranks by relevance
+        text, op = f["text"], f["op"]
+        # The table that drives the join: a sorted dimension walks its name
+        # index, an exact operator seeks its rows, anything else walks the facts
+        sort_col = f["sort"][0] if f["sort"] else None
+        lead = sort_col if sort_col in DIMENSIONS else ("machine_operator" if op and f["op_exact"] else None)
+        frm, clauses, params, order = search_query(conn, text, lead=lead)
+
+        # An operator picked from the dropdown is an exact, indexed match;
+        # typed text is a substring match through the trigram index
+        if op and f["op_exact"]:
+            clauses.append("s.machine_operator = ?")
+            params.append(op)
+        elif op:
+            where, extra = text_filter(conn, op, columns=("machine_operator",))
+            clauses.append(where)
+            params += extra
+
+        shift = f["shift"]
+        if shift != "All":
+            clauses.append("s.shift = ?")
+            params.append(shift)
+
+        # Range filters seek on the same day key the date sort walks
+        fd, td = f["from"], f["to"]
+        if fd is not None:
+            clauses.append(f"{day_key('s')} >= ?")
+            params.append(fd)
+        if td is not None:
+            clauses.append(f"{day_key('s')} <= ?")
+            params.append(td)
+
+        # A clicked header replaces the default order (day, or search rank)
+        if f["sort"]:
+            col, desc = f["sort"]
+            order = ((SORT_KEYS[col], desc), ("s.id", desc))
+
+        count_query = None
+        exact = self._entry_filters(f)
+        if exact is not None:
+            where = " WHERE " + " AND ".join(c for c, _ in exact) if exact else ""
+            count_query = (f"SELECT COUNT(*) FROM scrap_entries{where}", [p for _, p in exact])
+        return KeysetPager(frm, clauses, params, order=order, count_query=count_query)
+
+    def _shift_counts(self, conn, f):
+        """
+        ([(shift, rows)], exact?) under every filter but the shift, so they add
+        up to the table's rows. Text searches count the first COUNT_CAP + 1
+        matches only, like the pager, and come back inexact.
+        """
+        f = dict(f, shift="All", sort=None)
+        exact = self._entry_filters(f)
+        if exact is not None:
+            where = " WHERE " + " AND ".join(c for c, _ in exact) if exact else ""
+            names = dict(conn.execute("SELECT id, name FROM dim_shift").fetchall())
+            rows = [(names.get(i, ""), n) for i, n in conn.execute(
+                f"SELECT shift_id, COUNT(*) FROM scrap_entries{where} GROUP BY shift_id",
+                [p for _, p in exact])]
+            complete = True
+        else:
+            pager = self._build_pager(conn, f)
+            where = " WHERE " + " AND ".join(pager.clauses) if pager.clauses else ""
+            rows = conn.execute(f"SELECT shift, COUNT(*) FROM (SELECT s.shift AS shift FROM {pager.frm}{where} "
+                                f"LIMIT {COUNT_CAP + 1}) GROUP BY shift", pager.params).fetchall()
+            complete = sum(n for _, n in rows) <= COUNT_CAP
+        return sorted(((name, n) for name, n in rows), key=lambda p: (-p[1], p[0])), complete
+
+    def fetch_data(self):
+        # Runs on a worker; a newer keystroke interrupts this query mid-scan
+        filters = self._filters()
+
+        # Filters seen before (and data unchanged) come back with their blocks warm
+        key = ("viewlog", " ".join(filters["text"].split()), filters["op"], filters["op_exact"],
+               filters["shift"], filters["from"], filters["to"], filters["sort"])
+
+        def work(job):
+            def build():
+                pager = self._build_pager(conn, filters)
+                blocks = RowBlocks(pager)
+                blocks.count(conn)
+                job.check()
+                blocks.rows(conn, 0, blocks.block_size)    # first screenful, cached
+                return pager, blocks
+
+            with reader() as conn:
+                pager, blocks = result_cache.cached(key, build, size=lambda r: r[1].nbytes, conn=conn)
+                job.check()
+                # shift counts under the other filters (cached too; same for every shift picked)
+                shifts = result_cache.cached(("viewlog.shifts", *key[1:4], *key[5:7]),
+                                             lambda: self._shift_counts(conn, filters), conn=conn)
+            return pager, blocks, shifts
+
+        def done(result):
+            self.pager, blocks, shifts = result
+            self._show_shift_counts(*shifts, filters["shift"])
+            self.table.load(blocks)
+
+        jobs.submit(self, "viewlog.fetch", work, done, failed=self._fetch_failed, busy=self._set_busy)
+
+    def _show_shift_counts(self, shifts, exact, current):
+        counts = dict(shifts)
+        if current != "All" and current not in counts:
+            shifts = shifts + [(current, 0)]       # keep the selection listed
+        self._shift_values = {facet_label(v, n, exact): v for v, n in shifts}
+        self.shift_combo["values"] = ["All", *self._shift_values]
+        self.shift_combo.set("All" if current == "All" else facet_label(current, counts.get(current, 0), exact))
+
+    def _fetch_failed(self, e):
+        self.position_label.config(text="")
+        messagebox.showerror("Database Error", str(e))
+
+    def _set_busy(self, busy):
+        self.config(cursor="watch" if busy else "")
+        if busy:
+            self.position_label.config(text="Loading\u2026")
+
+    def _show_position(self, top, shown, total, exact):
+        if not shown:
+            self.position_label.config(text="No rows")
             return
-        start = (self.current_page - 1) * PAGE_SIZE
-        end = start + PAGE_SIZE
-        slice_df = self.df.iloc[start:end]
-        for i, row in slice_df.iterrows():
-            vals = [row.get(c, "") for c in self.visible_cols]
-            tag = "even" if i % 2 == 0 else "odd"
-            self.tree.insert("", tk.END, values=vals, tags=(tag,))
-        self.tree.tag_configure("even", background="#FFFFFF")
-        self.tree.tag_configure("odd", background="#F7F9FB")
+        of = f"{total:,}" + ("" if exact else "+")
+        self.position_label.config(text=f"Rows {top + 1:,}\u2013{top + shown:,} of {of}")
 
     # ---------- Actions ----------
     def export(self):
-        if self.df is None or self.df.empty:
+        if self.pager is None or not self.table.rows:
             return messagebox.showinfo("Export", "No data to export.")
-        fp = filedialog.asksaveasfilename(defaultextension=".csv",
-                                          filetypes=[("CSV Files", "*.csv")])
-        if not fp:
-            return
-        self.df[self.visible_cols].to_csv(fp, index=False)
-        messagebox.showinfo("Exported", f"Saved to:\n{fp}")
+        pager = self.pager
+
+        def rows():
+            # every filtered row, streamed in keyset batches on the export worker
+            with reader() as conn:
+                yield from pager.iter_all(conn)
+
+        export.start(self, "viewlog.export", rows, self.visible_cols,
+                     headers=[self.headers[c] for c in self.visible_cols],
+                     total=self.table.total if self.table.exact else None, name="ScrapSense_Logs")
 
     def delete_selected(self):
-        sel = self.tree.selection()
-        if not sel:
-            return messagebox.showinfo("Delete", "Select a row first.")
-        item = self.tree.item(sel[0])["values"]
-        date, operator = item[2], item[0]
-        confirm = messagebox.askyesno("Confirm", f"Delete entry for {operator} on {date}?")
-        if not confirm:
+        ids = self.table.selected_keys()
+        if not ids:
+            return messagebox.showinfo("Delete", "Select one or more rows first.")
+        if len(ids) == 1:
+            row = self.table.selected_rows()[0] if self.table.selected_rows() else None
+            what = f"the entry for {row['machine_operator']} on {row['date']}" if row else "1 entry"
+        else:
+            what = f"{len(ids):,} entries"
+        if not messagebox.askyesno("Confirm", f"Delete {what}?"):
             return
         try:
-            conn = sqlite3.connect(self.DB_PATH)
-            cur = conn.cursor()
-            cur.execute("DELETE FROM scrap_logs WHERE machine_operator=? AND date=?", (operator, date))
-            conn.commit()
-            conn.close()
-            self.fetch_data()
+            with writer() as conn:      # one transaction for the whole selection
+                delete_entries(conn, ids)
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            return messagebox.showerror("Error", str(e))
+        self._after_write()
+
+    def edit_selected(self):
+        ids = self.table.selected_keys()
+        if not ids:
+            return messagebox.showinfo("Edit", "Select one or more rows first.")
+
+        win = tk.Toplevel(self)
+        win.title(f"Edit {len(ids):,} selected entries")
+        win.transient(self.winfo_toplevel())
+        win.configure(bg="#F8FAFC", padx=16, pady=12)
+        tk.Label(win, text="Fill in only the fields to change; blank fields are left as they are.",
+                 bg="#F8FAFC", fg="#475569", font=("Segoe UI", 10)).grid(row=0, column=0, columnspan=2, pady=(0, 8))
+        entries = {}
+        for i, col in enumerate(EDITABLE_COLUMNS, start=1):
+            tk.Label(win, text=self.headers[col] + ":", bg="#F8FAFC", fg="#0F172A",
+                     font=("Segoe UI", 11, "bold")).grid(row=i, column=0, sticky="e", padx=4, pady=2)
+            entries[col] = tk.Entry(win, font=("Segoe UI", 11), width=28, bg="white", relief="flat")
+            entries[col].grid(row=i, column=1, padx=4, pady=2)
+
+        def apply():
+            changes = {c: e.get().strip() for c, e in entries.items() if e.get().strip()}
+            if not changes:
+                return win.destroy()
+            try:
+                with writer() as conn:
+                    update_entries(conn, ids, changes)
+            except ValueError as e:
+                return messagebox.showerror("Invalid Value", str(e), parent=win)
+            except Exception as e:
+                return messagebox.showerror("Error", str(e), parent=win)
+            win.destroy()
+            self._after_write()
+
+        btns = tk.Frame(win, bg="#F8FAFC")
+        btns.grid(row=len(EDITABLE_COLUMNS) + 1, column=0, columnspan=2, pady=(10, 0))
+        self.colored_btn(btns, "Apply", "#2563EB", apply, "#1554C9", width=10, height=1).pack(side="left", padx=6)
+        self.colored_btn(btns, "Cancel", "#64748B", win.destroy, "#475569", width=10, height=1).pack(side="left", padx=6)
+
+    def _after_write(self):
+        # same filters and scroll position, fresh rows and counts
+        self.table.clear_selection()
+        if self.table.source is not None:
+            self.table.source.invalidate()
+        self.table.refresh()
@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import re
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
@@ -16,13 +17,17 @@ matplotlib.use("TkAgg")
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-from db import get_db_connection  # must return an sqlite3 connection
+from db import reader, DIMENSIONS, to_epoch_day  # pooled sqlite3 read connection
+from facets import facet_counts, facet_label
+from forecast import forecast, forecast_batch, pivot_series, MODEL_LABELS, DEFAULT_MODEL, RISK_THRESHOLDS
+import jobs
 
 # -----------------
 # SETTINGS / THEME
 # -----------------
 FILTER_BG = "#DCDAD5"
 RISK_COLORS = {"High": "#EF4444", "Medium": "#F59E0B", "Low": "#22C55E"}
+HORIZONS = (7, 14, 30)      # forecast days offered in the sidebar
 BG_SIDEBAR = "#DBE2E9"
 BG_APP = "white"
 
@@ -30,92 +35,32 @@ BG_APP = "white"
 # -----------------
 # DB (SQLite version, tolerant of schema differences)
 # -----------------
-def _table_columns(conn, table: str) -> set:
-    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
-    # rows are sqlite3.Row if row_factory set; otherwise tuples: (cid, name, type, notnull, dflt_value, pk)
-    cols = set()
-    for r in rows:
-        try:
-            cols.add(r["name"])
-        except Exception:
-            cols.add(r[1])
-    return cols
-
-
-def fetch_logs() -> pd.DataFrame:
+def fetch_daily_scrap() -> pd.DataFrame:
     """
-    Fetch scrap logs from local SQLite and normalize.
-    Tolerates tables missing some columns (unit/shift/reason/machine_*).
+    Load the daily_scrap rollup (day × machine × shift × reason) with names and
+    a normalized shift, so the dashboard aggregates thousands of rows, not millions.
     """
-    with get_db_connection() as conn:
-        # If table doesn't exist, return empty df gracefully
+    with reader() as conn:
         try:
-            conn.execute("SELECT 1 FROM scrap_logs LIMIT 1")
+            df = pd.read_sql_query("""
+                SELECT day, machine_id, shift_id, reason_id, quantity, total_produced, entries
+                FROM daily_scrap_facts
+            """, conn)
         except Exception:
             return pd.DataFrame()
-
-        cols = _table_columns(conn, "scrap_logs")
-
-        # Pull everything and adapt
-        rows = [dict(r) for r in conn.execute("SELECT * FROM scrap_logs").fetchall()]
-    df = pd.DataFrame(rows)
+        # Group-bys ran on integer keys; names are attached once per dimension
+        for col in ("machine_name", "shift", "reason"):
+            table, key = DIMENSIONS[col]
+            names = dict(conn.execute(f"SELECT id, name FROM {table}").fetchall())
+            df[col] = df.pop(key).map(names)
+        last = conn.execute("SELECT unit FROM scrap_logs ORDER BY id DESC LIMIT 1").fetchone()
     if df.empty:
         return df
 
-    # ---- Normalize required columns with safe fallbacks ----
-    # date
-    if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    else:
-        # fabricate a date if completely missing (so UI doesn't crash)
-        df["date"] = pd.to_datetime("today").normalize()
-
-    df["date"] = df["date"].dt.normalize()
-
-    # quantity (fallback to scrap_weight or 1.0)
-    if "quantity" not in df.columns:
-        if "scrap_weight" in df.columns:
-            df["quantity"] = pd.to_numeric(df["scrap_weight"], errors="coerce")
-        else:
-            df["quantity"] = 1.0
-    else:
-        df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce")
-
-    # unit (default lbs)
-    if "unit" not in df.columns:
-        df["unit"] = "lbs"
-    df["unit"] = df["unit"].astype(str)
-
-    # shift (default A)
-    if "shift" not in df.columns:
-        df["shift"] = "A"
-    df["shift"] = (
-        df["shift"].astype(str).str.strip().str.upper().str.replace(r"^SHIFT\s+", "", regex=True)
-    )
-
-    # reason (optional)
-    if "reason" not in df.columns:
-        df["reason"] = ""
-
-    # machine key preference
-    if "machine_name" in df.columns:
-        df["machine_key"] = df["machine_name"].astype(str)
-    elif "machine" in df.columns:
-        df["machine_key"] = df["machine"].astype(str)
-    elif "machine_operator" in df.columns:
-        df["machine_key"] = df["machine_operator"].astype(str)
-    else:
-        df["machine_key"] = "Unknown"
-
-    # comments (optional)
-    if "comments" not in df.columns:
-        df["comments"] = ""
-
-    # Drop obviously bad rows but keep tolerant on optional fields
-    df = df.dropna(subset=["date", "quantity"])
-    # If quantity still NaN, coerce to 0 to avoid plot errors
-    df["quantity"] = df["quantity"].fillna(0)
-
+    df["date"] = pd.to_datetime(df["day"], unit="D")
+    df["machine_key"] = df["machine_name"].replace("", "Unknown")
+    df["shift"] = df["shift"].str.strip().str.upper().str.replace(r"^SHIFT\s+", "", regex=True)
+    df["unit"] = (last["unit"] if last and last["unit"] else "lbs")
     return df
 
 
@@ -139,50 +84,20 @@ def apply_date_preset(df: pd.DataFrame, preset: str) -> pd.DataFrame:
     return df
 
 
-def fit_predict_with_ci(y: np.ndarray, periods_ahead: int = 7, ci=(10, 90)):
-    """
-    Simple baseline predictor (linear trend + bootstrap residuals).
-    Returns arrays with upper/lower confidence bounds.
-    """
-    y = np.asarray(y, dtype=float)
-    y = y[~np.isnan(y) & ~np.isinf(y)]
-
-    if len(y) == 0:
-        empty = np.array([])
-        fut = np.zeros(periods_ahead)
-        return dict(y_pred=empty, lower=empty, upper=empty,
-                    future_pred=fut, future_lower=fut, future_upper=fut,
-                    resid=np.array([0.0]))
-
-    if len(y) == 1 or np.allclose(y, y[0]):
-        const = np.full(len(y), y.mean())
-        fut_const = np.full(periods_ahead, float(y.mean()))
-        return dict(y_pred=const, lower=const, upper=const,
-                    future_pred=fut_const, future_lower=fut_const, future_upper=fut_const,
-                    resid=np.array([0.0]))
-
-    n = len(y)
-    x = np.arange(n)
-    coef = np.polyfit(x, y, 1)
-    trend = np.poly1d(coef)(x)
-    resid = y - trend
-    if len(resid) < 5:
-        resid = np.pad(resid, (0, 5 - len(resid)), constant_values=float(np.mean(resid)))
-
-    sims = 800
-    boot_in = np.random.choice(resid, size=(sims, n), replace=True)
-    sim_in = trend + boot_in
-    lower, upper = np.percentile(sim_in, ci[0], axis=0), np.percentile(sim_in, ci[1], axis=0)
-
-    xf = np.arange(n, n + periods_ahead)
-    future_trend = np.poly1d(coef)(xf)
-    boot_out = np.random.choice(resid, size=(sims, periods_ahead), replace=True)
-    sim_out = future_trend + boot_out
-    fl, fu = np.percentile(sim_out, ci[0], axis=0), np.percentile(sim_out, ci[1], axis=0)
-
-    return dict(y_pred=trend, lower=lower, upper=upper,
-                future_pred=future_trend, future_lower=fl, future_upper=fu,
-                resid=resid)
+def date_preset_days(preset: str):
+    """(day_from, day_to) epoch days for a date preset, as apply_date_preset filters."""
+    today = datetime.today().date()
+    start = {"Today": today,
+             "This Week": today - timedelta(days=today.weekday()),
+             "This Month": today.replace(day=1),
+             "Last 30 Days": today - timedelta(days=30)}.get(preset)
+    if start is None:
+        return None, None
+    return to_epoch_day(start), (to_epoch_day(today) if preset == "Today" else None)
+
+
+def normalize_shift(name: str) -> str:
+    return re.sub(r"^SHIFT\s+", "", str(name).strip().upper())
 
 
 def risk_bucket(value: float, threshold_low: float, threshold_high: float) -> str:
@@ -218,11 +133,10 @@ class PredictionsDashboardFrame(tk.Frame):
                         selectforeground="black")
 
         # ----- Data & defaults -----
-        self.df_raw = fetch_logs()
+        self.df_raw = fetch_daily_scrap()
         self.horizon_days = 7
-        # You can tune these thresholds or make them configurable
-        self.threshold_low = 2500
-        self.threshold_high = 4000
+        # Medium / High cut-offs, shared with the backtest's risk accuracy
+        self.threshold_low, self.threshold_high = RISK_THRESHOLDS
 
         # ----- Layout -----
         self.rowconfigure(1, weight=1)
@@ -245,10 +159,7 @@ class PredictionsDashboardFrame(tk.Frame):
                  bg=BG_SIDEBAR).pack(anchor="w", pady=(0, 10))
 
         tk.Label(self.sidebar, text="Machine:", bg=BG_SIDEBAR).pack(anchor="w")
-        machines = ["All"]
-        if not self.df_raw.empty:
-            machines += sorted(df for df in self.df_raw["machine_key"].dropna().unique().tolist())
-        self.machine_cb = ttk.Combobox(self.sidebar, values=machines,
+        self.machine_cb = ttk.Combobox(self.sidebar, values=["All"],
                                        state="readonly", style="Custom.TCombobox")
         self.machine_cb.current(0)
         self.machine_cb.pack(fill="x", pady=5)
@@ -261,18 +172,35 @@ class PredictionsDashboardFrame(tk.Frame):
         self.date_cb.pack(fill="x", pady=5)
 
         tk.Label(self.sidebar, text="Shift:", bg=BG_SIDEBAR).pack(anchor="w", pady=(10, 0))
-        shifts = ["All"]
-        if not self.df_raw.empty:
-            shifts += sorted(self.df_raw["shift"].dropna().astype(str).str.upper().unique().tolist())
-        self.shift_cb = ttk.Combobox(self.sidebar, values=shifts,
+        self.shift_cb = ttk.Combobox(self.sidebar, values=["All"],
                                      state="readonly", style="Custom.TCombobox")
         self.shift_cb.current(0)
         self.shift_cb.pack(fill="x", pady=5)
 
+        # combobox label "Press-2 (1,204)" -> filter value; shift value -> raw dimension names
+        self._machine_values, self._shift_values, self._shift_names = {}, {}, {}
+        self._refresh_facets()
+
+        # model / horizon only change the forecast: applied on pick
+        tk.Label(self.sidebar, text="Model:", bg=BG_SIDEBAR).pack(anchor="w", pady=(10, 0))
+        self._model_names = {label: name for name, label in MODEL_LABELS.items()}
+        self.model_cb = ttk.Combobox(self.sidebar, values=list(self._model_names),
+                                     state="readonly", style="Custom.TCombobox")
+        self.model_cb.set(MODEL_LABELS[DEFAULT_MODEL])
+        self.model_cb.pack(fill="x", pady=5)
+        self.model_cb.bind("<<ComboboxSelected>>", lambda e: self.apply_filters())
+
+        tk.Label(self.sidebar, text="Horizon:", bg=BG_SIDEBAR).pack(anchor="w", pady=(10, 0))
+        self.horizon_cb = ttk.Combobox(self.sidebar, values=[f"{d} days" for d in HORIZONS],
+                                       state="readonly", style="Custom.TCombobox")
+        self.horizon_cb.set(f"{self.horizon_days} days")
+        self.horizon_cb.pack(fill="x", pady=5)
+        self.horizon_cb.bind("<<ComboboxSelected>>", self._on_horizon)
+
         ttk.Button(self.sidebar, text="Apply Filters",
                    command=self.apply_filters).pack(fill="x", pady=(20, 0))
-        ttk.Button(self.sidebar, text="Reload from DB",
-                   command=self._reload_from_db).pack(fill="x", pady=(8, 0))
+        self.reload_btn = ttk.Button(self.sidebar, text="Reload from DB", command=self._reload_from_db)
+        self.reload_btn.pack(fill="x", pady=(8, 0))
 
     # ----- Top controls / charts / table scaffolding -----
     def _build_top_controls(self):
@@ -323,18 +251,19 @@ class PredictionsDashboardFrame(tk.Frame):
 
     # ----- Actions -----
     def _reload_from_db(self):
+        jobs.submit(self, "predictions.reload", lambda job: fetch_daily_scrap(), self._apply_reload,
+                    failed=lambda e: messagebox.showerror("Reload Error", str(e)), busy=self._set_busy)
+
+    def _set_busy(self, busy):
+        self.config(cursor="watch" if busy else "")
+        self.reload_btn.state(["disabled"] if busy else ["!disabled"])
+        self.reload_btn.config(text="Loading\u2026" if busy else "Reload from DB")
+
+    def _apply_reload(self, df_raw):
         try:
-            self.df_raw = fetch_logs()
-            machines = ["All"] + (sorted(self.df_raw["machine_key"].unique().tolist())
-                                  if not self.df_raw.empty else [])
-            self.machine_cb["values"] = machines
+            self.df_raw = df_raw
             self.machine_cb.current(0)
-
-            shifts = ["All"] + (sorted(self.df_raw["shift"].dropna().astype(str).str.upper().unique().tolist())
-                                if not self.df_raw.empty else [])
-            self.shift_cb["values"] = shifts
             self.shift_cb.current(0)
-
             self.apply_filters()
         except Exception as e:
             messagebox.showerror("Reload Error", str(e))
@@ -342,30 +271,78 @@ class PredictionsDashboardFrame(tk.Frame):
     def _export_dummy(self):
         messagebox.showinfo("Export", "Hook your export logic here (CSV/XLSX).")
 
+    def _refresh_facets(self):
+        """Machine/shift dropdowns with row counts for the chosen dates and other dropdown (on a worker)."""
+        m_sel, s_sel = self._selected_machine(), self._selected_shift()
+        selected = {"machine_name": "" if m_sel == "Unknown" else m_sel,
+                    "shift": self._shift_names.get(s_sel, s_sel)}
+        day_range = date_preset_days(self.date_cb.get())
+        jobs.submit(self, "predictions.facets",
+                    lambda job: facet_counts(*day_range, selected=selected, facets=("machine_name", "shift")),
+                    self._show_facets,
+                    failed=lambda e: None)      # keep the current lists; apply_filters still works on df_raw
+
+    def _show_facets(self, counts):
+        m_sel, s_sel = self._selected_machine(), self._selected_shift()
+        machines = [(name or "Unknown", n) for name, n in counts["machine_name"]]
+        shifts, self._shift_names = {}, {}
+        for name, n in counts["shift"]:
+            key = normalize_shift(name)
+            shifts[key] = shifts.get(key, 0) + n
+            self._shift_names.setdefault(key, []).append(name)
+        self._machine_values = self._fill_combo(self.machine_cb, machines, m_sel)
+        self._shift_values = self._fill_combo(self.shift_cb, sorted(shifts.items()), s_sel)
+
+    @staticmethod
+    def _fill_combo(cb, counts, current):
+        if current != "All" and current not in dict(counts):
+            counts = list(counts) + [(current, 0)]     # keep the selection listed
+        values = {facet_label(v, n): v for v, n in counts}
+        cb["values"] = ["All", *values]
+        cb.set(next((label for label, v in values.items() if v == current), "All"))
+        return values
+
+    def _selected_machine(self):
+        return self._machine_values.get(self.machine_cb.get(), self.machine_cb.get())
+
+    def _selected_shift(self):
+        return self._shift_values.get(self.shift_cb.get(), self.shift_cb.get())
+
+    def _selected_model(self):
+        return self._model_names.get(self.model_cb.get(), DEFAULT_MODEL)
+
+    def _on_horizon(self, event=None):
+        self.horizon_days = int(self.horizon_cb.get().split()[0])
+        self.apply_filters()
+
     def apply_filters(self):
+        self._refresh_facets()
         if self.df_raw.empty:
             self._render_empty(); return
 
         df = self.df_raw.copy()
 
-        m_sel = self.machine_cb.get()
+        m_sel = self._selected_machine()
         if m_sel and m_sel != "All":
             df = df[df["machine_key"] == m_sel]
 
         df = apply_date_preset(df, self.date_cb.get())
 
-        s_sel = self.shift_cb.get()
+        s_sel = self._selected_shift()
         if s_sel and s_sel != "All":
             df = df[df["shift"].astype(str).str.upper() == s_sel]
 
         if df.empty:
             self._render_empty(); return
 
-        day = df.groupby("date", as_index=False)["quantity"].sum().sort_values("date")
-        y = day["quantity"].to_numpy(dtype=float)
-        model = fit_predict_with_ci(y, periods_ahead=self.horizon_days)
+        # one point per calendar day (no scrap logged = 0) so weekly models line up
+        day = df.groupby("date")["quantity"].sum().sort_index()
+        day = day.reindex(pd.date_range(day.index.min(), day.index.max(), freq="D"), fill_value=0)
+        y = day.to_numpy(dtype=float)
+        model_name = self._selected_model()
+        model = forecast(y, model_name, periods_ahead=self.horizon_days)
 
-        dates = day["date"].to_numpy()
+        dates = day.index.to_numpy()
         fut_dates = pd.date_range(
             start=(pd.to_datetime(dates[-1]) if len(dates) else pd.Timestamp.today()) + timedelta(days=1),
             periods=self.horizon_days, freq="D"
@@ -378,10 +355,10 @@ class PredictionsDashboardFrame(tk.Frame):
                      .sort_values("quantity", ascending=False)) if not cause_df.empty else pd.DataFrame()
 
         # Risk rows
-        self.rows_data = self._build_risk_rows(df)
+        self.rows_data = self._build_risk_rows(df, model_name)
 
         unit = (df["unit"].mode().iat[0] if "unit" in df.columns and not df["unit"].empty else "units")
-        self._render_line_chart(dates, y, model, fut_dates, unit=unit)
+        self._render_line_chart(dates, y, model, fut_dates, unit=unit, title=MODEL_LABELS[model_name])
         self._render_pie_chart(cause_agg)
         self._draw_bottom_table()
 
@@ -394,7 +371,7 @@ class PredictionsDashboardFrame(tk.Frame):
         self.rows_data = []
         self._draw_bottom_table()
 
-    def _render_line_chart(self, dates, y, model, fut_dates, unit=""):
+    def _render_line_chart(self, dates, y, model, fut_dates, unit="", title=""):
         for child in self.chart_split.grid_slaves(row=0, column=0):
             child.destroy()
 
@@ -416,7 +393,7 @@ class PredictionsDashboardFrame(tk.Frame):
             if len(model["future_lower"]):
                 ax1.fill_between(fut_dates, model["future_lower"], model["future_upper"], alpha=0.15, color="#1F8EFA")
 
-        ax1.set_title(f"Predicted Scrap Volume ({unit})", fontsize=11)
+        ax1.set_title(f"Predicted Scrap Volume ({unit})" + (f" \u2014 {title}" if title else ""), fontsize=11)
         ax1.set_xlabel("Date")
         ax1.set_ylabel(f"Scrap ({unit})")
         ax1.grid(True, linestyle="--", alpha=0.35)
@@ -466,21 +443,27 @@ class PredictionsDashboardFrame(tk.Frame):
         self.canvas_pie.get_tk_widget().grid(row=0, column=2, sticky="nsew", padx=(5, 0))
 
     # ----- Risk table -----
-    def _build_risk_rows(self, df: pd.DataFrame):
+    def _build_risk_rows(self, df: pd.DataFrame, model_name=DEFAULT_MODEL):
         if df.empty:
             return []
 
-        last_date = df["date"].max()
-        per_ms = (df[df["date"] == last_date]
-                  .groupby(["machine_key", "shift"], as_index=False)["quantity"].sum())
+        # every machine x shift as one row of a (series x day) matrix, all
+        # forecast in one batch; the table shows the next day's prediction
+        days = df["date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        keys, _, Y = pivot_series([df["machine_key"].astype(str), df["shift"].astype(str)],
+                                  days, df["quantity"].fillna(0))
+        predicted = np.clip(forecast_batch(Y, model_name, periods_ahead=1)["future_pred"][:, 0], 0, None)
+
+        per_ms = pd.DataFrame({"machine_key": [k[0] for k in keys], "shift": [k[1] for k in keys],
+                               "predicted": predicted})
+        per_ms = per_ms.nlargest(10, "predicted").reset_index(drop=True)
 
         # Risk bucket + simple placeholder cause
-        per_ms["Risk Level"] = per_ms["quantity"].apply(
-            lambda x: risk_bucket(float(x or 0), self.threshold_low, self.threshold_high)
+        per_ms["Risk Level"] = per_ms["predicted"].apply(
+            lambda x: risk_bucket(float(x), self.threshold_low, self.threshold_high)
         )
         per_ms["Predicted Top Cause"] = "Material Defect"
 
-        per_ms = per_ms.sort_values("quantity", ascending=False).reset_index(drop=True)
         # Adapt to drawing code: turn into list of dicts
         rows = []
         for i, r in per_ms.iterrows():
@@ -488,11 +471,11 @@ class PredictionsDashboardFrame(tk.Frame):
                 "rank": i + 1,
                 "machine_key": str(r.get("machine_key", "")),
                 "shift": str(r.get("shift", "")),
-                "quantity": float(r.get("quantity", 0)),
+                "predicted": float(r.get("predicted", 0)),
                 "Risk Level": r.get("Risk Level", "Low"),
                 "Predicted Top Cause": r.get("Predicted Top Cause", "—"),
             })
-        return rows[:10]
+        return rows
 
     def _draw_bottom_table(self, event=None):
         c = self.table_canvas
@@ -521,8 +504,8 @@ class PredictionsDashboardFrame(tk.Frame):
             # Shift
             c.create_text(int(w * self.columns[2][1]), y, anchor="w",
                           text=row.get("shift", "—"), font=("Segoe UI", 10), fill="#0F172A")
-            # Predicted Scrap (use quantity as proxy)
-            pred_str = f"{int(float(row.get('quantity', 0))):,}"
+            # Predicted Scrap (next day)
+            pred_str = f"{round(float(row.get('predicted', 0))):,}"
             c.create_text(int(w * self.columns[3][1]), y, anchor="w",
                           text=pred_str, font=("Segoe UI", 10), fill="#0F172A")
             # Risk pill
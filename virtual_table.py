@@ -0,0 +1,216 @@
+# virtual_table.py — ttk.Treeview that only ever holds the rows on screen
+# Usage:
+#   table = VirtualTable(parent, columns, headings, height=15, on_view=status_cb)
+#   table.load(RowBlocks(pager))       # any object with count(conn) / rows(conn, start, stop) / peek(start, stop)
+#   VirtualTable(..., on_sort=cb, sortable=cols)   # header click -> cb(column); show_sort() marks it
+#
+# The tree owns one item per visible line; scrolling rewrites those items'
+# values in place (same item ids) with rows fetched in blocks from the source,
+# so widget count and memory stay flat however long the result is. Counts and
+# missing blocks are fetched on a jobs worker; until they arrive the slots
+# show placeholders, so the Tk thread never waits on a query.
+
+import tkinter as tk
+from tkinter import ttk
+
+from db import reader
+import jobs
+
+WHEEL_ROWS = 3
+_EXTEND_STATE = 0x0001 | 0x0004        # Shift / Control held: the click extends the selection
+
+
+def merge_selection(selected, visible, chosen, replace):
+    """
+    Selected keys given the on-screen rows (visible) and which of them the
+    tree has selected (chosen). replace (a plain click) drops the keys of
+    rows scrolled off screen; otherwise they are kept.
+    """
+    if replace:
+        return set(chosen)
+    return (set(selected) - set(visible)) | set(chosen)
+
+
+class VirtualTable(tk.Frame):
+    def __init__(self, parent, columns, headings, height=15, key="id", on_view=None,
+                 col_width=130, bg="#F8FAFC", on_sort=None, sortable=()):
+        super().__init__(parent, bg=bg)
+        self.columns = tuple(columns)
+        self.headings = {c: headings.get(c, c) for c in self.columns}
+        self.key = key
+        self.on_view = on_view
+        self.source = None
+        self.top = 0
+        self.total = 0
+        self.exact = True
+        self.rows = []                  # rows currently in the slots, top to bottom
+        self._selected = set()          # keys, survives scrolling
+        self._slots = []
+        self._pending = None
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings",
+                                 height=height, selectmode="extended")
+        for c in self.columns:
+            self.tree.heading(c, text=self.headings[c])
+            if on_sort and c in sortable:
+                self.tree.heading(c, command=lambda c=c: on_sort(c))
+            self.tree.column(c, width=col_width, anchor="center")
+        self.tree.tag_configure("even", background="#FFFFFF")
+        self.tree.tag_configure("odd", background="#F7F9FB")
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vsb.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self._set_slots(height)
+
+        self.tree.bind("<MouseWheel>", lambda e: self._scroll_by(-WHEEL_ROWS if e.delta > 0 else WHEEL_ROWS))
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(WHEEL_ROWS))
+        for seq, rows in (("<Up>", -1), ("<Down>", 1),
+                          ("<Prior>", "-page"), ("<Next>", "page")):
+            self.tree.bind(seq, lambda e, r=rows: self._scroll_by(r))
+        self.tree.bind("<Home>", lambda e: self.scroll_to(0) or "break")
+        self.tree.bind("<End>", lambda e: self.scroll_to(self.total) or "break")
+        self.tree.bind("<ButtonPress-1>", self._on_press)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Configure>", self._on_resize)
+
+    # ---------- data ----------
+    def load(self, source):
+        """Show a new source from the top, clearing the selection."""
+        self.source = source
+        self._selected.clear()
+        self.top = 0
+        self.refresh()
+
+    def refresh(self):
+        """Recount (on a worker) and redraw at the current position (after edits/deletes)."""
+        source = self.source
+        if source is None:
+            return self.scroll_to(self.top)
+
+        def work(job):
+            with reader() as conn:
+                return source.count(conn)
+
+        def done(result):
+            if self.source is source:
+                self.total, self.exact = result
+                self.scroll_to(self.top)
+
+        jobs.submit(self, f"{self}.count", work, done)
+
+    def selected_rows(self):
+        """Selected rows that are on screen (selection of scrolled-away rows is kept by key)."""
+        return [row for row in self.rows if row[self.key] in self._selected]
+
+    def selected_keys(self):
+        return set(self._selected)
+
+    def clear_selection(self):
+        self._selected.clear()
+        self.tree.selection_set(())
+
+    def show_sort(self, column=None, descending=True):
+        """Mark the sorted column's header with an arrow (None: no marker)."""
+        for c in self.columns:
+            arrow = (" \u25BC" if descending else " \u25B2") if c == column else ""
+            self.tree.heading(c, text=self.headings[c] + arrow)
+
+    # ---------- scrolling ----------
+    def scroll_to(self, top):
+        self.top = max(0, min(int(top), self.total - len(self._slots)))
+        if self._pending is None:
+            self._pending = self.after_idle(self._render)   # coalesce bursts of wheel events
+
+    def _scroll_by(self, rows):
+        if rows in ("page", "-page"):
+            rows = len(self._slots) * (1 if rows == "page" else -1)
+        self.scroll_to(self.top + rows)
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * self.total)
+        elif args[0] == "scroll":
+            step = len(self._slots) if args[2] == "pages" else 1
+            self.scroll_to(self.top + int(args[1]) * step)
+
+    # ---------- rendering ----------
+    def _set_slots(self, n):
+        n = max(1, n)
+        while len(self._slots) < n:
+            self._slots.append(self.tree.insert("", "end", iid=f"slot{len(self._slots)}", values=()))
+        while len(self._slots) > n:
+            self.tree.delete(self._slots.pop())
+
+    def _on_resize(self, event):
+        # slot count follows the visible height (measured from the first row's box)
+        box = self.tree.bbox(self._slots[0]) if self._slots else None
+        if not box or not box[3]:
+            return
+        n = max(1, (event.height - box[1]) // box[3])
+        if n != len(self._slots):
+            self._set_slots(n)
+            self.scroll_to(self.top)
+
+    def _fetch(self, start, stop):
+        # fill the source's block cache on a worker, then draw again
+        source = self.source
+
+        def work(job):
+            with reader() as conn:
+                source.rows(conn, start, stop)
+
+        def done(_):
+            if self.source is source:
+                self.scroll_to(self.top)
+
+        jobs.submit(self, f"{self}.rows", work, done)
+
+    def _render(self):
+        self._pending = None
+        rows = []
+        if self.source is not None:
+            stop = self.top + len(self._slots)
+            rows = self.source.peek(self.top, stop)
+            if rows is None:
+                self._fetch(self.top, stop)
+                rows = [None] * max(0, min(stop, self.total) - self.top)     # placeholders
+        self.rows = [row for row in rows if row is not None]
+        show = []
+        for i, iid in enumerate(self._slots):
+            if i < len(rows):
+                row = rows[i]
+                values = (["\u2026"] * len(self.columns) if row is None
+                          else ["" if row[c] is None else row[c] for c in self.columns])
+                self.tree.item(iid, values=values, tags=("even" if (self.top + i) % 2 == 0 else "odd",))
+                self.tree.move(iid, "", i)
+                if row is not None and row[self.key] in self._selected:
+                    show.append(iid)
+            else:
+                self.tree.detach(iid)
+        self.tree.selection_set(show)
+        if self.total:
+            self.vsb.set(self.top / self.total, min(1.0, (self.top + len(rows)) / self.total))
+        else:
+            self.vsb.set(0.0, 1.0)
+        if self.on_view:
+            self.on_view(self.top, len(rows), self.total, self.exact)
+
+    def _visible_selection(self):
+        selected = set(self.tree.selection())
+        rows = list(zip(self._slots, self.rows))
+        return [row[self.key] for _, row in rows], [row[self.key] for iid, row in rows if iid in selected]
+
+    def _on_press(self, event):
+        # Runs before the Treeview class binding: a plain click on a row leaves
+        # only that row selected, so keys scrolled off screen go now.
+        if event.state & _EXTEND_STATE or not self.tree.identify_row(event.y):
+            return
+        self._selected = merge_selection(self._selected, *self._visible_selection(), replace=True)
+
+    def _on_select(self, _event=None):
+        # Slots are reused, so selection is tracked by row key, not item id.
+        self._selected = merge_selection(self._selected, *self._visible_selection(), replace=False)